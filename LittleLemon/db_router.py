@@ -0,0 +1,173 @@
+"""Read/write database routing for Little Lemon.
+
+Writes always go to ``default``. Reads go to one of the aliases listed in
+``REPLICA_DATABASES`` only inside ``replica_reads()`` (used by the
+read-heavy views), and never once the current client has written: the
+router pins the rest of the request to the primary, and
+``ReplicaPinningMiddleware`` keeps the client pinned for
+``REPLICA_PIN_SECONDS`` so it always reads its own writes. The pin is kept
+in a cookie and, for clients that do not store cookies such as token-auth
+API clients, in the cache under the authenticated user.
+
+Users, groups and tokens are always read from the primary, so a lagging
+replica can neither reject a token that was just issued nor apply
+permissions from before a role change.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+PIN_COOKIE = 'littlelemon_primary'
+PRIMARY_ONLY_APPS = {'auth', 'authtoken'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+# None outside of a request or replica_reads() block, where nothing is pinned.
+_pinned = ContextVar('pinned_to_primary', default=None)
+_wrote = ContextVar('wrote_to_primary', default=False)
+# The user whose cached pin db_for_read has yet to check.
+_reader = ContextVar('replica_reader', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+
+
+def _pin_key(user_pk):
+    return f'replica_pin:{user_pk}'
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Allow reads in this block (or decorated view) to use a replica.
+
+    Pass the authenticated ``user`` so reads stay on the primary while that
+    user is pinned, whether or not their client sent the pin cookie.
+    """
+    token = _replica_reads.set(True)
+    pinned_token = _pinned.set(False) if _pinned.get() is None else None
+    reader_token = _reader.set(user.pk if user is not None and user.is_authenticated else None)
+    try:
+        yield
+    finally:
+        _reader.reset(reader_token)
+        if pinned_token is not None:
+            _pinned.reset(pinned_token)
+        _replica_reads.reset(token)
+
+
+class ReplicaReadMixin:
+    """Let the GET (and HEAD) handler of a DRF view read from a replica.
+
+    Authentication, permission checks and throttling run before the handler,
+    on the primary.
+    """
+
+    def get(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().get(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if (replicas and _replica_reads.get() and not _pinned.get()
+                and model._meta.app_label not in PRIMARY_ONLY_APPS):
+            reader = _reader.get()
+            if reader is not None:
+                _reader.set(None)
+                if cache.get(_pin_key(reader)):
+                    _pinned.set(True)
+                    return DEFAULT_DB_ALIAS
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if _pinned.get() is not None:
+            _pinned.set(True)
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+class ReplicaPinningMiddleware:
+    """Pin a client to the primary database for a while after it writes,
+    by cookie and, once authenticated, by user.
+
+    Supports both sync and async requests, so async views are not pushed
+    onto a thread just to pass through this middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self.start(request)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            self.finish(tokens)
+        pin_key = self.process_response(request, response, wrote)
+        if pin_key is not None:
+            cache.set(pin_key, True, pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        tokens = self.start(request)
+        try:
+            response = await self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            self.finish(tokens)
+        pin_key = self.process_response(request, response, wrote)
+        if pin_key is not None:
+            await cache.aset(pin_key, True, pin_seconds())
+        return response
+
+    def start(self, request):
+        pinned_until = request.COOKIES.get(PIN_COOKIE, '')
+        pinned = pinned_until.isdigit() and int(pinned_until) > time.time()
+        return _pinned.set(pinned), _wrote.set(False)
+
+    def finish(self, tokens):
+        pinned_token, wrote_token = tokens
+        _pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
+
+    def process_response(self, request, response, wrote):
+        """Set the pin cookie after a write; returns the cache key to pin the
+        authenticated user under, if any.
+        """
+        if not (wrote and get_replicas()):
+            return None
+        seconds = pin_seconds()
+        response.set_cookie(PIN_COOKIE, str(int(time.time()) + seconds), max_age=seconds,
+                            httponly=True, samesite='Lax')
+        # DRF sets request.user once the view has authenticated the request.
+        user = getattr(request, 'user', None)
+        return _pin_key(user.pk) if user is not None and user.is_authenticated else None
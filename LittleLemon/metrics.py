@@ -0,0 +1,251 @@
+"""Always-on request metrics for Little Lemon.
+
+``MetricsMiddleware`` records, per URL name, the request count by method
+and status, a latency histogram, the SQL queries run and their time, and
+the time spent in serializers. The current request's timings are sent back
+in a ``Server-Timing`` header and the totals are served in the Prometheus
+text format by ``metrics_view``.
+
+SQL is timed by an execute wrapper installed on every database connection
+when it is opened; serializers are timed by ``TimedSerializerMixin``.
+Outside of a request both cost one context variable lookup. Totals are kept
+per process, so with several workers each one must be scraped.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+UNMATCHED = '<unmatched>'
+
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'query_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+def time_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.query_seconds += time.perf_counter() - start
+
+
+def install(connection):
+    if not getattr(connection, 'littlelemon_metrics', False):
+        connection.execute_wrappers.append(time_query)
+        connection.littlelemon_metrics = True
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+def _timed_serializer(method, *args, **kwargs):
+    timings = _timings.get()
+    # Nested serializers and list children are part of the outer one's time.
+    if timings is None or timings.serializing:
+        return method(*args, **kwargs)
+    timings.serializing = True
+    start = time.perf_counter()
+    try:
+        return method(*args, **kwargs)
+    finally:
+        timings.serializer_seconds += time.perf_counter() - start
+        timings.serializing = False
+
+
+class TimedSerializerMixin:
+    """Count a serializer's representation and validation time as serializer time.
+    """
+
+    def to_representation(self, instance):
+        return _timed_serializer(super().to_representation, instance)
+
+    def is_valid(self, *, raise_exception=False):
+        return _timed_serializer(super().is_valid, raise_exception=raise_exception)
+
+
+class RouteMetrics:
+    __slots__ = ('responses', 'buckets', 'count', 'seconds', 'queries', 'query_seconds', 'serializer_seconds')
+
+    def __init__(self):
+        self.responses = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+
+
+class Registry:
+    """Per-process metric totals, keyed by URL name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, status, seconds, timings):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = RouteMetrics()
+            key = (method, status)
+            metrics.responses[key] = metrics.responses.get(key, 0) + 1
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.queries += timings.queries
+            metrics.query_seconds += timings.query_seconds
+            metrics.serializer_seconds += timings.serializer_seconds
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """Format the totals in the Prometheus text exposition format.
+        """
+        with self._lock:
+            routes = sorted(self._routes.items())
+            snapshot = [(route, m.responses.copy(), list(m.buckets), m.count, m.seconds, m.queries,
+                         m.query_seconds, m.serializer_seconds) for route, m in routes]
+
+        lines = [
+            '# HELP littlelemon_requests_total Requests served, by URL name, method and status.',
+            '# TYPE littlelemon_requests_total counter',
+        ]
+        for route, responses, *_ in snapshot:
+            for (method, status), count in sorted(responses.items()):
+                lines.append(f'littlelemon_requests_total{{route="{route}",method="{method}",'
+                             f'status="{status}"}} {count}')
+
+        lines += [
+            '# HELP littlelemon_request_duration_seconds Time to produce a response, by URL name.',
+            '# TYPE littlelemon_request_duration_seconds histogram',
+        ]
+        for route, _, buckets, count, seconds, *_ in snapshot:
+            cumulative = 0
+            for bound, observed in zip(LATENCY_BUCKETS, buckets):
+                cumulative += observed
+                lines.append(f'littlelemon_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'littlelemon_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {count}')
+            lines.append(f'littlelemon_request_duration_seconds_sum{{route="{route}"}} {seconds:.6f}')
+            lines.append(f'littlelemon_request_duration_seconds_count{{route="{route}"}} {count}')
+
+        counters = [
+            ('littlelemon_db_queries_total', 'SQL queries run, by URL name.', 5, '{}'),
+            ('littlelemon_db_query_seconds_total', 'Time spent in SQL queries, by URL name.', 6, '{:.6f}'),
+            ('littlelemon_serializer_seconds_total', 'Time spent in serializers, by URL name.', 7, '{:.6f}'),
+        ]
+        for name, description, field, value_format in counters:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for row in snapshot:
+                lines.append(f'{name}{{route="{row[0]}"}} {value_format.format(row[field])}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    return match.view_name or match.route
+
+
+def server_timing(seconds, timings):
+    return (
+        f'app;dur={seconds * 1000:.1f}, '
+        f'db;dur={timings.query_seconds * 1000:.1f};desc="{timings.queries} queries", '
+        f'serializer;dur={timings.serializer_seconds * 1000:.1f}'
+    )
+
+
+class MetricsMiddleware:
+    """Time every request and record it in ``registry``.
+
+    Put it first in ``MIDDLEWARE`` so the other middleware is included. For
+    streaming responses only the time to the first byte is measured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'LITTLELEMON_SERVER_TIMING', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        timings, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.finish(request, response, timings, start)
+
+    def start(self):
+        # Connections opened before this module was loaded missed connection_created.
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        timings = RequestTimings()
+        return timings, _timings.set(timings), time.perf_counter()
+
+    def finish(self, request, response, timings, start):
+        seconds = time.perf_counter() - start
+        registry.observe(route_name(request), request.method, response.status_code, seconds, timings)
+        if self.server_timing:
+            response['Server-Timing'] = server_timing(seconds, timings)
+        return response
+
+
+@require_safe
+def metrics_view(request):
+    """Serve the metric totals to scrapers from ``LITTLELEMON_METRICS_ALLOWED_IPS``.
+    """
+    allowed = getattr(settings, 'LITTLELEMON_METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
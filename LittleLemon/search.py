@@ -0,0 +1,219 @@
+"""Full-text search over model fields, backed by SQLite FTS5.
+
+Each ``SearchIndex`` mirrors some text fields of a model into an external
+FTS5 table keyed by primary key, plus an ``fts5vocab`` table of its terms.
+Apps declare their indexes, keep them in sync from model signals and create
+the tables in a migration with ``create_index_tables``. Queries match every
+word as a prefix, fall back to close vocabulary terms for words that match
+nothing (typos), and rank results by bm25.
+
+On other databases the tables are not created and searches degrade to
+``icontains`` lookups.
+"""
+
+import difflib
+import re
+import unicodedata
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+
+MAX_SEARCH_TERMS = 8
+
+# Every declared index, for rebuild_search_index.
+indexes = []
+
+
+def create_index_tables(schema_editor, table, source_table, fields):
+    """Create and fill the FTS5 and vocabulary tables for an index.
+
+    Meant for ``RunPython`` in migrations; does nothing off SQLite.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(fields)
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5('
+        f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}_vocab" USING fts5vocab("{table}", \'row\')')
+    schema_editor.execute(f'INSERT INTO "{table}"(rowid, {columns}) SELECT id, {columns} FROM "{source_table}"')
+
+
+def drop_index_tables(schema_editor, table):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS "{table}_vocab"')
+    schema_editor.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+
+def _normalize(word):
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class SearchIndex:
+    """An FTS5 index over ``fields`` of ``model``, stored in ``table``.
+    """
+
+    def __init__(self, model, fields, table=None):
+        self.model = model
+        self.fields = list(fields)
+        self.table = table or f'{model._meta.db_table}_fts'
+        self.vocab_table = f'{self.table}_vocab'
+        indexes.append(self)
+
+    def __repr__(self):
+        return f'<SearchIndex {self.model._meta.label} {self.fields}>'
+
+    def db_for_write(self):
+        return router.db_for_write(self.model)
+
+    def is_available(self, using):
+        return connections[using].vendor == 'sqlite'
+
+    def update(self, instance):
+        using = self.db_for_write()
+        if not self.is_available(using):
+            return
+        values = [getattr(instance, field) for field in self.fields]
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{self.table}" WHERE rowid = %s', [instance.pk])
+            cursor.execute(
+                f'INSERT INTO "{self.table}"(rowid, {", ".join(self.fields)}) '
+                f'VALUES (%s, {", ".join(["%s"] * len(values))})',
+                [instance.pk, *values],
+            )
+
+    def remove(self, pk):
+        using = self.db_for_write()
+        if not self.is_available(using):
+            return
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{self.table}" WHERE rowid = %s', [pk])
+
+    def rebuild(self):
+        """Re-read every row of the model into the index; returns the row count.
+        """
+        using = self.db_for_write()
+        if not self.is_available(using):
+            return 0
+        columns = ', '.join(self.fields)
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{self.table}"')
+            cursor.execute(
+                f'INSERT INTO "{self.table}"(rowid, {columns}) '
+                f'SELECT id, {columns} FROM "{self.model._meta.db_table}"'
+            )
+            count = cursor.rowcount
+            cursor.execute(f'INSERT INTO "{self.table}"("{self.table}") VALUES (\'optimize\')')
+        return count
+
+    def terms(self, text):
+        return [_normalize(word) for word in re.findall(r'\w+', text)][:MAX_SEARCH_TERMS]
+
+    def match_expression(self, text, using):
+        """Build an FTS5 query that requires every word of ``text``.
+
+        A word matches indexed terms it is a prefix of; a word of three or
+        more letters that is a prefix of nothing also matches the closest
+        terms starting with the same letter.
+        """
+        clauses = []
+        with connections[using].cursor() as cursor:
+            for term in self.terms(text):
+                alternatives = [f'"{term}"*']
+                if len(term) >= 3 and not self._has_prefix(cursor, term):
+                    alternatives += [f'"{close}"' for close in self._close_terms(cursor, term)]
+                clauses.append(f'({" OR ".join(alternatives)})')
+        return ' AND '.join(clauses)
+
+    def _has_prefix(self, cursor, term):
+        cursor.execute(
+            f'SELECT 1 FROM "{self.vocab_table}" WHERE term >= %s AND term < %s LIMIT 1',
+            [term, term + '\uffff'],
+        )
+        return cursor.fetchone() is not None
+
+    def _close_terms(self, cursor, term):
+        cursor.execute(
+            f'SELECT term FROM "{self.vocab_table}" WHERE term >= %s AND term < %s',
+            [term[0], term[0] + '\uffff'],
+        )
+        candidates = [row[0] for row in cursor.fetchall()]
+        return difflib.get_close_matches(term, candidates, n=3, cutoff=0.7)
+
+    def filter(self, queryset, text):
+        """Filter ``queryset`` to the rows matching ``text``.
+        """
+        return self._search(queryset, text, rank=False)
+
+    def search(self, queryset, text):
+        """Filter ``queryset`` to rows matching ``text``, annotated with
+        ``search_rank`` (lower is more relevant).
+        """
+        return self._search(queryset, text, rank=True)
+
+    def _search(self, queryset, text, rank):
+        using = queryset.db
+        if not self.terms(text):
+            return queryset
+        if not self.is_available(using):
+            return queryset.filter(reduce(and_, (
+                reduce(or_, (Q(**{f'{field}__icontains': term}) for field in self.fields))
+                for term in self.terms(text)
+            )))
+
+        expression = self.match_expression(text, using)
+        if not rank:
+            return queryset.filter(
+                pk__in=RawSQL(f'SELECT rowid FROM "{self.table}" WHERE "{self.table}" MATCH %s', [expression])
+            )
+        # Join the index once, so the MATCH runs once and bm25 is read from
+        # the joined row rather than from a subquery per result.
+        opts = self.model._meta
+        queryset = queryset.extra(
+            tables=[self.table],
+            where=[f'"{self.table}".rowid = "{opts.db_table}"."{opts.pk.column}"', f'"{self.table}" MATCH %s'],
+            params=[expression],
+        )
+        return queryset.annotate(search_rank=RawSQL(f'bm25("{self.table}")', []))
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Search the view's ``search_index`` with the ``?search=`` parameter.
+
+    Results are ordered by relevance unless the client asks for another
+    ordering. Views without a ``search_index`` are left unfiltered.
+    """
+
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    def get_search_text(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        index = getattr(view, 'search_index', None)
+        text = self.get_search_text(request)
+        if index is None or not text:
+            return queryset
+        queryset = index.search(queryset, text)
+        if self.get_ordering(request, queryset, view):
+            queryset = queryset.order_by('search_rank', 'pk')
+        return queryset
+
+    def get_ordering(self, request, queryset, view):
+        """Order by rank for searches without an explicit ``?ordering=``.
+        """
+        if (getattr(view, 'search_index', None) is None or not self.get_search_text(request)
+                or request.query_params.get(self.ordering_param)):
+            return None
+        if 'search_rank' not in queryset.query.annotations:
+            return None
+        return ['search_rank', 'id']
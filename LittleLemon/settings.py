@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,11 +46,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LittleLemon.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'LittleLemon.db_router.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,10 +81,53 @@ WSGI_APPLICATION = 'LittleLemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Read replicas, e.g. LITTLELEMON_SQLITE_REPLICAS=/tmp/replica1.sqlite3,/tmp/replica2.sqlite3
+# Keep them up to date locally with `python manage.py sync_sqlite_replicas`.
+SQLITE_REPLICAS = list(filter(None, os.environ.get('LITTLELEMON_SQLITE_REPLICAS', '').split(',')))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    }
+}
+if SQLITE_REPLICAS:
+    # WAL lets the replica copies and other readers run alongside the
+    # checkout writer. It is persistent and leaves db.sqlite3-wal/-shm
+    # files, so it is only switched on when replicas are configured.
+    DATABASES['default']['OPTIONS']['init_command'] = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;'
+
+REPLICA_DATABASES = []
+for number, path in enumerate(SQLITE_REPLICAS, 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'init_command': 'PRAGMA query_only=ON;'},
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['LittleLemon.db_router.ReplicaRouter']
+
+# How long a client keeps reading from the primary after it writes.
+REPLICA_PIN_SECONDS = 15
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -140,15 +186,80 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.OrderingFilter',
-        'rest_framework.filters.SearchFilter',
+        'LittleLemon.search.FullTextSearchFilter',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'LittleLemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'LittleLemonAPI.throttling.RoleRateThrottle',
+        'LittleLemonAPI.throttling.ScopedWriteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '60/min',
+        'customer': '300/min',
+        'delivery-crew': '600/min',
+        'manager': '1200/min',
+        # Writes of views with a throttle_scope, on top of the role budget.
+        'checkout': '10/min',
+        'signup': '5/hour',
+    },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
-}
\ No newline at end of file
+}
+
+# Little Lemon API
+
+# Group memberships are cached per user to avoid one query per role check.
+LITTLELEMON_ROLE_CACHE_SIZE = 4096
+LITTLELEMON_ROLE_CACHE_TTL = 300
+
+# Token lookups are cached per process; other processes see token deletion
+# and user deactivation within the TTL.
+LITTLELEMON_TOKEN_CACHE_SIZE = 4096
+LITTLELEMON_TOKEN_CACHE_TTL = 60
+
+# Largest page a client may request with ?page_size= on cursor-paginated lists.
+LITTLELEMON_MAX_PAGE_SIZE = 100
+
+# Menu catalog responses are cached under a version bumped by every menu write.
+LITTLELEMON_CATALOG_CACHE = 'default'
+LITTLELEMON_CATALOG_CACHE_TIMEOUT = 3600
+
+# Restaurant pages and menu fragments are cached under a version bumped by
+# every Menu write. build_static_pages writes the pages here for the proxy.
+LITTLELEMON_PAGE_CACHE = 'default'
+LITTLELEMON_PAGE_CACHE_TIMEOUT = 3600
+LITTLELEMON_STATIC_PAGES_ROOT = BASE_DIR / 'static_pages'
+
+# Orders fetched per query by the streaming export.
+LITTLELEMON_EXPORT_CHUNK_SIZE = 500
+
+# Build menu item and order lists from values() rows instead of serializers.
+LITTLELEMON_FAST_READS = False
+
+# Order change events streamed by /api/orders/events. Use
+# 'LittleLemonAPI.events.CacheBackend' with a cache shared by all workers
+# when more than one process serves the API.
+LITTLELEMON_EVENTS_BACKEND = 'LittleLemonAPI.events.InProcessBackend'
+LITTLELEMON_EVENTS_OPTIONS = {}
+LITTLELEMON_EVENTS_HEARTBEAT = 15
+
+# Per-URL request metrics, served at /metrics to these addresses. Disable
+# LITTLELEMON_SERVER_TIMING to keep timings out of response headers.
+LITTLELEMON_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+LITTLELEMON_SERVER_TIMING = True
+
+# Seconds a LittleLemonDRF inventory reservation holds its stock.
+LITTLELEMON_RESERVATION_TTL = 900
+
+# Token buckets for the DRF throttles. Use
+# 'LittleLemonAPI.throttling.CacheBucketStore' with a cache shared by all
+# workers when more than one process serves the API.
+LITTLELEMON_THROTTLING = True
+LITTLELEMON_THROTTLE_STORE = 'LittleLemonAPI.throttling.LocalBucketStore'
+LITTLELEMON_THROTTLE_STORE_OPTIONS = {}
@@ -18,6 +18,8 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken.views import ObtainAuthToken
 
+from LittleLemon.metrics import metrics_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,4 +27,5 @@ urlpatterns = [
     path('token/login/', ObtainAuthToken.as_view(), name='auth_token'),
     path('drf/', include('LittleLemonDRF.urls')),
     path('api/', include('LittleLemonAPI.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
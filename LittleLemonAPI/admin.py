@@ -1,9 +1,20 @@
 from django.contrib import admin
 from .models import Category, MenuItem, Cart, Order, OrderItem
 
+
+@admin.action(description='Recompute totals of selected orders')
+def recompute_totals(modeladmin, request, queryset):
+    updated = queryset.recompute_totals()
+    modeladmin.message_user(request, f'Recomputed totals of {updated} orders.')
+
+
+class OrderAdmin(admin.ModelAdmin):
+    actions = [recompute_totals]
+
+
 # Register your models here.
 admin.site.register(Category)
 admin.site.register(MenuItem)
 admin.site.register(Cart)
-admin.site.register(Order)
+admin.site.register(Order, OrderAdmin)
 admin.site.register(OrderItem)
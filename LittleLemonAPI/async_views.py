@@ -0,0 +1,226 @@
+"""Async versions of the high-traffic read endpoints of the Little Lemon API.
+
+These are plain Django async views rather than DRF views, so under ASGI a
+request never leaves the event loop except for the queries themselves. They
+accept the same credentials, apply the same role rules and return the same
+JSON bodies as their counterparts in ``views.py``, built with the
+``fastpath`` row helpers instead of serializers.
+"""
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+
+from LittleLemon.db_router import replica_reads
+from LittleLemon.search import FullTextSearchFilter
+
+from .authentication import cache_credentials, get_cached_credentials
+from .models import Cart, MenuItem, Order
+from .events import stream
+from .export import filter_orders
+from .facets import filter_menu_items
+from .fastpath import build_order_rows, cart_rows, cart_values, menu_item_rows, menu_item_values,\
+    order_item_values, order_values
+from .pagination import MenuItemPagination, OrderPagination
+from .renderers import FastJSONRenderer
+from .throttling import RoleRateThrottle
+from .utils import ais_customer, ais_delivery_crew, ais_manager
+from .views import MenuItemListCreateView, OrderListCreateView
+
+
+renderer = FastJSONRenderer()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type)
+
+
+def error_response(detail, status_code):
+    response = json_response({'detail': str(detail)}, status_code)
+    if status_code == status.HTTP_401_UNAUTHORIZED:
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+async def authenticate(request):
+    """Return ``(user, error)`` for the request's token or session.
+
+    Mirrors the ``CachedTokenAuthentication`` and ``SessionAuthentication``
+    pair configured for the sync views, sharing the token cache.
+    """
+    header = request.headers.get('Authorization', '').split()
+    if header and header[0].lower() == 'token':
+        if len(header) != 2:
+            return None, 'Invalid token header.'
+        credentials = get_cached_credentials(header[1])
+        if credentials is not None:
+            return credentials[0], None
+        try:
+            token = await Token.objects.select_related('user').aget(key=header[1])
+        except Token.DoesNotExist:
+            return None, 'Invalid token.'
+        if not token.user.is_active:
+            return None, 'User inactive or deleted.'
+        cache_credentials(token.user, token)
+        return token.user, None
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None, 'Authentication credentials were not provided.'
+    return user, None
+
+
+def api_view(permission=None):
+    """Authenticate the request, check ``permission`` and the role throttle,
+    and handle API errors.
+    """
+    def decorator(view):
+        @require_safe
+        async def wrapper(request, *args, **kwargs):
+            user, error = await authenticate(request)
+            if user is None:
+                return error_response(error, status.HTTP_401_UNAUTHORIZED)
+            if permission is not None and not await permission(user):
+                return error_response('You do not have permission to perform this action.',
+                                      status.HTTP_403_FORBIDDEN)
+            throttle = RoleRateThrottle()
+            if not await throttle.aallow_user(user):
+                exc = Throttled(throttle.wait())
+                response = error_response(exc.detail, exc.status_code)
+                response['Retry-After'] = '%d' % exc.wait
+                return response
+            try:
+                return await view(request, user, *args, **kwargs)
+            except APIException as exc:
+                return error_response(exc.detail, exc.status_code)
+        return wrapper
+    return decorator
+
+
+async def paginate(paginator, queryset, request, view):
+    page = paginator.get_page_queryset(queryset, Request(request), view)
+    return paginator.set_page([row async for row in page])
+
+
+async def order_page_rows(rows):
+    items = [item async for item in order_item_values([row['id'] for row in rows])]
+    return build_order_rows(rows, items)
+
+
+@api_view()
+async def menu_item_list(request, user):
+    try:
+        queryset = filter_menu_items(MenuItem.objects.all(), request.GET)
+    except ValueError as exc:
+        return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+
+    view, search, drf_request = MenuItemListCreateView(), FullTextSearchFilter(), Request(request)
+    with replica_reads(user):
+        if search.get_search_text(drf_request):
+            # Matching reads the index vocabulary, which has no async API.
+            queryset = await sync_to_async(search.filter_queryset)(drf_request, queryset, view)
+        paginator = MenuItemPagination()
+        rows = await paginate(paginator, menu_item_values(queryset), request, view)
+    return json_response(paginator.get_paginated_data(menu_item_rows(rows)))
+
+
+@api_view()
+async def menu_item_detail(request, user, pk):
+    row = await menu_item_values(MenuItem.objects.filter(pk=pk)).afirst()
+    if row is None:
+        return error_response('No MenuItem matches the given query.', status.HTTP_404_NOT_FOUND)
+    return json_response(menu_item_rows([row])[0])
+
+
+@api_view(ais_customer)
+async def cart_list(request, user):
+    """Page-number paginated like the sync cart view, including the count.
+    """
+    queryset = cart_values(Cart.objects.filter(user=user).order_by('id'))
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    if page < 1 or (page - 1) * page_size >= max(count, 1):
+        return error_response('Invalid page.', status.HTTP_404_NOT_FOUND)
+
+    offset = (page - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    previous = None
+    if page == 2:
+        previous = remove_query_param(url, 'page')
+    elif page > 2:
+        previous = replace_query_param(url, 'page', page - 1)
+    return json_response({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if offset + page_size < count else None,
+        'previous': previous,
+        'results': cart_rows(rows),
+    })
+
+
+@api_view()
+async def order_list(request, user):
+    try:
+        orders = filter_orders(Order.objects.all(), request.GET)
+    except ValueError as exc:
+        return error_response(str(exc), status.HTTP_400_BAD_REQUEST)
+    if not await ais_manager(user):
+        if await ais_delivery_crew(user):
+            orders = orders.filter(delivery_crew=user)
+        else:
+            orders = orders.filter(user=user)
+
+    with replica_reads(user):
+        paginator = OrderPagination()
+        rows = await paginate(paginator, order_values(orders), request, OrderListCreateView())
+        results = await order_page_rows(rows)
+    return json_response(paginator.get_paginated_data(results))
+
+
+@api_view()
+async def order_detail(request, user, pk):
+    row = await order_values(Order.objects.filter(pk=pk)).afirst()
+    if row is None:
+        return error_response('No Order matches the given query.', status.HTTP_404_NOT_FOUND)
+    if await ais_customer(user) and row['user__username'] != user.username:
+        return error_response('You do not have permission to see this order.', status.HTTP_403_FORBIDDEN)
+    return json_response((await order_page_rows([row]))[0])
+
+
+@api_view()
+async def order_events(request, user):
+    """Stream changes to the orders the user may see as Server-Sent Events.
+
+    Customers get their own orders, crew the orders assigned to them and
+    managers every order. Only served under ASGI, since a WSGI worker would
+    try to buffer the endless response.
+    """
+    if not isinstance(request, ASGIRequest):
+        return error_response('Order events are only served over ASGI.', status.HTTP_501_NOT_IMPLEMENTED)
+
+    if await ais_manager(user):
+        role = 'manager'
+    elif await ais_delivery_crew(user):
+        role = 'crew'
+    else:
+        role = 'customer'
+    heartbeat = getattr(settings, 'LITTLELEMON_EVENTS_HEARTBEAT', 15)
+
+    response = StreamingHttpResponse(stream(user.pk, role, heartbeat), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
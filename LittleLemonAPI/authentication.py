@@ -0,0 +1,57 @@
+"""Authentication for the Little Lemon API."""
+
+import copy
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from .utils import BoundedTTLCache, get_roles
+
+
+token_cache = BoundedTTLCache(
+    max_size=getattr(settings, 'LITTLELEMON_TOKEN_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'LITTLELEMON_TOKEN_CACHE_TTL', 60),
+)
+
+
+def get_cached_credentials(key):
+    """Return ``(user, token)`` for a cached token key, or ``None``.
+
+    Each caller gets its own copy of the user, so per-request state set on
+    it (such as memoized roles) is never shared.
+    """
+    cached = token_cache.get(key)
+    if cached is None:
+        return None
+    user, token = cached
+    user = copy.copy(user)
+    user.__dict__.pop('_roles', None)
+    return user, token
+
+
+def cache_credentials(user, token):
+    token_cache.set(token.key, (copy.copy(user), token))
+
+
+def invalidate_tokens(*keys):
+    for key in keys:
+        token_cache.delete(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` that keeps token lookups in a bounded TTL cache.
+
+    A warm request runs no authentication SQL: the user comes from
+    ``token_cache`` and their groups from ``role_cache``. Entries are evicted
+    when the token is deleted or the user is saved (deactivation, password
+    change); other processes see those changes within
+    ``LITTLELEMON_TOKEN_CACHE_TTL`` seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = get_cached_credentials(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache_credentials(*credentials)
+            get_roles(credentials[0])
+        return credentials
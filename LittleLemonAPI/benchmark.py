@@ -0,0 +1,204 @@
+"""Helpers shared by the benchmark management commands."""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import connections
+from django.test import AsyncClient
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+
+from .models import Cart, Category, MenuItem, Order, OrderItem
+from .utils import DELIVERY_CREW_GROUP, MANAGER_GROUP
+
+
+@contextmanager
+def temporary_database(verbosity=0):
+    """Run the block against freshly migrated test databases.
+
+    Benchmarks seed large synthetic datasets, so they never touch the
+    configured databases. Throttling is off, or the load would be rejected.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        with override_settings(LITTLELEMON_THROTTLING=False):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times and return the duration of each call in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def median(durations):
+    return statistics.median(durations)
+
+
+def summarize(durations, queries=None, errors=0):
+    """Latency percentiles in milliseconds, throughput and query counts for one run.
+    """
+    cuts = statistics.quantiles(durations, n=100, method='inclusive') if len(durations) > 1 else durations * 99
+    summary = {
+        'requests': len(durations),
+        'errors': errors,
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(durations) * 1000, 3),
+        'throughput_rps': round(len(durations) / sum(durations), 1),
+    }
+    if queries is not None:
+        summary['queries_mean'] = round(statistics.fmean(queries), 2)
+        summary['queries_max'] = max(queries)
+    return summary
+
+
+class Dataset:
+    """A synthetic restaurant: users in every role, a menu, carts and order history.
+
+    ``scale`` multiplies the number of customers, crew, menu items and orders.
+    Users get an API token each but no usable password, so seeding does not
+    spend its time hashing.
+    """
+
+    def __init__(self, scale=1, seed=0):
+        self.scale = scale
+        self.random = random.Random(seed)
+
+    def create(self):
+        scale = self.scale
+        managers = self.create_users('manager', 5, MANAGER_GROUP)
+        crew = self.create_users('crew', 20 * scale, DELIVERY_CREW_GROUP)
+        customers = self.create_users('customer', 500 * scale)
+        spares = self.create_users('spare', 50)
+        Token.objects.bulk_create(Token(key=Token.generate_key(), user=user)
+                                  for user in managers + crew + customers)
+
+        categories = Category.objects.bulk_create(
+            Category(slug=f'category-{number}', title=f'Category {number}') for number in range(10)
+        )
+        menu_items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Dish {number}', price=Decimal(self.random.randrange(200, 3000)) / 100,
+                     featured=self.random.random() < 0.2, category=self.random.choice(categories))
+            for number in range(100 * scale)
+        )
+
+        Cart.objects.bulk_create(
+            Cart(user=user, menu_item=item, quantity=1, unit_price=item.price, price=item.price)
+            for user in customers[::10] for item in self.random.sample(menu_items, 3)
+        )
+
+        orders = Order.objects.bulk_create(
+            Order(user=self.random.choice(customers),
+                  delivery_crew=self.random.choice(crew + [None]),
+                  status=self.random.random() < 0.7)
+            for _ in range(5000 * scale)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=item, quantity=2, unit_price=item.price, price=item.price * 2)
+            for order in orders for item in self.random.sample(menu_items, 3)
+        )
+        Order.objects.recompute_totals()
+
+        self.managers, self.crew, self.customers, self.spares = managers, crew, customers, spares
+        self.categories, self.menu_items, self.orders = categories, menu_items, orders
+        self.tokens = dict(Token.objects.values_list('user_id', 'key'))
+        return self
+
+    def create_users(self, prefix, count, group_name=None):
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            User(username=f'{prefix}{number}', email=f'{prefix}{number}@example.com', password=password)
+            for number in range(count)
+        )
+        if group_name:
+            group, _ = Group.objects.get_or_create(name=group_name)
+            group.user_set.add(*users)
+        return users
+
+    def user(self, role):
+        return self.random.choice({
+            'manager': self.managers, 'crew': self.crew, 'customer': self.customers,
+        }[role])
+
+    def auth_headers(self, user):
+        return {'HTTP_AUTHORIZATION': f'Token {self.tokens[user.pk]}'}
+
+
+async def open_stream(url, data, headers):
+    """GET a streaming endpoint through the ASGI handler and read its first chunk."""
+    # AsyncClient takes HTTP headers by name rather than as META keys.
+    headers = {key[5:].replace('_', '-'): value for key, value in headers.items()}
+    response = await AsyncClient().get(url, data, headers=headers)
+    if response.streaming:
+        content = aiter(response.streaming_content)
+        await anext(content, None)
+        await content.aclose()
+    return response
+
+
+def run_scenario(client, dataset, scenario, requests, warmup=3):
+    """Drive one scenario and return its summary.
+
+    ``scenario.prepare(dataset, random)`` is called untimed before every
+    request and returns ``(user, url, data)``; ``user`` may be ``None`` for
+    anonymous requests. ``asgi`` scenarios are endless streams: they go
+    through the ASGI handler and are timed to their first chunk.
+    """
+    durations, queries, errors = [], [], 0
+    connection = connections['default']
+    for number in range(warmup + requests):
+        user, url, data = scenario.prepare(dataset, dataset.random)
+        headers = dataset.auth_headers(user) if user else {}
+        call = getattr(client, scenario.method)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            if scenario.asgi:
+                response = async_to_sync(open_stream)(url, data, headers)
+            elif scenario.method == 'get':
+                response = call(url, data, **headers)
+            else:
+                response = call(url, data, format='json', **headers)
+            if response.streaming and not scenario.asgi:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+        if number < warmup:
+            continue
+        durations.append(elapsed)
+        queries.append(len(context.captured_queries))
+        errors += response.status_code >= 400
+    return summarize(durations, queries, errors)
+
+
+def compare(results, baseline, threshold):
+    """List the scenarios whose p95 latency or worst-case query count regressed.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current.get('queries_max', 0) > previous.get('queries_max', 0):
+            regressions.append(f"{name}: max queries {previous.get('queries_max')} -> {current['queries_max']}")
+    return regressions
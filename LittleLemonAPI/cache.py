@@ -0,0 +1,87 @@
+"""Versioned response cache for the menu catalog endpoints."""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+CATALOG_VERSION_KEY = 'littlelemon:catalog:version'
+
+
+def get_catalog_cache():
+    return caches[getattr(settings, 'LITTLELEMON_CATALOG_CACHE', 'default')]
+
+
+def get_catalog_version():
+    """Return the current catalog version, starting a new one if it was evicted.
+
+    A fresh version is seeded from the clock so it can never collide with the
+    keys of responses cached under an earlier, evicted version.
+    """
+    cache = get_catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response at once.
+    """
+    cache = get_catalog_cache()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return get_catalog_version()
+
+
+class CatalogCacheMixin:
+    """Serve GET responses of a catalog view from the cache.
+
+    Responses are cached per path, query string and renderer format under the
+    current catalog version, and carry an ETag derived from both so clients
+    can revalidate with If-None-Match. A cache hit runs no SQL and no
+    serializer; writes to menu items or categories bump the version.
+    """
+
+    catalog_cache_formats = ('json', 'xml')
+
+    def get(self, request, *args, **kwargs):
+        renderer_format = request.accepted_renderer.format
+        if renderer_format not in self.catalog_cache_formats:
+            return super().get(request, *args, **kwargs)
+
+        version = get_catalog_version()
+        digest = hashlib.md5(
+            f'{request.get_full_path()}|{renderer_format}'.encode(), usedforsecurity=False
+        ).hexdigest()
+        etag = f'"{version}-{digest}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        cache = get_catalog_cache()
+        key = f'littlelemon:catalog:{version}:{digest}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(key, (response.content, response['Content-Type']),
+                      getattr(settings, 'LITTLELEMON_CATALOG_CACHE_TIMEOUT', 3600))
+        response['ETag'] = etag
+        return response
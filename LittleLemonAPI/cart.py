@@ -0,0 +1,55 @@
+"""Cart updates for the Little Lemon API."""
+
+from django.db import transaction
+
+from .models import Cart, MenuItem
+
+
+def update_cart(user, entries):
+    """Apply many ``{menu_item_id, quantity}`` entries to the user's cart at once.
+
+    Prices are read with a single ``in_bulk`` query, lines with a zero
+    quantity are deleted and the rest are upserted with one
+    ``bulk_create(update_conflicts=True)``, all in one transaction. When the
+    same menu item appears more than once the last entry wins. Raises
+    ``MenuItem.DoesNotExist`` if any menu item is unknown. Returns the
+    upserted cart lines.
+    """
+    quantities = {entry['menu_item_id']: entry['quantity'] for entry in entries}
+
+    with transaction.atomic():
+        menu_items = MenuItem.objects.in_bulk(list(quantities))
+        if len(menu_items) != len(quantities):
+            raise MenuItem.DoesNotExist
+
+        removed = [pk for pk, quantity in quantities.items() if quantity == 0]
+        if removed:
+            Cart.objects.filter(user=user, menu_item_id__in=removed).delete()
+
+        lines = [
+            Cart(
+                user=user,
+                menu_item=menu_items[pk],
+                quantity=quantity,
+                unit_price=menu_items[pk].price,
+                price=menu_items[pk].price * quantity,
+            )
+            for pk, quantity in quantities.items() if quantity
+        ]
+        if lines:
+            Cart.objects.bulk_create(
+                lines,
+                update_conflicts=True,
+                unique_fields=['menu_item', 'user'],
+                update_fields=['quantity', 'unit_price', 'price'],
+            )
+    return lines
+
+
+def remove_from_cart(user, menu_item_ids=None):
+    """Delete the given menu items from the cart, or empty it entirely.
+    """
+    cart = Cart.objects.filter(user=user)
+    if menu_item_ids is not None:
+        cart = cart.filter(menu_item_id__in=menu_item_ids)
+    cart.delete()
@@ -0,0 +1,70 @@
+"""Checkout for the Little Lemon API."""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import Cart, Order, OrderItem
+from .reports import record_items
+
+
+IDEMPOTENCY_KEY_MAX_LENGTH = Order._meta.get_field('idempotency_key').max_length
+
+
+class EmptyCartError(Exception):
+    """Raised when a customer checks out an empty cart."""
+
+
+def checkout(user, idempotency_key=None):
+    """Turn the user's cart into an order.
+
+    The cart is locked, its prices are copied onto the order items and the
+    order, items, total, sales rollups and cart removal are written in one
+    transaction with a constant number of queries. Returns ``(order,
+    created)``; a retried request with the same ``idempotency_key`` gets the
+    original order back.
+    """
+    if idempotency_key:
+        order = _find_order(user, idempotency_key)
+        if order is not None:
+            return order, False
+
+    try:
+        with transaction.atomic():
+            cart_items = list(
+                Cart.objects.select_for_update(of=('self',)).select_related('menu_item').filter(user=user)
+            )
+            if not cart_items:
+                raise EmptyCartError
+
+            order = Order.objects.create(
+                user=user,
+                total=sum(item.price for item in cart_items),
+                idempotency_key=idempotency_key or None,
+            )
+            order_items = OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order,
+                    menu_item=item.menu_item,
+                    quantity=item.quantity,
+                    unit_price=item.unit_price,
+                    price=item.price,
+                )
+                for item in cart_items
+            )
+            record_items(order, order_items)
+            Cart.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+    except IntegrityError:
+        # A concurrent retry with the same key committed first.
+        order = _find_order(user, idempotency_key) if idempotency_key else None
+        if order is None:
+            raise
+        return order, False
+
+    prefetch_related_objects(
+        [order], Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+    )
+    return order, True
+
+
+def _find_order(user, idempotency_key):
+    return Order.objects.with_details().filter(user=user, idempotency_key=idempotency_key).first()
@@ -0,0 +1,122 @@
+"""Bulk and automatic delivery-crew dispatch for the Little Lemon API."""
+
+import heapq
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .events import order_event, order_events, publish_on_commit
+from .models import Order
+from .utils import DELIVERY_CREW_GROUP
+
+
+class DispatchError(Exception):
+    """Raised when a dispatch request names unknown orders or crew members."""
+
+
+class CrewLoadIndex:
+    """Open-order counts of every active Delivery Crew member.
+
+    Built from one aggregate query; ``least_loaded`` is served from a heap so
+    balancing ``n`` orders over ``m`` crew members costs ``O(n log m)``.
+    Heap entries are refreshed lazily, so ``add`` never has to search it.
+    """
+
+    def __init__(self, loads):
+        self.loads = dict(loads)
+        self._heap = [(load, crew_id) for crew_id, load in self.loads.items()]
+        heapq.heapify(self._heap)
+
+    @classmethod
+    def build(cls):
+        crew = (
+            User.objects.filter(groups__name=DELIVERY_CREW_GROUP, is_active=True)
+            .annotate(open_orders=Count('delivery_crew', filter=Q(delivery_crew__status=False)))
+            .values_list('pk', 'open_orders')
+        )
+        return cls(crew)
+
+    def __contains__(self, crew_id):
+        return crew_id in self.loads
+
+    def __len__(self):
+        return len(self.loads)
+
+    def add(self, crew_id, count=1):
+        self.loads[crew_id] += count
+        heapq.heappush(self._heap, (self.loads[crew_id], crew_id))
+
+    def least_loaded(self):
+        while self._heap:
+            load, crew_id = self._heap[0]
+            if self.loads[crew_id] == load:
+                return crew_id
+            heapq.heappop(self._heap)
+        return None
+
+
+def dispatch(assignments=None, auto=False, limit=None):
+    """Assign orders to delivery crew members in one transaction.
+
+    ``assignments`` maps order ids to crew member ids. With ``auto``, the
+    oldest open unassigned orders (at most ``limit`` of them) then go to
+    whoever has the fewest open orders. Orders are written with one UPDATE
+    per crew member, and an order event is published for each on commit,
+    plus an unassign event for any crew member an order was taken from.
+    Returns ``(assigned, loads)``: the ``{order_id: crew_id}`` assignments
+    made and the resulting open-order counts. Raises ``DispatchError`` if an
+    order or crew member does not exist.
+    """
+    assignments = dict(assignments or {})
+    assigned = {}
+    events = []
+
+    with transaction.atomic():
+        index = CrewLoadIndex.build()
+        unknown_crew = sorted(set(assignments.values()) - set(index.loads))
+        if unknown_crew:
+            raise DispatchError(f'Not delivery crew: {", ".join(map(str, unknown_crew))}.')
+
+        orders = Order.objects.select_for_update().in_bulk(list(assignments))
+        missing = sorted(set(assignments) - set(orders))
+        if missing:
+            raise DispatchError(f'Orders not found: {", ".join(map(str, missing))}.')
+
+        for order_id, crew_id in assignments.items():
+            order = orders[order_id]
+            if order.delivery_crew_id == crew_id:
+                continue
+            if not order.status:
+                if order.delivery_crew_id in index:
+                    index.add(order.delivery_crew_id, -1)
+                index.add(crew_id)
+            assigned[order_id] = crew_id
+            events += order_events(order_id, order.user_id, crew_id, order.status,
+                                   previous_crew_id=order.delivery_crew_id)
+
+        if auto and len(index):
+            unassigned = (
+                Order.objects.select_for_update()
+                .filter(delivery_crew__isnull=True, status__in=[False])
+                .exclude(pk__in=list(assignments))
+                .order_by('date', 'id')
+                .values_list('pk', 'user_id')
+            )
+            if limit is not None:
+                unassigned = unassigned[:limit]
+            for order_id, user_id in unassigned:
+                crew_id = index.least_loaded()
+                index.add(crew_id)
+                assigned[order_id] = crew_id
+                events.append(order_event(order_id, user_id, crew_id, False))
+
+        by_crew = defaultdict(list)
+        for order_id, crew_id in assigned.items():
+            by_crew[crew_id].append(order_id)
+        for crew_id, order_ids in by_crew.items():
+            Order.objects.filter(pk__in=order_ids).update(delivery_crew_id=crew_id)
+        publish_on_commit(events)
+
+    return assigned, index.loads
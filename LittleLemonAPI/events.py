@@ -0,0 +1,207 @@
+"""Order change events for the Little Lemon API.
+
+Views publish an event whenever an order's status or delivery crew changes,
+and ``/api/orders/events`` streams them to subscribers as Server-Sent
+Events. When an order moves to another crew member, the previous one also
+gets an ``unassign`` event. Delivery goes through a pluggable backend named by
+``LITTLELEMON_EVENTS_BACKEND``:
+
+* ``InProcessBackend`` (the default) hands events to subscribers of the
+  same process.
+* ``CacheBackend`` appends events to a log in a shared Django cache that
+  every process polls, a stand-in for a broker when several workers serve
+  the stream.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+DEFAULT_BACKEND = 'LittleLemonAPI.events.InProcessBackend'
+
+
+def order_event(order_id, user_id, delivery_crew_id, status):
+    return {
+        'order': order_id,
+        'user': user_id,
+        'delivery_crew': delivery_crew_id,
+        'status': bool(status),
+    }
+
+
+def unassign_event(order_id, delivery_crew_id):
+    """Tell a delivery crew member that an order is no longer theirs."""
+    return {'type': 'unassign', 'order': order_id, 'delivery_crew': delivery_crew_id}
+
+
+def order_events(order_id, user_id, delivery_crew_id, status, previous_crew_id=None):
+    """The events for an order change, with an unassign event for the
+    crew member it was taken from.
+    """
+    events = [order_event(order_id, user_id, delivery_crew_id, status)]
+    if previous_crew_id is not None and previous_crew_id != delivery_crew_id:
+        events.append(unassign_event(order_id, previous_crew_id))
+    return events
+
+
+class InProcessBackend:
+    """Deliver events to the subscribers of this process.
+
+    ``publish`` may be called from any thread; each subscriber has a bounded
+    queue on its own event loop and misses events while it is full.
+    """
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop was closed without unsubscribing.
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+
+    @staticmethod
+    def _offer(queue, event):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    async def listen(self, heartbeat):
+        """Yield events as they arrive, and ``None`` once subscribed and after
+        every ``heartbeat`` seconds without one.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield None
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+class CacheBackend:
+    """Share events between processes through a log kept in a Django cache.
+
+    ``publish`` numbers each event with ``incr`` on a sequence key and stores
+    it for ``ttl`` seconds; listeners poll the sequence every
+    ``poll_interval`` seconds and fetch what they have not seen. The cache
+    must be shared by all processes (e.g. file-based, Memcached or Redis).
+    """
+
+    sequence_key = 'littlelemon:events:sequence'
+
+    def __init__(self, cache='default', poll_interval=0.5, ttl=60):
+        self.cache_alias = cache
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def event_key(self, number):
+        return f'littlelemon:events:{number}'
+
+    def publish(self, event):
+        self.cache.add(self.sequence_key, 0, timeout=None)
+        number = self.cache.incr(self.sequence_key)
+        self.cache.set(self.event_key(number), event, self.ttl)
+
+    async def listen(self, heartbeat):
+        last = await self.cache.aget(self.sequence_key) or 0
+        # Events whose number was taken but which were not stored yet.
+        late = []
+        idle_since = time.monotonic()
+        yield None
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await self.cache.aget(self.sequence_key) or 0
+            numbers = late + list(range(last + 1, current + 1))
+            last = max(last, current)
+            found = await self.cache.aget_many([self.event_key(number) for number in numbers])
+            late = [number for number in numbers[len(late):] if self.event_key(number) not in found]
+            for number in numbers:
+                event = found.get(self.event_key(number))
+                if event is not None:
+                    idle_since = time.monotonic()
+                    yield event
+            if time.monotonic() - idle_since >= heartbeat:
+                idle_since = time.monotonic()
+                yield None
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend_class = import_string(getattr(settings, 'LITTLELEMON_EVENTS_BACKEND', DEFAULT_BACKEND))
+        _backend = backend_class(**getattr(settings, 'LITTLELEMON_EVENTS_OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting in ('LITTLELEMON_EVENTS_BACKEND', 'LITTLELEMON_EVENTS_OPTIONS'):
+        _backend = None
+
+
+def publish_on_commit(events):
+    """Publish the events once the current transaction commits.
+    """
+    events = list(events)
+    if not events:
+        return
+    backend = get_backend()
+
+    def publish():
+        for event in events:
+            backend.publish(event)
+
+    transaction.on_commit(publish)
+
+
+def can_see(event, user_id, role):
+    """Whether a subscriber may receive ``event``.
+
+    ``role`` is ``'manager'``, ``'crew'`` or ``'customer'``.
+    """
+    if role == 'manager':
+        return True
+    if role == 'crew':
+        return event['delivery_crew'] == user_id
+    return event.get('user') == user_id
+
+
+async def stream(user_id, role, heartbeat):
+    """Format the events a subscriber may see as a Server-Sent Events body.
+    """
+    async for event in get_backend().listen(heartbeat):
+        if event is None:
+            yield ': keepalive\n\n'
+        elif can_see(event, user_id, role):
+            yield f'event: {event.get("type", "order")}\ndata: {json.dumps(event)}\n\n'
@@ -0,0 +1,74 @@
+"""Streaming order export for the Little Lemon API."""
+
+import csv
+import json
+
+from django.conf import settings
+from django.utils.dateparse import parse_date
+
+from .fastpath import order_rows, order_values
+
+
+ORDER_FIELDS = ['id', 'user', 'delivery_crew', 'status', 'total', 'date']
+ITEM_FIELDS = ['item', 'unit_price', 'quantity', 'price']
+
+
+def filter_orders(queryset, params):
+    """Apply the ``date_from``, ``date_to`` and ``status`` order filters.
+
+    Raises ``ValueError`` with a client-facing message on bad input.
+    """
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        value = params.get(param)
+        if value:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f"'{param}' must be a date in YYYY-MM-DD format.")
+            queryset = queryset.filter(**{lookup: date})
+
+    value = params.get('status')
+    if value:
+        if value.lower() not in ('0', '1', 'true', 'false'):
+            raise ValueError("'status' must be 0 (out for delivery) or 1 (delivered).")
+        # ``status=False`` compiles to ``NOT status``, which cannot use an index.
+        queryset = queryset.filter(status__in=[value.lower() in ('1', 'true')])
+    return queryset
+
+
+def iter_orders(queryset, chunk_size=None):
+    """Yield orders shaped like ``OrderSerializer`` output, one chunk at a time.
+
+    Orders are read in primary-key order with a keyset filter per chunk and
+    the items of a chunk are fetched with one extra query, so memory stays
+    flat and no transaction or cursor is held open between chunks.
+    """
+    chunk_size = chunk_size or getattr(settings, 'LITTLELEMON_EXPORT_CHUNK_SIZE', 500)
+    orders = order_values(queryset.order_by('id'))
+    last_id = None
+    while True:
+        chunk = orders if last_id is None else orders.filter(id__gt=last_id)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from order_rows(chunk)
+        last_id = chunk[-1]['id']
+
+
+def stream_ndjson(orders):
+    for order in orders:
+        yield json.dumps(order, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(orders):
+    """One row per order item; orders without items get a single row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ORDER_FIELDS + ITEM_FIELDS)
+    for order in orders:
+        head = [order[field] for field in ORDER_FIELDS]
+        for item in order['items'] or [dict.fromkeys(ITEM_FIELDS, '')]:
+            yield writer.writerow(head + [item[field] for field in ITEM_FIELDS])
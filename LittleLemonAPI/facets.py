@@ -0,0 +1,110 @@
+"""Menu item filters and facet counts for the Little Lemon API."""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Q
+
+
+FACETS = ('category', 'featured', 'price')
+# Lower bounds of the price buckets; the last bucket is open-ended.
+PRICE_BUCKETS = (Decimal('0'), Decimal('10'), Decimal('20'), Decimal('50'))
+
+
+def _decimal(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"'{name}' must be a number.")
+    if not number.is_finite():
+        raise ValueError(f"'{name}' must be a number.")
+    return number
+
+
+def filter_menu_items(queryset, params, exclude=None):
+    """Apply the ``category``, ``price_min``, ``price_max`` and ``featured`` filters.
+
+    ``category`` takes one or more comma-separated slugs and is matched
+    through the join, without looking the categories up first. The filters
+    of facet ``exclude`` are skipped. Raises ``ValueError`` with a
+    client-facing message on bad input.
+    """
+    category = params.get('category')
+    if category and exclude != 'category':
+        queryset = queryset.filter(category__slug__in=category.split(','))
+
+    if exclude != 'price':
+        price_min, price_max = _decimal(params, 'price_min'), _decimal(params, 'price_max')
+        if price_min is not None:
+            queryset = queryset.filter(price__gte=price_min)
+        if price_max is not None:
+            queryset = queryset.filter(price__lte=price_max)
+
+    featured = params.get('featured')
+    if featured and exclude != 'featured':
+        if featured.lower() not in ('0', '1', 'true', 'false'):
+            raise ValueError("'featured' must be true or false.")
+        # ``featured=False`` compiles to ``NOT featured``, which cannot use an index.
+        queryset = queryset.filter(featured__in=[featured.lower() in ('1', 'true')])
+    return queryset
+
+
+def requested_facets(params):
+    value = params.get('facets', '')
+    if value.lower() in ('1', 'true', 'all'):
+        return list(FACETS)
+    return [name for name in value.split(',') if name in FACETS]
+
+
+def facet_counts(queryset, params, facets=FACETS):
+    """Count the menu items per value of each facet, one query per facet.
+
+    Each facet is counted with every filter applied except its own, so the
+    counts tell the client what it would get by changing that filter.
+    """
+    counts = {}
+    for name in facets:
+        items = filter_menu_items(queryset, params, exclude=name).order_by()
+        counts[name] = FACET_COUNTERS[name](items)
+    return counts
+
+
+def count_categories(items):
+    rows = (
+        items.values('category__slug', 'category__title')
+        .annotate(count=Count('id'))
+        .order_by('category__title')
+    )
+    return [
+        {'slug': row['category__slug'], 'title': row['category__title'], 'count': row['count']}
+        for row in rows
+    ]
+
+
+def count_featured(items):
+    return items.aggregate(
+        true=Count('id', filter=Q(featured=True)),
+        false=Count('id', filter=Q(featured=False)),
+    )
+
+
+def count_prices(items):
+    bounds = list(zip(PRICE_BUCKETS, PRICE_BUCKETS[1:] + (None,)))
+    buckets = {}
+    for number, (low, high) in enumerate(bounds):
+        condition = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+        buckets[f'bucket{number}'] = Count('id', filter=condition)
+    totals = items.aggregate(**buckets)
+    return [
+        {'min': f'{low}', 'max': f'{high}' if high is not None else None, 'count': totals[f'bucket{number}']}
+        for number, (low, high) in enumerate(bounds)
+    ]
+
+
+FACET_COUNTERS = {
+    'category': count_categories,
+    'featured': count_featured,
+    'price': count_prices,
+}
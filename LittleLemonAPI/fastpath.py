@@ -0,0 +1,117 @@
+"""Fast read path for the hot list endpoints of the Little Lemon API.
+
+These helpers build exactly what ``MenuItemSerializer`` and
+``OrderSerializer`` return, but from ``values()`` rows instead of model
+instances and nested serializer fields. They are used when
+``LITTLELEMON_FAST_READS`` is enabled.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .models import OrderItem
+from .renderers import FastJSONRenderer
+
+
+MENU_ITEM_VALUES = ('id', 'title', 'price', 'featured', 'category_id', 'category__slug', 'category__title')
+ORDER_VALUES = ('id', 'user__username', 'delivery_crew_id', 'status', 'total', 'date')
+
+
+def fast_reads_enabled():
+    return getattr(settings, 'LITTLELEMON_FAST_READS', False)
+
+
+class FastReadRendererMixin:
+    """Encode a view's JSON with ``FastJSONRenderer`` while fast reads are enabled.
+    """
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if fast_reads_enabled():
+            renderers = [FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+                         for renderer in renderers]
+        return renderers
+
+
+def _decimal(value):
+    return f'{value:f}'
+
+
+def menu_item_values(queryset):
+    # Keep annotations such as ``search_rank`` that pagination cursors use.
+    return queryset.values(*MENU_ITEM_VALUES, *queryset.query.annotations)
+
+
+def menu_item_rows(rows):
+    return [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'price': _decimal(row['price']),
+            'featured': row['featured'],
+            'category': {
+                'id': row['category_id'],
+                'slug': row['category__slug'],
+                'title': row['category__title'],
+            },
+        }
+        for row in rows
+    ]
+
+
+def order_values(queryset):
+    return queryset.prefetch_related(None).values(*ORDER_VALUES)
+
+
+def order_item_values(order_ids):
+    return OrderItem.objects.filter(order_id__in=order_ids).order_by('id').values(
+        'order_id', 'menu_item__title', 'unit_price', 'quantity', 'price'
+    )
+
+
+def order_rows(rows):
+    """Serialize order rows, fetching the items of all of them in one query.
+    """
+    return build_order_rows(rows, order_item_values([row['id'] for row in rows]))
+
+
+def build_order_rows(rows, item_rows):
+    items = defaultdict(list)
+    for item in item_rows:
+        items[item['order_id']].append({
+            'item': item['menu_item__title'],
+            'unit_price': _decimal(item['unit_price']),
+            'quantity': item['quantity'],
+            'price': _decimal(item['price']),
+        })
+
+    return [
+        {
+            'id': row['id'],
+            'user': row['user__username'],
+            'delivery_crew': row['delivery_crew_id'],
+            'status': row['status'],
+            'total': _decimal(row['total']),
+            'date': row['date'].isoformat(),
+            'items': items[row['id']],
+        }
+        for row in rows
+    ]
+
+
+def cart_values(queryset):
+    return queryset.values('menu_item__title', 'quantity', 'unit_price', 'price')
+
+
+def cart_rows(rows):
+    return [
+        {
+            'item': row['menu_item__title'],
+            'quantity': row['quantity'],
+            'unit_price': _decimal(row['unit_price']),
+            'price': _decimal(row['price']),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils.dateparse import parse_date
+
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.reports import backfill
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups from orders, a chunk of days at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to recompute (YYYY-MM-DD, default: first order).')
+        parser.add_argument('--until', help='Last day to recompute (YYYY-MM-DD, default: last order).')
+        parser.add_argument('--chunk-days', type=int, default=31,
+                            help='Days recomputed per transaction (default: 31).')
+
+    def handle(self, *args, **options):
+        bounds = Order.objects.aggregate(first=Min('date'), last=Max('date'))
+        try:
+            date_from = parse_date(options['since']) if options['since'] else bounds['first']
+            date_to = parse_date(options['until']) if options['until'] else bounds['last']
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if date_from is None or date_to is None:
+            self.stdout.write('No orders to backfill.')
+            return
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1.')
+
+        total = 0
+        for start, end, orders in backfill(date_from, date_to, options['chunk_days']):
+            total += orders
+            self.stdout.write(f'{start} to {end}: {orders} orders')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} orders from {date_from} to {date_to}.'))
@@ -0,0 +1,195 @@
+import json
+import platform
+import time
+from decimal import Decimal
+
+import django
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from LittleLemonAPI.benchmark import Dataset, compare, run_scenario, temporary_database
+from LittleLemonAPI.models import Cart, MenuItem
+from LittleLemonAPI.utils import DELIVERY_CREW_GROUP, MANAGER_GROUP
+
+
+class Scenario:
+    def __init__(self, name, method, prepare, route=None, asgi=False):
+        self.name = name
+        self.method = method
+        self.prepare = prepare
+        # The URL name in LittleLemonAPI/urls.py the scenario exercises.
+        self.route = route or name.split(':')[0]
+        self.asgi = asgi
+
+
+def fill_cart(user, menu_items):
+    Cart.objects.filter(user=user).delete()
+    Cart.objects.bulk_create(
+        Cart(user=user, menu_item=item, quantity=1, unit_price=item.price, price=item.price)
+        for item in menu_items
+    )
+
+
+def join_group(group_name):
+    def prepare(data, rnd):
+        user = rnd.choice(data.spares)
+        Group.objects.get(name=group_name).user_set.add(user)
+        return user
+    return prepare
+
+
+def new_menu_item(data, rnd):
+    return MenuItem.objects.create(title='Special', price=Decimal('9.99'), featured=False,
+                                   category=rnd.choice(data.categories))
+
+
+def crew_order(data, rnd):
+    return rnd.choice([order for order in data.orders[:500] if order.delivery_crew_id])
+
+
+SCENARIOS = [
+    Scenario('login-page', 'get', lambda d, r: (None, reverse('rest_framework:login'), None)),
+    Scenario('create-user', 'post', lambda d, r: (
+        None, reverse('create-user'),
+        {'username': f'new{r.getrandbits(48)}', 'email': 'new@example.com', 'password': 'Lemon-2025!'})),
+    Scenario('current-user', 'get', lambda d, r: (d.user('customer'), reverse('current-user'), None)),
+    Scenario('auth-cache-stats', 'get', lambda d, r: (d.user('manager'), reverse('auth-cache-stats'), None)),
+
+    Scenario('menu-items:list', 'get', lambda d, r: (
+        d.user('customer'), reverse('menu-items'),
+        r.choice([{}, {'ordering': '-price'}, {'category': r.choice(d.categories).slug}]))),
+    Scenario('menu-items:facets', 'get', lambda d, r: (
+        d.user('customer'), reverse('menu-items'),
+        {'facets': 'all', 'category': r.choice(d.categories).slug, 'price_max': r.randrange(5, 30)})),
+    Scenario('menu-items:create', 'post', lambda d, r: (
+        d.user('manager'), reverse('menu-items'),
+        {'title': 'Special', 'price': '9.99', 'featured': False, 'category_id': r.choice(d.categories).pk})),
+    Scenario('menu-item-detail:get', 'get', lambda d, r: (
+        d.user('customer'), reverse('menu-item-detail', kwargs={'pk': r.choice(d.menu_items).pk}), None)),
+    Scenario('menu-item-detail:patch', 'patch', lambda d, r: (
+        d.user('manager'), reverse('menu-item-detail', kwargs={'pk': r.choice(d.menu_items).pk}),
+        {'price': str(Decimal(r.randrange(200, 3000)) / 100)})),
+    Scenario('menu-item-detail:delete', 'delete', lambda d, r: (
+        d.user('manager'), reverse('menu-item-detail', kwargs={'pk': new_menu_item(d, r).pk}), None)),
+
+    Scenario('manager-users:list', 'get', lambda d, r: (d.user('manager'), reverse('manager-users'), None)),
+    Scenario('manager-users:add', 'post', lambda d, r: (
+        d.user('manager'), reverse('manager-users'), {'username': r.choice(d.spares).username})),
+    Scenario('remove-manager', 'delete', lambda d, r: (
+        d.user('manager'), reverse('remove-manager', kwargs={'pk': join_group(MANAGER_GROUP)(d, r).pk}), None)),
+    Scenario('delivery-crew-users:list', 'get', lambda d, r: (
+        d.user('manager'), reverse('delivery-crew-users'), None)),
+    Scenario('delivery-crew-users:add', 'post', lambda d, r: (
+        d.user('manager'), reverse('delivery-crew-users'), {'username': r.choice(d.spares).username})),
+    Scenario('remove-delivery-crew', 'delete', lambda d, r: (
+        d.user('manager'),
+        reverse('remove-delivery-crew', kwargs={'pk': join_group(DELIVERY_CREW_GROUP)(d, r).pk}), None)),
+
+    Scenario('cart:list', 'get', lambda d, r: (d.customers[r.randrange(0, len(d.customers), 10)],
+                                               reverse('cart-menu-items'), None), route='cart-menu-items'),
+    Scenario('cart:add', 'post', lambda d, r: (
+        d.user('customer'), reverse('cart-menu-items'),
+        [{'menu_item_id': item.pk, 'quantity': r.randint(0, 3)} for item in r.sample(d.menu_items, 5)]),
+        route='cart-menu-items'),
+    Scenario('cart:clear', 'delete', lambda d, r: (d.user('customer'), reverse('cart-menu-items'), None),
+             route='cart-menu-items'),
+
+    Scenario('orders:list:manager', 'get', lambda d, r: (d.user('manager'), reverse('orders'), None)),
+    Scenario('orders:list:crew', 'get', lambda d, r: (d.user('crew'), reverse('orders'), None)),
+    Scenario('orders:list:customer', 'get', lambda d, r: (d.user('customer'), reverse('orders'), None)),
+    Scenario('orders:checkout', 'post', lambda d, r: (
+        (lambda user: (fill_cart(user, r.sample(d.menu_items, 4)), user)[1])(d.user('customer')),
+        reverse('orders'), None)),
+    Scenario('order-export', 'get', lambda d, r: (d.user('manager'), reverse('order-export'), {'status': '0'})),
+    Scenario('order-dispatch', 'post', lambda d, r: (
+        d.user('manager'), reverse('order-dispatch'), {'auto': True, 'limit': 50})),
+    Scenario('sales-report', 'get', lambda d, r: (
+        d.user('manager'), reverse('sales-report'), {'group': r.choice(['day', 'menu-item', 'category'])})),
+    Scenario('order-detail:get', 'get', lambda d, r: (
+        (lambda order: (order.user, reverse('order-detail', kwargs={'pk': order.pk}), None))(r.choice(d.orders)))),
+    Scenario('order-detail:assign', 'patch', lambda d, r: (
+        d.user('manager'), reverse('order-detail', kwargs={'pk': r.choice(d.orders).pk}),
+        {'delivery_crew': d.user('crew').pk})),
+    Scenario('order-detail:deliver', 'patch', lambda d, r: (
+        (lambda order: (order.delivery_crew, reverse('order-detail', kwargs={'pk': order.pk}),
+                        {'status': r.randint(0, 1)}))(crew_order(d, r)))),
+    Scenario('order-events', 'get', lambda d, r: (d.user('crew'), reverse('order-events'), None), asgi=True),
+
+    Scenario('async-menu-items', 'get', lambda d, r: (d.user('customer'), reverse('async-menu-items'), None)),
+    Scenario('async-menu-item-detail', 'get', lambda d, r: (
+        d.user('customer'), reverse('async-menu-item-detail', kwargs={'pk': r.choice(d.menu_items).pk}), None)),
+    Scenario('async-cart-menu-items', 'get', lambda d, r: (
+        d.customers[r.randrange(0, len(d.customers), 10)], reverse('async-cart-menu-items'), None)),
+    Scenario('async-orders', 'get', lambda d, r: (d.user('manager'), reverse('async-orders'), None)),
+    Scenario('async-order-detail', 'get', lambda d, r: (
+        (lambda order: (order.user, reverse('async-order-detail', kwargs={'pk': order.pk}), None))(
+            r.choice(d.orders)))),
+]
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic dataset in a temporary database and report latency percentiles, '
+            'throughput and SQL query counts for every LittleLemonAPI route.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='Dataset size multiplier (default: 1).')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per scenario (default: 50).')
+        parser.add_argument('--only', nargs='*', default=[], help='Only run scenarios whose name starts with these.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and requests.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='Compare against the JSON results of an earlier run.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed relative p95 slowdown before a scenario counts as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when --compare finds a regression.')
+
+    def handle(self, *args, **options):
+        scenarios = [scenario for scenario in SCENARIOS
+                     if not options['only'] or scenario.name.startswith(tuple(options['only']))]
+        if not scenarios:
+            raise CommandError('No scenario matches --only.')
+
+        with temporary_database():
+            start = time.perf_counter()
+            dataset = Dataset(scale=options['scale'], seed=options['seed']).create()
+            self.stdout.write(f'Seeded scale {options["scale"]} in {time.perf_counter() - start:.1f}s')
+
+            client = APIClient()
+            results = {}
+            self.stdout.write(f'{"scenario":<26}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+                              f'{"req/s":>9}{"queries":>9}{"errors":>8}')
+            for scenario in scenarios:
+                summary = run_scenario(client, dataset, scenario, options['requests'])
+                results[scenario.name] = summary
+                self.stdout.write(
+                    f'{scenario.name:<26}{summary["p50_ms"]:>9}{summary["p95_ms"]:>9}{summary["p99_ms"]:>9}'
+                    f'{summary["throughput_rps"]:>9}{summary["queries_mean"]:>9}{summary["errors"]:>8}'
+                )
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'scale': options['scale'],
+                'requests': options['requests'],
+                'seed': options['seed'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = compare(results, json.load(baseline)['results'], options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(f'Regression: {regression}'))
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}.')
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions.'))
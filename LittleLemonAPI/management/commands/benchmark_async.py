@@ -0,0 +1,96 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.urls import reverse
+
+from LittleLemonAPI.benchmark import Dataset, summarize, temporary_database
+
+
+ENDPOINTS = {
+    'menu-items:list': lambda d, r: (d.user('customer'), 'menu-items', {}),
+    'menu-item-detail': lambda d, r: (d.user('customer'), 'menu-item-detail', {'pk': r.choice(d.menu_items).pk}),
+    'cart:list': lambda d, r: (d.customers[r.randrange(0, len(d.customers), 10)], 'cart-menu-items', {}),
+    'orders:list': lambda d, r: (d.user('manager'), 'orders', {}),
+    'order-detail': lambda d, r: (
+        (lambda order: (order.user, 'order-detail', {'pk': order.pk}))(r.choice(d.orders))),
+}
+
+
+async def run_load(client, requests, concurrency):
+    """Send ``requests`` with at most ``concurrency`` in flight and time each one.
+
+    Returns the per-request durations, the error count and the wall time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    durations, errors = [], 0
+
+    async def send(url, headers):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            durations.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(url, headers) for url, headers in requests))
+    return durations, errors, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = ('Compare the sync read views with their async counterparts under concurrent load '
+            'through the ASGI handler, in a temporary database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='Dataset size multiplier (default: 1).')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint and concurrency level (default: 200).')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64],
+                            help='Numbers of requests in flight to measure (default: 1 8 32 64).')
+        parser.add_argument('--only', nargs='*', default=[], help='Only run endpoints whose name starts with these.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and requests.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        endpoints = {name: prepare for name, prepare in ENDPOINTS.items()
+                     if not options['only'] or name.startswith(tuple(options['only']))}
+        if not endpoints:
+            raise CommandError('No endpoint matches --only.')
+
+        with temporary_database():
+            dataset = Dataset(scale=options['scale'], seed=options['seed']).create()
+            results = asyncio.run(self.run(dataset, endpoints, options))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+    async def run(self, dataset, endpoints, options):
+        client = AsyncClient()
+        results = {}
+        self.stdout.write(f'{"endpoint":<20}{"view":>6}{"conc":>6}{"p50 ms":>9}{"p95 ms":>9}'
+                          f'{"req/s":>9}{"errors":>8}')
+        for name, prepare in endpoints.items():
+            for concurrency in options['concurrency']:
+                requests = []
+                for _ in range(options['requests']):
+                    user, url_name, kwargs = prepare(dataset, dataset.random)
+                    headers = {'Authorization': f'Token {dataset.tokens[user.pk]}'}
+                    requests.append((url_name, kwargs, headers))
+
+                for kind, prefix in (('sync', ''), ('async', 'async-')):
+                    load = [(reverse(f'{prefix}{url_name}', kwargs=kwargs), headers)
+                            for url_name, kwargs, headers in requests]
+                    await run_load(client, load[:concurrency], concurrency)  # warm up
+                    durations, errors, wall = await run_load(client, load, concurrency)
+                    summary = summarize(durations, errors=errors)
+                    summary['throughput_rps'] = round(len(durations) / wall, 1)
+                    results.setdefault(name, {}).setdefault(kind, {})[concurrency] = summary
+                    self.stdout.write(f'{name:<20}{kind:>6}{concurrency:>6}{summary["p50_ms"]:>9}'
+                                      f'{summary["p95_ms"]:>9}{summary["throughput_rps"]:>9}'
+                                      f'{summary["errors"]:>8}')
+        return results
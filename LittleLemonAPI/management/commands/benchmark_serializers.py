@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from LittleLemonAPI import fastpath
+from LittleLemonAPI.benchmark import median, measure, temporary_database
+from LittleLemonAPI.models import Category, MenuItem, Order, OrderItem
+from LittleLemonAPI.renderers import FastJSONRenderer, orjson
+from LittleLemonAPI.serializers import MenuItemSerializer, OrderSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare serializer + JSONRenderer throughput with the fast read path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per list (default: 500).')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per path (default: 20).')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with temporary_database():
+            self.seed(rows)
+            menu_items = MenuItem.objects.select_related('category').order_by('id')
+            orders = Order.objects.with_details().order_by('id')
+
+            cases = [
+                ('menu items', lambda: self.slow(menu_items, MenuItemSerializer),
+                 lambda: self.fast(fastpath.menu_item_rows(fastpath.menu_item_values(menu_items)))),
+                ('orders', lambda: self.slow(orders, OrderSerializer),
+                 lambda: self.fast(fastpath.order_rows(list(fastpath.order_values(orders))))),
+            ]
+            self.stdout.write(f'{rows} rows per list, median of {repeat} runs, '
+                              f'orjson {"enabled" if orjson else "not installed"}')
+            for name, slow, fast in cases:
+                if slow() != fast():
+                    self.stderr.write(f'{name}: fast path output differs from the serializer')
+                slow_time = median(measure(slow, repeat))
+                fast_time = median(measure(fast, repeat))
+                self.stdout.write(
+                    f'{name:<12} serializer {rows / slow_time:>10,.0f} rows/s   '
+                    f'fast path {rows / fast_time:>10,.0f} rows/s   '
+                    f'speedup {slow_time / fast_time:.1f}x'
+                )
+
+    def slow(self, queryset, serializer_class):
+        return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+    def fast(self, data):
+        return FastJSONRenderer().render(data)
+
+    def seed(self, rows):
+        user = User.objects.create_user('benchmark')
+        category = Category.objects.create(slug='mains', title='Mains')
+        menu_items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Dish {number}', price=Decimal('9.50'), featured=bool(number % 2),
+                     category=category)
+            for number in range(rows)
+        )
+        orders = Order.objects.bulk_create(Order(user=user, total=Decimal('28.50')) for _ in range(rows))
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menu_item=menu_item, quantity=3,
+                      unit_price=Decimal('9.50'), price=Decimal('28.50'))
+            for order in orders for menu_item in menu_items[:3]
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemon.search import indexes
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes of menu items from their tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*',
+                            help='Only rebuild the indexes of these models, as app_label.Model (default: all).')
+
+    def handle(self, *args, **options):
+        selected = [index for index in indexes
+                    if not options['models'] or index.model._meta.label in options['models']]
+        if not selected:
+            raise CommandError(f'No search index for {", ".join(options["models"])}.')
+        for index in selected:
+            count = index.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {index.model._meta.label} rows.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from LittleLemonAPI.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recompute order totals from their items in a single UPDATE statement.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('order_ids', nargs='*', type=int,
+                            help='Only recompute these orders (default: all orders).')
+        parser.add_argument('--since', help='Only recompute orders placed on or after this date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options['order_ids']:
+            orders = orders.filter(pk__in=options['order_ids'])
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError('--since must be a valid date in YYYY-MM-DD format.')
+            orders = orders.filter(date__gte=since)
+        updated = orders.recompute_totals()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed totals of {updated} orders.'))
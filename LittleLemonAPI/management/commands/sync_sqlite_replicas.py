@@ -0,0 +1,45 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database onto every replica in REPLICA_DATABASES, '
+            'for exercising read replicas locally.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep copying every INTERVAL seconds instead of once.')
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, 'REPLICA_DATABASES', [])
+        if not replicas:
+            raise CommandError('No replicas configured; set LITTLELEMON_SQLITE_REPLICAS.')
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"Database '{alias}' is not SQLite.")
+
+        while True:
+            self.sync(replicas)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, replicas):
+        source = sqlite3.connect(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+        try:
+            for alias in replicas:
+                connections[alias].close()
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+                try:
+                    # The online backup API gives a consistent copy even while
+                    # the primary is being written to.
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'Copied {DEFAULT_DB_ALIAS} to {alias}.')
+        finally:
+            source.close()
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from LittleLemon.search import create_index_tables, drop_index_tables
+
+
+def create_search_index(apps, schema_editor):
+    create_index_tables(schema_editor, 'LittleLemonAPI_menuitem_fts', 'LittleLemonAPI_menuitem', ['title'])
+
+
+def drop_search_index(apps, schema_editor):
+    drop_index_tables(schema_editor, 'LittleLemonAPI_menuitem_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0003_role_scoped_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    """Roll up the orders placed before the rollup tables existed."""
+    Order = apps.get_model('LittleLemonAPI', 'Order')
+    OrderItem = apps.get_model('LittleLemonAPI', 'OrderItem')
+    DailySales = apps.get_model('LittleLemonAPI', 'DailySales')
+    DailyMenuItemSales = apps.get_model('LittleLemonAPI', 'DailyMenuItemSales')
+    DailyCategorySales = apps.get_model('LittleLemonAPI', 'DailyCategorySales')
+    db = schema_editor.connection.alias
+
+    items = OrderItem.objects.using(db).order_by()
+    days = {
+        row['order__date']: row
+        for row in items.values('order__date').annotate(quantity=Sum('quantity'), revenue=Sum('price'))
+    }
+    DailySales.objects.using(db).bulk_create(
+        DailySales(date=row['date'], orders=row['count'],
+                   items=days.get(row['date'], {}).get('quantity') or 0,
+                   revenue=days.get(row['date'], {}).get('revenue') or 0)
+        for row in Order.objects.using(db).order_by().values('date').annotate(count=Count('id'))
+    )
+    DailyMenuItemSales.objects.using(db).bulk_create(
+        DailyMenuItemSales(date=row['order__date'], menu_item_id=row['menu_item_id'],
+                           quantity=row['quantity'], revenue=row['revenue'])
+        for row in items.values('order__date', 'menu_item_id').annotate(quantity=Sum('quantity'),
+                                                                         revenue=Sum('price'))
+    )
+    DailyCategorySales.objects.using(db).bulk_create(
+        DailyCategorySales(date=row['order__date'], category_id=row['menu_item__category_id'],
+                           quantity=row['quantity'], revenue=row['revenue'])
+        for row in items.values('order__date', 'menu_item__category_id').annotate(quantity=Sum('quantity'),
+                                                                                  revenue=Sum('price'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0005_category_slug_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('items', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='LittleLemonAPI.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='unique_daily_category_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyMenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='LittleLemonAPI.menuitem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'menu_item'), name='unique_daily_menu_item_sales')],
+            },
+        ),
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,13 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
-from .utils import update_order_total
-
 # Create your models here.
 class Category(models.Model):
-    slug = models.SlugField()
+    slug = models.SlugField(unique=True)
     title = models.CharField(max_length=255, db_index=True)
 
     def __str__(self):
@@ -29,16 +31,54 @@ class Cart(models.Model):
 
     class Meta:
         unique_together = ('menu_item', 'user')
+        indexes = [
+            models.Index(fields=['user', 'menu_item'], name='cart_user_menu_item_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} : {self.menu_item}"
     
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """Load the customer and every item with its menu item up front."""
+        return self.select_related('user').prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.select_related('menu_item'))
+        )
+
+    def recompute_totals(self):
+        """Recompute ``total`` for every order in the queryset with one UPDATE."""
+        item_totals = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum('price'))
+            .values('total')
+        )
+        return self.update(
+            total=Coalesce(Subquery(item_totals), Value(Decimal('0.00')),
+                           output_field=models.DecimalField(max_digits=6, decimal_places=2))
+        )
+
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     delivery_crew = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="delivery_crew", null=True)
     status = models.BooleanField(db_index=True, default=0)
     total = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
     date = models.DateField(db_index=True, auto_now_add=True)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_order_idempotency_key'),
+        ]
+        indexes = [
+            # Match the role-scoped order listings, which sort by date.
+            models.Index(fields=['delivery_crew', 'status', 'date'], name='order_crew_status_date_idx'),
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+            models.Index(fields=['status', 'date'], name='order_status_date_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -54,12 +94,46 @@ class OrderItem(models.Model):
     def save(self, *args, **kwargs):
         self.unit_price = self.menu_item.price
         self.price = self.unit_price * self.quantity
+        adding = self._state.adding
         super().save(*args, **kwargs)
-        update_order_total(self.order)
-    
+        orders = Order.objects.filter(pk=self.order_id)
+        if adding:
+            orders.update(total=F('total') + self.price)
+        else:
+            orders.recompute_totals()
+
     def delete(self, *args, **kwargs):
-        order = self.order 
-        super().delete(*args, **kwargs)
-        update_order_total(order)
+        result = super().delete(*args, **kwargs)
+        Order.objects.filter(pk=self.order_id).update(total=F('total') - self.price)
+        return result
 
-        
\ No newline at end of file
+
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'menu_item'], name='unique_daily_menu_item_sales'),
+        ]
+
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='unique_daily_category_sales'),
+        ]
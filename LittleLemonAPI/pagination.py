@@ -0,0 +1,172 @@
+"""Pagination for the Little Lemon API."""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _invert(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def _row_value(row, field):
+    if isinstance(row, dict):
+        return row[field]
+    for attr in field.split('__'):
+        row = getattr(row, attr)
+    return row
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a composite ordering such as ``('-date', '-id')``.
+
+    A page is selected with a keyset filter on the last row of the previous
+    page instead of an OFFSET, and no COUNT(*) is issued, so every page costs
+    the same however deep the client has scrolled. The last ordering field
+    must be unique; ``id`` is appended as a tie-breaker when it is missing.
+    """
+
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'LITTLELEMON_MAX_PAGE_SIZE', 100)
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Return the sliced queryset for the requested page.
+
+        Split from ``set_page`` so the rows can be fetched by async callers.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = _invert(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            # The values come from the client; ones the fields cannot take are a bad cursor.
+            try:
+                queryset = queryset.filter(self.keyset_filter(ordering, self.position))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', None) or []:
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    break
+        ordering = [{'pk': 'id', '-pk': '-id'}.get(field, field)
+                    for field in ordering or self.ordering]
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def keyset_filter(self, ordering, position):
+        """Build ``(a > x) OR (a = x AND b > y) OR ...`` for the given position."""
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        condition = Q()
+        for index, (field, descending) in enumerate(fields):
+            lookup = 'lt' if descending else 'gt'
+            branch = Q(**{f'{field}__{lookup}': position[index]})
+            for (previous, _), value in zip(fields[:index], position):
+                branch &= Q(**{previous: value})
+            condition |= branch
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.GET.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse):
+        position = [_row_value(row, field.lstrip('-')) for field in self.ordering]
+        cursor = {'p': position, 'r': 1} if reverse else {'p': position}
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, default=str).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OrderPagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+
+class MenuItemPagination(KeysetPagination):
+    ordering = ('id',)
@@ -0,0 +1,98 @@
+"""Renderers for the Little Lemon API."""
+
+import csv
+import datetime
+import io
+import json
+import re
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson writes floats below 1e-4 or from 1e16 up differently from json
+# ("1e16" for "1e+16", "0.00001" for "1e-05"); this finds them, and at
+# worst some strings that look alike.
+_DIVERGENT_FLOAT = re.compile(rb'\de-?\d|0\.0000\d')
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    if isinstance(obj, datetime.datetime):
+        return _drf_encoder.default(obj)
+    raise TypeError
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what JSONRenderer produces with the default
+    compact, unicode settings. Datetimes are formatted by DRF's encoder
+    (UTC as ``Z``). Indented or ASCII-only output, data orjson cannot encode
+    natively (such as Decimal) and floats orjson formats differently fall
+    back to JSONRenderer. Non-finite floats, which JSONRenderer refuses,
+    come out as null. Used by the fast read path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if _DIVERGENT_FLOAT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Match JSONRenderer, which escapes these for use inside JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON, one document per line.
+
+    Streaming views write their rows directly; this renders everything
+    else, such as error details, as a single line.
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False).encode() + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Comma-separated values with a header row.
+
+    Streaming views write their rows directly; this renders everything
+    else, such as error details, as a header and one row.
+    """
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        if rows and isinstance(rows[0], dict):
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+            writer.writeheader()
+        else:
+            writer = csv.writer(buffer)
+        writer.writerows(rows)
+        return buffer.getvalue().encode()
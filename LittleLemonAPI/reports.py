@@ -0,0 +1,250 @@
+"""Sales rollups and reports for the Little Lemon API.
+
+``DailySales``, ``DailyMenuItemSales`` and ``DailyCategorySales`` are kept
+up to date incrementally, with one ``INSERT ... ON CONFLICT DO UPDATE`` per
+table. Signal receivers count every created order, however it was made,
+and subtract every deleted one. Order items saved or deleted one by one,
+and the sales of deleted menu items, are applied as deltas; checkout adds
+the items it bulk-creates itself. Items created or changed with other
+bulk operations are picked up by the ``backfill_sales_rollups`` command,
+which recomputes whole days. Migration 0006 fills the rollups for the
+orders that existed before them.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Sum
+from django.utils.dateparse import parse_date
+
+from .models import DailyCategorySales, DailyMenuItemSales, DailySales, Order, OrderItem
+
+
+def _upsert(using, model, key_columns, rows):
+    """Add ``rows`` to the counters of ``model``, inserting missing rows.
+
+    Every column other than ``key_columns`` is incremented.
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = list(rows[0])
+    counters = [column for column in columns if column not in key_columns]
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} ({", ".join(map(quote, columns))}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({", ".join(map(quote, key_columns))}) DO UPDATE SET '
+        + ', '.join(f'{quote(column)} = {quote(model._meta.db_table)}.{quote(column)} + excluded.{quote(column)}'
+                    for column in counters)
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[row[column] for column in columns] for row in rows])
+
+
+def apply_sales(date, lines, orders=1):
+    """Add ``orders`` orders made of ``lines`` to the rollups of ``date``.
+
+    ``lines`` are ``(menu_item_id, category_id, quantity, revenue)`` tuples;
+    pass negative quantities, revenues and ``orders`` to subtract. Call it
+    inside the transaction that creates or deletes the order.
+    """
+    using = router.db_for_write(DailySales)
+    by_item, by_category = defaultdict(lambda: [0, Decimal(0)]), defaultdict(lambda: [0, Decimal(0)])
+    for menu_item_id, category_id, quantity, revenue in lines:
+        for totals in (by_item[menu_item_id], by_category[category_id]):
+            totals[0] += quantity
+            totals[1] += revenue
+
+    _upsert(using, DailySales, ['date'], [{
+        'date': date,
+        'orders': orders,
+        'items': sum(quantity for _, _, quantity, _ in lines),
+        'revenue': sum((revenue for _, _, _, revenue in lines), Decimal(0)),
+    }])
+    _upsert(using, DailyMenuItemSales, ['date', 'menu_item_id'], [
+        {'date': date, 'menu_item_id': pk, 'quantity': quantity, 'revenue': revenue}
+        for pk, (quantity, revenue) in by_item.items()
+    ])
+    _upsert(using, DailyCategorySales, ['date', 'category_id'], [
+        {'date': date, 'category_id': pk, 'quantity': quantity, 'revenue': revenue}
+        for pk, (quantity, revenue) in by_category.items()
+    ])
+
+
+def count_order(order):
+    """Add a newly created order, without its items, to the rollups."""
+    apply_sales(order.date, [])
+
+
+def record_items(order, items):
+    """Add the bulk-created ``OrderItem`` objects of an order to the rollups.
+
+    Items saved one by one are added by a signal receiver instead. The
+    items' menu items should already be loaded.
+    """
+    apply_sales(order.date, [
+        (item.menu_item_id, item.menu_item.category_id, item.quantity, item.price) for item in items
+    ], orders=0)
+
+
+def retract_order(order):
+    """Subtract an order that is about to be deleted from the rollups.
+    """
+    lines = [
+        (menu_item_id, category_id, -quantity, -price)
+        for menu_item_id, category_id, quantity, price in OrderItem.objects.filter(order=order).values_list(
+            'menu_item_id', 'menu_item__category_id', 'quantity', 'price')
+    ]
+    apply_sales(order.date, lines, orders=-1)
+
+
+def order_item_lines(items, sign=1):
+    """The ``(date, menu_item_id, category_id, quantity, revenue)`` sales
+    lines of an ``OrderItem`` queryset, negated with ``sign=-1``.
+    """
+    return [
+        (date, menu_item_id, category_id, sign * quantity, sign * price)
+        for date, menu_item_id, category_id, quantity, price in items.values_list(
+            'order__date', 'menu_item_id', 'menu_item__category_id', 'quantity', 'price')
+    ]
+
+
+def apply_item_changes(lines):
+    """Add dated sales lines to the rollups of their days without counting
+    orders, skipping the lines that cancel out.
+    """
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for date, menu_item_id, category_id, quantity, revenue in lines:
+        line = totals[date, menu_item_id, category_id]
+        line[0] += quantity
+        line[1] += revenue
+    by_date = defaultdict(list)
+    for (date, menu_item_id, category_id), (quantity, revenue) in totals.items():
+        if quantity or revenue:
+            by_date[date].append((menu_item_id, category_id, quantity, revenue))
+    for date, day_lines in by_date.items():
+        apply_sales(date, day_lines, orders=0)
+
+
+def backfill(date_from, date_to, chunk_days=31):
+    """Recompute the rollups of every day in ``[date_from, date_to]`` from orders.
+
+    Days are processed ``chunk_days`` at a time, each chunk in its own
+    transaction with a handful of aggregate queries. Yields each chunk's
+    ``(first_day, last_day, orders)`` as it is committed.
+    """
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=chunk_days - 1), date_to)
+        with transaction.atomic(using=router.db_for_write(DailySales)):
+            yield start, end, _rebuild_days(start, end)
+        start = end + timedelta(days=1)
+
+
+def _rebuild_days(start, end):
+    for model in (DailySales, DailyMenuItemSales, DailyCategorySales):
+        model.objects.filter(date__range=(start, end)).delete()
+
+    items = OrderItem.objects.filter(order__date__range=(start, end)).order_by()
+    orders = dict(
+        Order.objects.filter(date__range=(start, end)).order_by().values('date')
+        .annotate(count=Count('id')).values_list('date', 'count')
+    )
+    days = {
+        row['order__date']: row
+        for row in items.values('order__date').annotate(quantity=Sum('quantity'), revenue=Sum('price'))
+    }
+    DailySales.objects.bulk_create(
+        DailySales(date=date, orders=count, items=days.get(date, {}).get('quantity') or 0,
+                   revenue=days.get(date, {}).get('revenue') or 0)
+        for date, count in orders.items()
+    )
+    DailyMenuItemSales.objects.bulk_create(
+        DailyMenuItemSales(date=row['order__date'], menu_item_id=row['menu_item_id'],
+                           quantity=row['quantity'], revenue=row['revenue'])
+        for row in items.values('order__date', 'menu_item_id').annotate(quantity=Sum('quantity'),
+                                                                         revenue=Sum('price'))
+    )
+    DailyCategorySales.objects.bulk_create(
+        DailyCategorySales(date=row['order__date'], category_id=row['menu_item__category_id'],
+                           quantity=row['quantity'], revenue=row['revenue'])
+        for row in items.values('order__date', 'menu_item__category_id').annotate(quantity=Sum('quantity'),
+                                                                                  revenue=Sum('price'))
+    )
+    return sum(orders.values())
+
+
+def parse_date_range(params):
+    """Read ``date_from`` and ``date_to``; raises ``ValueError`` on bad input.
+    """
+    dates = []
+    for param in ('date_from', 'date_to'):
+        value = params.get(param)
+        date = parse_date(value) if value else None
+        if value and date is None:
+            raise ValueError(f"'{param}' must be a date in YYYY-MM-DD format.")
+        dates.append(date)
+    return dates
+
+
+def _in_range(queryset, date_from, date_to):
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
+
+def sales_report(group, date_from=None, date_to=None):
+    """Revenue between two dates from the rollups, per day, menu item or category.
+    """
+    if group == 'day':
+        rows = _in_range(DailySales.objects.all(), date_from, date_to).order_by('date')
+        results = [
+            {'date': row.date.isoformat(), 'orders': row.orders, 'items': row.items,
+             'revenue': f'{row.revenue:.2f}'}
+            for row in rows
+        ]
+    elif group == 'menu-item':
+        rows = (
+            _in_range(DailyMenuItemSales.objects.all(), date_from, date_to)
+            .values('menu_item_id', 'menu_item__title')
+            .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+            .order_by('-total_revenue', 'menu_item_id')
+        )
+        results = [
+            {'menu_item': row['menu_item_id'], 'title': row['menu_item__title'],
+             'quantity': row['total_quantity'], 'revenue': f'{row["total_revenue"]:.2f}'}
+            for row in rows
+        ]
+    elif group == 'category':
+        rows = (
+            _in_range(DailyCategorySales.objects.all(), date_from, date_to)
+            .values('category_id', 'category__slug', 'category__title')
+            .annotate(total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+            .order_by('-total_revenue', 'category_id')
+        )
+        results = [
+            {'category': row['category_id'], 'slug': row['category__slug'], 'title': row['category__title'],
+             'quantity': row['total_quantity'], 'revenue': f'{row["total_revenue"]:.2f}'}
+            for row in rows
+        ]
+    else:
+        raise ValueError("'group' must be day, menu-item or category.")
+
+    totals = _in_range(DailySales.objects.all(), date_from, date_to).aggregate(
+        orders=Sum('orders'), items=Sum('items'), revenue=Sum('revenue'))
+    return {
+        'date_from': date_from.isoformat() if date_from else None,
+        'date_to': date_to.isoformat() if date_to else None,
+        'group': group,
+        'totals': {
+            'orders': totals['orders'] or 0,
+            'items': totals['items'] or 0,
+            'revenue': f'{totals["revenue"] or 0:.2f}',
+        },
+        'results': results,
+    }
@@ -0,0 +1,8 @@
+"""Full-text search indexes of the Little Lemon API."""
+
+from LittleLemon.search import SearchIndex
+
+from .models import MenuItem
+
+
+menu_item_index = SearchIndex(MenuItem, ['title'])
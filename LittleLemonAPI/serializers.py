@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 
+from LittleLemon.metrics import TimedSerializerMixin
+
 from .models import Category, MenuItem, Cart, OrderItem, Order
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -23,19 +25,19 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class CurrentUserSerializer(serializers.ModelSerializer):
+class CurrentUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source='category', write_only=True
@@ -45,7 +47,7 @@ class MenuItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'price', 'featured', 'category', 'category_id']
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     item = serializers.ReadOnlyField(source='menu_item.title')
 
     class Meta:
@@ -53,7 +55,16 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ['item', 'quantity', 'unit_price', 'price']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class CartEntrySerializer(TimedSerializerMixin, serializers.Serializer):
+    menu_item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=32767)
+
+
+class CartRemoveSerializer(TimedSerializerMixin, serializers.Serializer):
+    menu_item_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     item = serializers.ReadOnlyField(source='menu_item.title')
     class Meta:
         model = OrderItem
@@ -61,7 +72,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['unit_price', 'price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = serializers.ReadOnlyField(source='user.username')
     class Meta:
@@ -69,3 +80,18 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'delivery_crew', 'status', 'total', 'date', 'items']
         read_only_fields = ['total']
 
+
+class DispatchAssignmentSerializer(TimedSerializerMixin, serializers.Serializer):
+    order = serializers.IntegerField()
+    delivery_crew = serializers.IntegerField()
+
+
+class DispatchSerializer(TimedSerializerMixin, serializers.Serializer):
+    assignments = DispatchAssignmentSerializer(many=True, required=False)
+    auto = serializers.BooleanField(default=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('assignments') and not attrs['auto']:
+            raise serializers.ValidationError("Provide 'assignments', 'auto' or both.")
+        return attrs
@@ -0,0 +1,117 @@
+"""Signal receivers for the Little Lemon API."""
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+from .cache import bump_catalog_version
+from .models import Category, MenuItem, Order, OrderItem
+from .reports import apply_item_changes, count_order, order_item_lines, retract_order
+from .search import menu_item_index
+from .utils import forget_roles, invalidate_roles
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_catalog(sender, **kwargs):
+    # After commit, or a concurrent read could cache the old rows under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, **kwargs):
+    menu_item_index.update(instance)
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, **kwargs):
+    menu_item_index.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Covers deactivation and password changes, which both save the user;
+    # logins only touch last_login.
+    if not created and set(update_fields or ()) != {'last_login'}:
+        invalidate_tokens(*Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=Order)
+def count_order_sales(sender, instance, created, **kwargs):
+    if created:
+        count_order(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def retract_order_sales(sender, instance, **kwargs):
+    retract_order(instance)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_order_item_sales(sender, instance, raw=False, **kwargs):
+    # Fixtures may overwrite existing rows, so raw saves look them up too.
+    existing = instance.pk is not None and (raw or not instance._state.adding)
+    instance._previous_sales = order_item_lines(OrderItem.objects.filter(pk=instance.pk), -1) if existing else []
+
+
+@receiver(post_save, sender=OrderItem)
+def update_order_item_sales(sender, instance, **kwargs):
+    # Checkout bulk-creates its items and records them itself.
+    apply_item_changes(instance.__dict__.pop('_previous_sales', [])
+                       + order_item_lines(OrderItem.objects.filter(pk=instance.pk)))
+
+
+@receiver(pre_delete, sender=OrderItem)
+def retract_order_item_sales(sender, instance, origin=None, **kwargs):
+    # Deleted orders and menu items retract all of their items at once.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is OrderItem:
+        apply_item_changes(order_item_lines(OrderItem.objects.filter(pk=instance.pk), -1))
+
+
+@receiver(pre_delete, sender=MenuItem)
+def retract_menu_item_sales(sender, instance, **kwargs):
+    items = OrderItem.objects.filter(menu_item=instance)
+    apply_item_changes(order_item_lines(items, -1))
+    instance._affected_orders = list(items.values_list('order_id', flat=True))
+
+
+@receiver(post_delete, sender=MenuItem)
+def update_affected_order_totals(sender, instance, **kwargs):
+    order_ids = instance.__dict__.pop('_affected_orders', None)
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids).recompute_totals()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_member_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_roles(instance)
+    elif action in ('post_add', 'post_remove'):
+        forget_roles(pk_set)
+    elif action == 'pre_clear':
+        # The members are gone by post_clear.
+        forget_roles(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_roles(sender, instance, created=False, **kwargs):
+    # Roles are group names, so a rename changes them too.
+    if not created:
+        forget_roles(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_roles(sender, instance, **kwargs):
+    forget_roles([instance.pk])
@@ -0,0 +1,85 @@
+"""Test helpers for the Little Lemon API."""
+
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class QueryBudgetMixin:
+    """Fail a test when a block of code issues more SQL than it is allowed.
+
+    ``query_budgets`` maps URL names from ``LittleLemonAPI/urls.py`` to the
+    maximum number of queries a request to that endpoint may run.
+    """
+
+    query_budgets = {}
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label='block', using='default'):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{label} ran {executed} queries, over its budget of {budget}:\n{queries}'
+            )
+
+    def request_within_budget(self, method, url_name, *, budget=None, kwargs=None,
+                              query=None, data=None, format='json'):
+        """Call an endpoint through ``self.client`` and enforce its query budget.
+        """
+        if budget is None:
+            budget = self.query_budgets[url_name]
+        url = reverse(url_name, kwargs=kwargs)
+        with self.assertQueryBudget(budget, label=f'{method.upper()} {url}'):
+            if method.lower() == 'get':
+                response = self.client.get(url, query)
+            else:
+                response = getattr(self.client, method.lower())(url, data, format=format)
+        return response
+
+
+class QueryPlanMixin:
+    """Fail a test when a filtered query is planned as a full table scan.
+
+    Every SELECT issued inside ``assertUsesIndexes`` is run through the
+    database's EXPLAIN. Unfiltered queries are skipped, since reading the
+    whole table (or the first page of it) is what they ask for.
+    """
+
+    def explain(self, sql, using='default'):
+        connection = connections[using]
+        prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+    def full_table_scans(self, plan, vendor):
+        if vendor == 'sqlite':
+            scans = [re.search(r'\bSCAN (\S+)(.*)', line) for line in plan]
+            return [match[1] for match in scans if match and 'USING' not in match[2]]
+        if vendor == 'postgresql':
+            return re.findall(r'Seq Scan on (\S+)', '\n'.join(plan))
+        return []
+
+    @contextmanager
+    def assertUsesIndexes(self, allow=(), using='default'):
+        connection = connections[using]
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or ' WHERE ' not in sql:
+                continue
+            plan = self.explain(sql, using)
+            scanned = [table.strip('"`') for table in self.full_table_scans(plan, connection.vendor)]
+            scanned = [table for table in scanned if table not in allow]
+            if scanned:
+                self.fail(f'Full table scan of {", ".join(scanned)}:\n{sql}\n' + '\n'.join(plan))
@@ -1,3 +1,1319 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import datetime
+import io
+import json
+import tempfile
+import zoneinfo
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from LittleLemon.db_router import PIN_COOKIE, ReplicaRouter, replica_reads
+from LittleLemon.metrics import registry
+
+from .authentication import token_cache
+from .events import CacheBackend, InProcessBackend, can_see, get_backend, order_event, unassign_event
+from .models import Category, MenuItem, Cart, DailyMenuItemSales, DailySales, Order, OrderItem
+from .pagination import MenuItemPagination
+from .renderers import FastJSONRenderer
+from .testing import QueryBudgetMixin, QueryPlanMixin
+from .throttling import CacheBucketStore, LocalBucketStore, consume, get_store
+from .utils import get_roles, role_cache
+
+
+class LittleLemonTestCase(APITestCase):
+    """Seed a small restaurant with one user per role."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager_group = Group.objects.create(name='Manager')
+        cls.crew_group = Group.objects.create(name='Delivery Crew')
+
+        cls.manager = User.objects.create_user('manager', password='pass')
+        cls.manager.groups.add(cls.manager_group)
+        cls.crew = User.objects.create_user('crew', password='pass')
+        cls.crew.groups.add(cls.crew_group)
+        cls.customer = User.objects.create_user('customer', password='pass')
+
+        cls.mains = Category.objects.create(slug='mains', title='Mains')
+        cls.desserts = Category.objects.create(slug='desserts', title='Desserts')
+        cls.menu_items = [
+            MenuItem.objects.create(
+                title=f'Dish {number}', price=Decimal('5.50') + number,
+                featured=number % 2 == 0,
+                category=cls.mains if number % 2 else cls.desserts,
+            )
+            for number in range(8)
+        ]
+
+    def setUp(self):
+        role_cache.clear()
+        token_cache.clear()
+        cache.clear()
+        get_store().clear()
+
+    def create_orders(self, count, user=None, delivery_crew=None, lines=3):
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(user=user or self.customer, delivery_crew=delivery_crew)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menu_item=item, quantity=2,
+                          unit_price=item.price, price=item.price * 2)
+                for item in self.menu_items[:lines]
+            )
+            orders.append(order)
+        return orders
+
+
+class QueryBudgetTests(QueryBudgetMixin, LittleLemonTestCase):
+    query_budgets = {
+        # The role throttle loads the caller's groups once, then caches them.
+        'menu-items': 2,
+        'menu-item-detail': 1,
+        'cart-menu-items': 3,
+        'orders': 3,
+        'order-detail': 3,
+    }
+
+    def test_order_list_is_constant_in_page_size(self):
+        self.create_orders(20, delivery_crew=self.crew, lines=5)
+        self.client.force_authenticate(self.manager)
+        for page_size in (1, 20):
+            response = self.request_within_budget('get', 'orders', query={'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_order_list_for_each_role(self):
+        self.create_orders(5, delivery_crew=self.crew)
+        for user in (self.manager, self.crew, self.customer):
+            self.client.force_authenticate(user)
+            response = self.request_within_budget('get', 'orders')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['results'][0]['items'])
+
+    def test_order_detail(self):
+        order, = self.create_orders(1, lines=6)
+        self.client.force_authenticate(self.customer)
+        response = self.request_within_budget('get', 'order-detail', kwargs={'pk': order.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 6)
+        self.assertEqual(response.data['user'], 'customer')
+
+    def test_menu_items(self):
+        self.client.force_authenticate(self.customer)
+        response = self.request_within_budget('get', 'menu-items')
+        self.assertEqual(response.status_code, 200)
+        response = self.request_within_budget(
+            'get', 'menu-item-detail', kwargs={'pk': self.menu_items[0].pk}
+        )
+        self.assertEqual(response.data['category']['slug'], 'desserts')
+
+    def test_cart(self):
+        Cart.objects.bulk_create(
+            Cart(user=self.customer, menu_item=item, quantity=1,
+                 unit_price=item.price, price=item.price)
+            for item in self.menu_items
+        )
+        self.client.force_authenticate(self.customer)
+        response = self.request_within_budget('get', 'cart-menu-items')
+        self.assertEqual(response.status_code, 200)
+
+    def test_budget_failure_reports_queries(self):
+        with self.assertRaisesMessage(AssertionError, 'over its budget of 0'):
+            with self.assertQueryBudget(0):
+                list(Order.objects.all())
+
+
+class RoleCacheTests(LittleLemonTestCase):
+    def roles(self, user):
+        return get_roles(User.objects.get(pk=user.pk))
+
+    def test_roles_are_loaded_once(self):
+        self.assertEqual(self.roles(self.manager), {'Manager'})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.roles(self.manager), {'Manager'})
+        self.assertEqual(role_cache.stats()['hits'], 1)
+
+    def test_membership_changes_anywhere_invalidate_roles(self):
+        for user in (self.manager, self.crew, self.customer):
+            self.roles(user)
+        self.customer.groups.add(self.crew_group)
+        self.assertEqual(self.roles(self.customer), {'Delivery Crew'})
+        self.manager_group.user_set.add(self.customer)
+        self.assertEqual(self.roles(self.customer), {'Delivery Crew', 'Manager'})
+        self.manager_group.user_set.remove(self.customer)
+        self.assertEqual(self.roles(self.customer), {'Delivery Crew'})
+        self.customer.groups.clear()
+        self.assertEqual(self.roles(self.customer), set())
+        self.crew_group.user_set.clear()
+        self.assertEqual(self.roles(self.crew), set())
+
+        self.manager_group.name = 'Owner'
+        self.manager_group.save()
+        self.assertEqual(self.roles(self.manager), {'Owner'})
+        self.manager_group.delete()
+        self.assertEqual(self.roles(self.manager), set())
+
+    def test_deleted_users_are_forgotten(self):
+        self.roles(self.crew)
+        self.crew.delete()
+        self.assertIsNone(role_cache.get(self.crew.pk))
+
+    def test_invalidation_is_repeated_on_commit(self):
+        self.roles(self.customer)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.customer.groups.add(self.manager_group)
+            self.roles(self.customer)
+        self.assertTrue(callbacks)
+        self.assertIsNone(role_cache.get(self.customer.pk))
+
+    def test_permissions_follow_a_role_change(self):
+        # A fresh user object per request, as authentication gives.
+        self.client.force_authenticate(User.objects.get(pk=self.customer.pk))
+        self.assertEqual(self.client.get('/api/groups/manager/users').status_code, 403)
+        self.manager_group.user_set.add(self.customer)
+        self.client.force_authenticate(User.objects.get(pk=self.customer.pk))
+        self.assertEqual(self.client.get('/api/groups/manager/users').status_code, 200)
+
+
+class OrderTotalTests(LittleLemonTestCase):
+    def test_item_changes_adjust_total(self):
+        order = Order.objects.create(user=self.customer)
+        first = OrderItem(order=order, menu_item=self.menu_items[0], quantity=2)
+        first.save()
+        OrderItem(order=order, menu_item=self.menu_items[1], quantity=1).save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('17.50'))
+
+        first.quantity = 1
+        first.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('12.00'))
+
+        first.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('6.50'))
+
+    def test_recompute_totals_in_one_statement(self):
+        self.create_orders(5, lines=4)
+        Order.objects.update(total=0)
+        with self.assertNumQueries(1):
+            self.assertEqual(Order.objects.recompute_totals(), 5)
+        empty = Order.objects.create(user=self.customer, total=Decimal('9.99'))
+        Order.objects.filter(pk=empty.pk).recompute_totals()
+        self.assertEqual(set(Order.objects.values_list('total', flat=True)),
+                         {Decimal('0.00'), Decimal('56.00')})
+
+    def test_recompute_order_totals_command(self):
+        self.create_orders(2, lines=1)
+        Order.objects.update(total=0)
+        out = io.StringIO()
+        call_command('recompute_order_totals', '--since', '2000-01-01', stdout=out)
+        self.assertIn('Recomputed totals of 2 orders.', out.getvalue())
+        for since in ('2024-13-40', 'yesterday'):
+            with self.assertRaisesMessage(CommandError, '--since must be a valid date'):
+                call_command('recompute_order_totals', '--since', since, stdout=io.StringIO())
+
+
+class CheckoutTests(QueryBudgetMixin, LittleLemonTestCase):
+    def fill_cart(self, lines):
+        Cart.objects.bulk_create(
+            Cart(user=self.customer, menu_item=item, quantity=3,
+                 unit_price=item.price, price=item.price * 3)
+            for item in self.menu_items[:lines]
+        )
+
+    def test_checkout_is_constant_in_cart_size(self):
+        self.client.force_authenticate(self.customer)
+        for lines in (1, 8):
+            self.fill_cart(lines)
+            # Includes one upsert per sales rollup table, plus one counting the order.
+            response = self.request_within_budget('post', 'orders', budget=12)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data['items']), lines)
+        self.assertFalse(Cart.objects.exists())
+        order = Order.objects.latest('id')
+        self.assertEqual(order.total, sum(item.price * 3 for item in self.menu_items))
+
+    def test_empty_cart(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post('/api/orders')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_idempotency_key_replays_the_order(self):
+        self.fill_cart(2)
+        self.client.force_authenticate(self.customer)
+        first = self.client.post('/api/orders', HTTP_IDEMPOTENCY_KEY='lunch-42')
+        self.fill_cart(1)
+        retry = self.client.post('/api/orders', HTTP_IDEMPOTENCY_KEY='lunch-42')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertTrue(Cart.objects.exists())
+
+
+class KeysetPaginationTests(LittleLemonTestCase):
+    def walk(self, url, params):
+        pages, response = [], self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_orders_walk_forward_and_back(self):
+        orders = self.create_orders(7)
+        self.client.force_authenticate(self.manager)
+        pages = self.walk('/api/orders', {'page_size': 3})
+        ids = [order['id'] for page in pages for order in page['results']]
+        self.assertEqual(ids, [order.pk for order in reversed(orders)])
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual(previous['results'], pages[-2]['results'])
+
+    def test_menu_items_by_price_with_ties(self):
+        MenuItem.objects.filter(pk__in=[item.pk for item in self.menu_items[:4]]).update(price=Decimal('9.00'))
+        self.client.force_authenticate(self.customer)
+        pages = self.walk('/api/menu-items', {'ordering': '-price', 'page_size': 2})
+        rows = [(Decimal(item['price']), item['id']) for page in pages for item in page['results']]
+        self.assertEqual(len(rows), len(self.menu_items))
+        self.assertEqual(rows, sorted(rows, key=lambda row: (-row[0], -row[1])))
+
+    def test_page_size_is_capped_and_cursor_validated(self):
+        self.client.force_authenticate(self.customer)
+        with mock.patch.object(MenuItemPagination, 'max_page_size', 2):
+            response = self.client.get('/api/menu-items', {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get('/api/menu-items', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor(self):
+        self.create_orders(2)
+        self.client.force_authenticate(self.manager)
+        for ordering, position in (('-price', ['x', 'y']), ('id', [['x']]), ('-price', [None, {}])):
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position}).encode()).decode()
+            response = self.client.get('/api/menu-items', {'ordering': ordering, 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+            self.assertEqual(response.data['detail'], 'Invalid cursor.')
+        cursor = base64.urlsafe_b64encode(json.dumps({'p': ['yesterday', 1]}).encode()).decode()
+        self.assertEqual(self.client.get('/api/orders', {'cursor': cursor}).status_code, 404)
+        token, _ = Token.objects.get_or_create(user=self.manager)
+        response = self.client.get('/api/async/orders', {'cursor': cursor},
+                                   HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+
+    def assert_cached_reads(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        return first
+
+    def test_list_and_detail_are_cached(self):
+        self.assert_cached_reads('/api/menu-items?ordering=price')
+        self.assert_cached_reads(f'/api/menu-items/{self.menu_items[0].pk}')
+
+    def test_writes_invalidate(self):
+        url = f'/api/menu-items/{self.menu_items[0].pk}'
+        first = self.assert_cached_reads(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mains.title = 'Main courses'
+            self.mains.save()
+            # The version only moves on commit.
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_file_based_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                       'LOCATION': location}
+            with self.settings(CACHES={'default': backend}):
+                self.assert_cached_reads('/api/menu-items')
+
+    def test_errors_are_not_cached(self):
+        response = self.client.get('/api/menu-items/999')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class OrderExportTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = self.create_orders(5, delivery_crew=self.crew, lines=2)
+        Order.objects.filter(pk=self.orders[0].pk).update(status=True)
+        self.client.force_authenticate(self.manager)
+
+    def test_ndjson(self):
+        response = self.client.get('/api/orders/export', {'status': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [order.pk for order in self.orders[1:]])
+        detail = self.client.get(f'/api/orders/{self.orders[1].pk}').json()
+        self.assertEqual(rows[0], detail)
+
+    def test_csv_in_chunks(self):
+        with self.settings(LITTLELEMON_EXPORT_CHUNK_SIZE=2):
+            response = self.client.get('/api/orders/export', {'format': 'csv'})
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(content.decode().splitlines()))
+        self.assertEqual(rows[0][:2], ['id', 'user'])
+        self.assertEqual(len(rows), 1 + 5 * 2)
+
+    def test_filters_are_validated(self):
+        response = self.client.get('/api/orders/export', {'date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_managers_only(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get('/api/orders/export')
+        self.assertEqual(response.status_code, 403)
+
+
+class CartBatchTests(QueryBudgetMixin, LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+
+    def test_single_entry_is_still_accepted(self):
+        item = self.menu_items[0]
+        response = self.client.post('/api/cart/menu-items', {'menu_item_id': item.pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'item': item.title, 'quantity': 2,
+                                         'unit_price': '5.50', 'price': '11.00'})
+
+    def test_batch_upsert_and_remove(self):
+        Cart.objects.create(user=self.customer, menu_item=self.menu_items[0], quantity=1,
+                            unit_price=Decimal('1.00'), price=Decimal('1.00'))
+        Cart.objects.create(user=self.customer, menu_item=self.menu_items[1], quantity=1,
+                            unit_price=Decimal('1.00'), price=Decimal('1.00'))
+        entries = [{'menu_item_id': item.pk, 'quantity': 3} for item in self.menu_items[2:]]
+        entries += [{'menu_item_id': self.menu_items[0].pk, 'quantity': 2},
+                    {'menu_item_id': self.menu_items[1].pk, 'quantity': 0}]
+        response = self.request_within_budget('post', 'cart-menu-items', budget=6, data=entries)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), len(self.menu_items) - 1)
+
+        cart = {line.menu_item_id: line for line in Cart.objects.filter(user=self.customer)}
+        self.assertNotIn(self.menu_items[1].pk, cart)
+        self.assertEqual(cart[self.menu_items[0].pk].quantity, 2)
+        self.assertEqual(cart[self.menu_items[0].pk].price, Decimal('11.00'))
+        self.assertEqual(len(cart), len(self.menu_items) - 1)
+
+    def test_unknown_item_rolls_back(self):
+        entries = [{'menu_item_id': self.menu_items[0].pk, 'quantity': 1},
+                   {'menu_item_id': 999, 'quantity': 1}]
+        response = self.client.post('/api/cart/menu-items', entries, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_partial_delete(self):
+        for item in self.menu_items[:3]:
+            Cart.objects.create(user=self.customer, menu_item=item, quantity=1,
+                                unit_price=item.price, price=item.price)
+        response = self.client.delete('/api/cart/menu-items',
+                                      {'menu_item_ids': [self.menu_items[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.count(), 2)
+        self.client.delete('/api/cart/menu-items')
+        self.assertFalse(Cart.objects.exists())
+
+
+class FastReadParityTests(LittleLemonTestCase):
+    """The fast read path must render exactly what the serializers render."""
+
+    def get_both(self, url, params=None):
+        responses = []
+        for enabled in (False, True):
+            cache.clear()
+            with self.settings(LITTLELEMON_FAST_READS=enabled):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            responses.append(response)
+        self.assertEqual(responses[1].content, responses[0].content)
+        return responses[0]
+
+    def test_menu_items(self):
+        MenuItem.objects.create(title='Crème brûlée \u2028', price=Decimal('10.00'),
+                                featured=True, category=self.desserts)
+        self.client.force_authenticate(self.customer)
+        for params in ({}, {'ordering': '-price', 'page_size': 5}, {'category': 'mains'}):
+            response = self.get_both('/api/menu-items', params)
+            while response.data['next']:
+                response = self.get_both(response.data['next'])
+
+    def test_orders_for_each_role(self):
+        self.create_orders(4, delivery_crew=self.crew, lines=3)
+        self.create_orders(2, user=self.manager, lines=1)
+        Order.objects.create(user=self.customer)
+        for user in (self.manager, self.crew, self.customer):
+            self.client.force_authenticate(user)
+            self.get_both('/api/orders', {'page_size': 10})
+            self.get_both('/api/orders', {'page_size': 2, 'ordering': 'date'})
+
+    def test_renderer_matches_json_renderer(self):
+        data = {'title': 'Crème \u2028 brûlée \u2029', 'nested': [1, None, True, {'a': '"'}]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        data['price'] = Decimal('1.50')
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_matches_json_renderer_for_datetimes_and_floats(self):
+        moment = datetime.datetime(2025, 5, 1, 12, 30, 15, 123456)
+        values = [
+            moment, moment.replace(microsecond=0), moment.replace(tzinfo=datetime.timezone.utc),
+            moment.replace(tzinfo=zoneinfo.ZoneInfo('UTC')),
+            moment.replace(tzinfo=zoneinfo.ZoneInfo('Europe/London')),
+            moment.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=-5, minutes=-30))),
+            moment.date(), moment.time(),
+            0.0, -0.0, 0.1, 1.0, 2.5, 1e15, 1e16, -1e16, 1.2345678901234567e17, 1e22, 1e-4, 1e-5,
+            -2.5e-7, 5e-324, 1.7976931348623157e308, 123456.789,
+            'not a float: 1e16', 'and 0.00001',
+        ]
+        for value in values:
+            data = {'value': value, 'list': [value]}
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), value)
+
+    def test_fast_renderer_is_only_used_by_fast_reads(self):
+        self.client.force_authenticate(self.customer)
+        for enabled, renderer in ((False, JSONRenderer), (True, FastJSONRenderer)):
+            cache.clear()
+            with self.settings(LITTLELEMON_FAST_READS=enabled):
+                response = self.client.get('/api/menu-items')
+            self.assertIs(type(response.accepted_renderer), renderer)
+        with self.settings(LITTLELEMON_FAST_READS=True):
+            response = self.client.get('/api/cart/menu-items')
+        self.assertIs(type(response.accepted_renderer), JSONRenderer)
+
+
+class BenchmarkCoverageTests(SimpleTestCase):
+    def test_every_route_has_a_scenario(self):
+        from .management.commands.benchmark_api import SCENARIOS
+        from .urls import urlpatterns
+
+        routes = {pattern.name for pattern in urlpatterns if isinstance(pattern, URLPattern)}
+        self.assertEqual(routes - {scenario.route for scenario in SCENARIOS}, set())
+
+
+class QueryPlanTests(QueryPlanMixin, LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_orders(6, delivery_crew=self.crew)
+        self.create_orders(2, user=self.manager)
+        for item in self.menu_items[:3]:
+            Cart.objects.create(user=self.customer, menu_item=item, quantity=1,
+                                unit_price=item.price, price=item.price)
+
+    def get(self, user, url, params=None):
+        self.client.force_authenticate(user)
+        with self.assertUsesIndexes():
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_orders_for_each_role(self):
+        self.get(self.manager, '/api/orders')
+        self.get(self.manager, '/api/orders', {'status': '0'})
+        self.get(self.crew, '/api/orders')
+        self.get(self.crew, '/api/orders', {'status': '0'})
+        response = self.get(self.customer, '/api/orders', {'page_size': 2})
+        self.get(self.customer, response.data['next'])
+        self.get(self.customer, f'/api/orders/{response.data["results"][0]["id"]}')
+
+    def test_cart_and_menu(self):
+        self.get(self.customer, '/api/cart/menu-items')
+        self.get(self.customer, '/api/menu-items', {'category': 'mains'})
+        response = self.get(self.customer, '/api/menu-items', {'ordering': 'price', 'page_size': 2})
+        self.get(self.customer, response.data['next'])
+
+    def test_full_scan_is_reported(self):
+        with self.assertRaisesMessage(AssertionError, 'Full table scan of LittleLemonAPI_order'):
+            with self.assertUsesIndexes():
+                list(Order.objects.filter(total__gt=0))
+
+
+class ReplicaRoutingTests(LittleLemonTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        super().setUp()
+        self.router = ReplicaRouter()
+
+    @override_settings(REPLICA_DATABASES=['replica1'])
+    def test_only_opted_in_reads_use_replicas(self):
+        self.assertEqual(self.router.db_for_read(Order), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Order), 'replica1')
+            self.assertEqual(self.router.db_for_write(Order), 'default')
+            # Reads after a write in the same context see the primary.
+            self.assertEqual(self.router.db_for_read(Order), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'LittleLemonAPI'))
+
+    @override_settings(REPLICA_DATABASES=['replica1'])
+    def test_writers_are_pinned_to_the_primary(self):
+        reads = []
+        real_db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = real_db_for_read(router, model, **hints)
+            reads.append(alias)
+            return 'default'
+
+        self.client.force_authenticate(self.customer)
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            self.client.get('/api/orders')
+            self.assertIn('replica1', reads)
+            self.assertNotIn(PIN_COOKIE, self.client.cookies)
+
+            Cart.objects.create(user=self.customer, menu_item=self.menu_items[0], quantity=1,
+                                unit_price=Decimal('1'), price=Decimal('1'))
+            response = self.client.post('/api/orders')
+            self.assertEqual(response.status_code, 201)
+            self.assertIn(PIN_COOKIE, response.cookies)
+
+            reads.clear()
+            self.client.get('/api/orders')
+            self.assertEqual(set(reads), {'default'})
+
+    @override_settings(REPLICA_DATABASES=['replica1'])
+    def test_token_clients_are_pinned_without_cookies(self):
+        reads = []
+        real_db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            reads.append(real_db_for_read(router, model, **hints))
+            return 'default'
+
+        token, _ = Token.objects.get_or_create(user=self.customer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        Cart.objects.create(user=self.customer, menu_item=self.menu_items[0], quantity=1,
+                            unit_price=Decimal('1'), price=Decimal('1'))
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            self.assertEqual(self.client.post('/api/orders').status_code, 201)
+            self.client.cookies.clear()
+            reads.clear()
+            self.client.get('/api/orders')
+            self.assertEqual(set(reads), {'default'})
+            reads.clear()
+            self.client.get('/api/async/orders')
+            self.assertEqual(set(reads), {'default'})
+
+            # Other users still read from the replica.
+            other, _ = Token.objects.get_or_create(user=self.crew)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {other.key}')
+            reads.clear()
+            self.client.get('/api/orders')
+            self.assertIn('replica1', reads)
+
+    @override_settings(REPLICA_DATABASES=['replica1'])
+    def test_authentication_and_roles_stay_on_the_primary(self):
+        reads = []
+        real_db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            reads.append((model._meta.app_label, real_db_for_read(router, model, **hints)))
+            return 'default'
+
+        token, _ = Token.objects.get_or_create(user=self.crew)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            response = self.client.get('/api/orders')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({alias for app, alias in reads if app in ('auth', 'authtoken')}, {'default'})
+        self.assertIn(('LittleLemonAPI', 'replica1'), reads)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Group), 'default')
+            self.assertEqual(self.router.db_for_read(Order), 'replica1')
+
+
+class AsyncViewTests(LittleLemonTestCase):
+    """The async read endpoints must answer exactly like the sync ones."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_orders(4, delivery_crew=self.crew, lines=3)
+        self.create_orders(2, user=self.manager, lines=1)
+        for item in self.menu_items[:4]:
+            Cart.objects.create(user=self.customer, menu_item=item, quantity=2,
+                                unit_price=item.price, price=item.price * 2)
+
+    def login(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def assertSameResponse(self, url, params=None):
+        sync = self.client.get(f'/api/{url}', params)
+        response = self.client.get(f'/api/async/{url}', params)
+        self.assertEqual(response.status_code, sync.status_code)
+        body = response.json()
+        expected = sync.json()
+        if isinstance(body, dict):
+            for link in ('next', 'previous'):
+                if body.get(link):
+                    body[link] = body[link].replace('/api/async/', '/api/')
+        self.assertEqual(body, expected)
+        return body
+
+    def test_menu_items(self):
+        self.login(self.customer)
+        for params in ({}, {'ordering': '-price', 'page_size': 5}, {'category': 'mains'},
+                       {'category': 'missing'}, {'cursor': 'bogus'}):
+            body = self.assertSameResponse('menu-items', params)
+        body = self.assertSameResponse('menu-items', {'page_size': 5})
+        self.assertSameResponse(body['next'].split('/api/')[1])
+        self.assertSameResponse(f'menu-items/{self.menu_items[0].pk}')
+        self.assertSameResponse('menu-items/0')
+
+    def test_cart(self):
+        self.login(self.customer)
+        for params in ({}, {'page': 2}, {'page': 3}):
+            self.assertSameResponse('cart/menu-items', params)
+        self.login(self.manager)
+        self.assertSameResponse('cart/menu-items')
+
+    def test_orders_for_each_role(self):
+        Order.objects.create(user=self.customer)
+        for user in (self.manager, self.crew, self.customer):
+            self.login(user)
+            self.assertSameResponse('orders', {'page_size': 10})
+            self.assertSameResponse('orders', {'page_size': 2, 'ordering': 'date', 'status': '0'})
+            self.assertSameResponse('orders', {'date_from': 'yesterday'})
+
+        manager_order = Order.objects.filter(user=self.manager).first()
+        self.assertSameResponse(f'orders/{manager_order.pk}')
+        self.login(self.manager)
+        self.assertSameResponse(f'orders/{manager_order.pk}')
+        self.assertSameResponse('orders/0')
+
+    def test_authentication_is_required(self):
+        response = self.client.get('/api/async/orders')
+        self.assertEqual(response.status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(self.client.get('/api/async/menu-items').status_code, 401)
+        self.login(self.customer)
+        self.assertEqual(self.client.post('/api/async/menu-items').status_code, 405)
+
+
+class DispatchTests(QueryBudgetMixin, LittleLemonTestCase):
+    # One UPDATE per crew member on top of a fixed number of reads.
+    query_budgets = {'order-dispatch': 7}
+
+    def setUp(self):
+        super().setUp()
+        self.crew2 = User.objects.create_user('crew2', password='pass')
+        self.crew2.groups.add(self.crew_group)
+        self.client.force_authenticate(self.manager)
+
+    def post(self, data, budget=None):
+        return self.request_within_budget('post', 'order-dispatch', budget=budget, data=data)
+
+    def test_bulk_assignment(self):
+        orders = self.create_orders(3)
+        response = self.post({'assignments': [
+            {'order': orders[0].pk, 'delivery_crew': self.crew.pk},
+            {'order': orders[1].pk, 'delivery_crew': self.crew2.pk},
+            {'order': orders[2].pk, 'delivery_crew': self.crew2.pk},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['assigned']), 3)
+        self.assertEqual(response.data['loads'], {self.crew.pk: 1, self.crew2.pk: 2})
+        self.assertEqual(Order.objects.filter(delivery_crew=self.crew2).count(), 2)
+
+    def test_auto_balances_by_open_orders(self):
+        self.create_orders(3, delivery_crew=self.crew, lines=1)
+        Order.objects.create(user=self.customer, delivery_crew=self.crew2, status=True)
+        unassigned = self.create_orders(20, lines=1)
+        response = self.post({'auto': True, 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['loads'], {self.crew.pk: 4, self.crew2.pk: 4})
+        self.assertEqual(sorted(entry['order'] for entry in response.data['assigned']),
+                         [order.pk for order in unassigned[:5]])
+
+        # The number of queries does not depend on how many orders are dispatched.
+        response = self.post({'auto': True})
+        self.assertEqual(len(response.data['assigned']), 15)
+        self.assertEqual(response.data['loads'], {self.crew.pk: 12, self.crew2.pk: 11})
+
+    def test_reassignment_moves_load(self):
+        order = self.create_orders(1, delivery_crew=self.crew)[0]
+        response = self.post({'assignments': [{'order': order.pk, 'delivery_crew': self.crew2.pk}]})
+        self.assertEqual(response.data['loads'], {self.crew.pk: 0, self.crew2.pk: 1})
+
+    def test_invalid_requests(self):
+        order = self.create_orders(1)[0]
+        response = self.post({'assignments': [{'order': order.pk, 'delivery_crew': self.customer.pk}]})
+        self.assertEqual(response.status_code, 400)
+        response = self.post({'assignments': [{'order': 0, 'delivery_crew': self.crew.pk}], 'auto': True})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.filter(delivery_crew__isnull=False).exists())
+        self.assertEqual(self.post({}).status_code, 400)
+
+        self.client.force_authenticate(self.crew)
+        self.assertEqual(self.post({'auto': True}).status_code, 403)
+
+
+class OrderEventTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_orders(1, lines=1)[0]
+        self.other = self.create_orders(1, user=self.manager, delivery_crew=self.crew, lines=1)[0]
+        self.tokens = {user.pk: Token.objects.create(user=user).key
+                       for user in (self.manager, self.crew, self.customer)}
+
+    def test_updates_publish_on_commit(self):
+        published = []
+        with mock.patch.object(InProcessBackend, 'publish', lambda backend, event: published.append(event)):
+            self.client.force_authenticate(self.manager)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/orders/{self.order.pk}', {'delivery_crew': self.crew.pk})
+            self.client.force_authenticate(self.crew)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/orders/{self.order.pk}', {'status': 1})
+            self.client.force_authenticate(self.manager)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/orders/dispatch', {'assignments': [
+                    {'order': self.other.pk, 'delivery_crew': self.crew.pk},
+                    {'order': self.order.pk, 'delivery_crew': self.manager.pk},
+                ]}, format='json')
+        self.assertEqual(published, [
+            order_event(self.order.pk, self.customer.pk, self.crew.pk, False),
+            order_event(self.order.pk, self.customer.pk, self.crew.pk, True),
+        ])
+
+    def test_reassignment_unassigns_the_previous_crew(self):
+        other_crew = User.objects.create_user('other-crew')
+        other_crew.groups.add(self.crew_group)
+        published = []
+        self.client.force_authenticate(self.manager)
+        with mock.patch.object(InProcessBackend, 'publish', lambda backend, event: published.append(event)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/orders/dispatch', {'assignments': [
+                    {'order': self.other.pk, 'delivery_crew': other_crew.pk},
+                ]}, format='json')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/orders/{self.other.pk}', {'delivery_crew': self.crew.pk})
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/orders/{self.other.pk}', {'status': 1})
+        self.assertEqual(published, [
+            order_event(self.other.pk, self.manager.pk, other_crew.pk, False),
+            unassign_event(self.other.pk, self.crew.pk),
+            order_event(self.other.pk, self.manager.pk, self.crew.pk, False),
+            unassign_event(self.other.pk, other_crew.pk),
+            order_event(self.other.pk, self.manager.pk, self.crew.pk, True),
+        ])
+
+    def test_requires_asgi(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[self.customer.pk]}')
+        self.assertEqual(self.client.get('/api/orders/events').status_code, 501)
+
+    async def read_events(self, user, publish, count):
+        response = await self.async_client.get(
+            '/api/orders/events', headers={'Authorization': f'Token {self.tokens[user.pk]}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b': keepalive\n\n')
+        for event in publish:
+            get_backend().publish(event)
+        return [json.loads((await asyncio.wait_for(anext(stream), 5)).split(b'data: ')[1])
+                for _ in range(count)]
+
+    async def test_subscribers_see_their_orders(self):
+        events = [order_event(self.other.pk, self.manager.pk, self.crew.pk, True),
+                  order_event(self.order.pk, self.customer.pk, None, True)]
+        self.assertEqual(await self.read_events(self.customer, events, 1), events[1:])
+        self.assertEqual(await self.read_events(self.crew, events + events, 2), [events[0], events[0]])
+        self.assertEqual(await self.read_events(self.manager, events, 2), events)
+
+    async def test_unassigned_crew_is_told(self):
+        events = [order_event(self.other.pk, self.manager.pk, None, False),
+                  unassign_event(self.other.pk, self.crew.pk)]
+        response = await self.async_client.get(
+            '/api/orders/events', headers={'Authorization': f'Token {self.tokens[self.crew.pk]}'})
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        for event in events:
+            get_backend().publish(event)
+        chunk = await asyncio.wait_for(anext(stream), 5)
+        self.assertTrue(chunk.startswith(b'event: unassign\n'))
+        self.assertEqual(json.loads(chunk.split(b'data: ')[1]), events[1])
+        self.assertFalse(can_see(events[1], self.customer.pk, 'customer'))
+        self.assertTrue(can_see(events[1], self.manager.pk, 'manager'))
+
+    @override_settings(LITTLELEMON_EVENTS_BACKEND='LittleLemonAPI.events.CacheBackend',
+                       LITTLELEMON_EVENTS_OPTIONS={'poll_interval': 0.01})
+    async def test_cache_backend(self):
+        self.assertIsInstance(get_backend(), CacheBackend)
+        events = [order_event(self.order.pk, self.customer.pk, None, number % 2) for number in range(3)]
+        self.assertEqual(await self.read_events(self.customer, events, 3), events)
+
+
+class CachedTokenAuthenticationTests(QueryBudgetMixin, LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.manager)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_warm_requests_run_no_auth_queries(self):
+        self.request_within_budget('get', 'menu-items', budget=3)
+        # The catalog cache serves the body, so a warm request runs no SQL at all.
+        response = self.request_within_budget('get', 'menu-items', budget=0)
+        self.assertEqual(response.status_code, 200)
+        response = self.request_within_budget('get', 'auth-cache-stats', budget=0)
+        self.assertEqual(response.data['token_cache']['hits'], 2)
+        self.assertEqual(response.data['token_cache']['misses'], 1)
+        self.assertEqual(response.data['token_cache']['hit_rate'], 0.6667)
+        self.request_within_budget('get', 'async-menu-item-detail', budget=1,
+                                   kwargs={'pk': self.menu_items[0].pk})
+
+    def test_invalidation(self):
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+
+        self.manager.set_password('new-pass')
+        self.manager.save()
+        self.assertEqual(len(token_cache), 0)
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+
+        self.manager.is_active = False
+        self.manager.save()
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 401)
+
+        self.manager.is_active = True
+        self.manager.save()
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 401)
+        self.assertEqual(self.client.get('/api/async/menu-items').status_code, 401)
+
+    def test_stats_are_for_managers(self):
+        customer_token = Token.objects.create(user=self.customer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {customer_token.key}')
+        self.assertEqual(self.client.get('/api/stats/auth-cache').status_code, 403)
+
+
+class SearchTests(QueryPlanMixin, LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+        for title in ('Greek Salad', 'Lemon Dessert', 'Grilled Fish', 'Crème Brûlée', 'Lemon Chicken Salad'):
+            MenuItem.objects.create(title=title, price=Decimal('7.00'), featured=False, category=self.mains)
+
+    def search(self, text, **params):
+        response = self.client.get('/api/menu-items', {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_prefix_typo_and_diacritics(self):
+        self.assertEqual(self.search('gre'), ['Greek Salad'])
+        self.assertEqual(self.search('lem sal'), ['Lemon Chicken Salad'])
+        self.assertEqual(self.search('salda'), ['Greek Salad', 'Lemon Chicken Salad'])
+        self.assertEqual(self.search('creme brulee'), ['Crème Brûlée'])
+        self.assertEqual(self.search('!!!', page_size=20), [item.title for item in MenuItem.objects.order_by('id')])
+        self.assertEqual(self.search('zzz'), [])
+
+    def test_ranking_and_paging(self):
+        MenuItem.objects.create(title='Lemon Lemon Tart', price=Decimal('3.00'), featured=False,
+                                category=self.desserts)
+        ranked = self.search('lemon', page_size=10)
+        self.assertEqual(ranked[0], 'Lemon Lemon Tart')
+        self.assertEqual(len(ranked), 3)
+        response = self.client.get('/api/menu-items', {'search': 'lemon', 'page_size': 2})
+        second = self.client.get(response.data['next'])
+        self.assertEqual([item['title'] for item in response.data['results'] + second.data['results']], ranked)
+        self.assertEqual(self.search('lemon', ordering='price', page_size=10)[0], 'Lemon Lemon Tart')
+        with self.settings(LITTLELEMON_FAST_READS=True):
+            cache.clear()
+            self.assertEqual(self.search('lemon', page_size=10), ranked)
+
+    def test_index_follows_writes(self):
+        item = MenuItem.objects.get(title='Grilled Fish')
+        item.title = 'Grilled Octopus'
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertEqual(self.search('octopus'), ['Grilled Octopus'])
+        self.assertEqual(self.search('fish'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self.search('octopus'), [])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.search('salad'), ['Greek Salad', 'Lemon Chicken Salad'])
+
+    def test_uses_the_index(self):
+        with self.assertUsesIndexes(allow={'LittleLemonAPI_menuitem_fts', 'LittleLemonAPI_menuitem_fts_vocab'}):
+            self.search('lemon salda')
+
+    def test_ranked_search_matches_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('lemon salad', page_size=10)
+        ranked = [query['sql'] for query in queries if 'bm25' in query['sql']]
+        self.assertEqual(len(ranked), 1)
+        self.assertEqual(ranked[0].count(' MATCH '), 1)
+
+    def test_async_list(self):
+        MenuItem.objects.create(title='Lemon Lemon Tart', price=Decimal('3.00'), featured=False,
+                                category=self.desserts)
+        token, _ = Token.objects.get_or_create(user=self.customer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for params in ({'search': 'lemon', 'page_size': 2}, {'search': 'salda'},
+                       {'search': 'lemon', 'ordering': '-price'}, {'search': 'zzz'}):
+            sync = self.client.get('/api/menu-items', params)
+            response = self.client.get('/api/async/menu-items', params)
+            while True:
+                body, expected = response.json(), sync.json()
+                if body['next']:
+                    body['next'] = body['next'].replace('/api/async/', '/api/')
+                self.assertEqual(body['results'], expected['results'], params)
+                self.assertEqual(body['next'], expected['next'], params)
+                if not expected['next']:
+                    break
+                sync = self.client.get(expected['next'])
+                response = self.client.get(expected['next'].replace('/api/', '/api/async/'))
+
+    def test_drf_menu_items(self):
+        from LittleLemonDRF.models import Category as DRFCategory, MenuItem as DRFMenuItem
+        category = DRFCategory.objects.create(slug='mains', title='Mains')
+        for title in ('Pasta Primavera', 'Pasta Carbonara', 'Bruschetta'):
+            DRFMenuItem.objects.create(title=title, price=Decimal('9.00'), inventory=5, category=category)
+        response = self.client.get('/drf/menu-items', {'search': 'pasta carb'})
+        self.assertEqual([item['title'] for item in response.data['results']], ['Pasta Carbonara'])
+
+
+class FacetTests(QueryBudgetMixin, LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+
+    def test_filters(self):
+        def titles(**params):
+            response = self.client.get('/api/menu-items', {'page_size': 20, **params})
+            self.assertEqual(response.status_code, 200)
+            return [item['title'] for item in response.data['results']]
+
+        self.assertEqual(titles(category='mains'), ['Dish 1', 'Dish 3', 'Dish 5', 'Dish 7'])
+        self.assertEqual(titles(category='mains,desserts', price_min='8', price_max='10.50'),
+                         ['Dish 3', 'Dish 4', 'Dish 5'])
+        self.assertEqual(titles(featured='true', price_max='9'), ['Dish 0', 'Dish 2'])
+        self.assertEqual(titles(category='missing'), [])
+        self.assertEqual(self.client.get('/api/menu-items', {'price_min': 'cheap'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/menu-items', {'featured': 'maybe'}).status_code, 400)
+
+    def test_non_finite_prices_are_rejected(self):
+        token, _ = Token.objects.get_or_create(user=self.customer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for params in ({'price_min': 'nan'}, {'price_max': 'Infinity'}, {'price_max': '-inf'},
+                       {'price_min': 'sNaN', 'facets': 'all'}):
+            self.assertEqual(self.client.get('/api/menu-items', params).status_code, 400, params)
+            self.assertEqual(self.client.get('/api/async/menu-items', params).status_code, 400, params)
+        self.assertEqual(self.client.get('/api/menu-items', {'price_max': '1e100'}).status_code, 200)
+
+    def test_counts_exclude_their_own_filter(self):
+        # One of the five is the role throttle loading the caller's groups.
+        response = self.request_within_budget('get', 'menu-items', budget=5,
+                                              query={'category': 'mains', 'facets': 'all'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['facets'], {
+            'category': [
+                {'slug': 'desserts', 'title': 'Desserts', 'count': 4},
+                {'slug': 'mains', 'title': 'Mains', 'count': 4},
+            ],
+            'featured': {'true': 0, 'false': 4},
+            'price': [
+                {'min': '0', 'max': '10', 'count': 2},
+                {'min': '10', 'max': '20', 'count': 2},
+                {'min': '20', 'max': '50', 'count': 0},
+                {'min': '50', 'max': None, 'count': 0},
+            ],
+        })
+
+        response = self.client.get('/api/menu-items', {'featured': 'false', 'search': 'dish',
+                                                       'facets': 'featured,category'})
+        self.assertEqual(set(response.data['facets']), {'featured', 'category'})
+        self.assertEqual(response.data['facets']['featured'], {'true': 4, 'false': 4})
+        self.assertEqual(response.data['facets']['category'][0]['count'], 4)
+        with self.settings(LITTLELEMON_FAST_READS=True):
+            self.assertEqual(self.client.get('/api/menu-items', {'facets': 'price'}).data['facets']['price'][1]['count'], 3)
+
+    def test_slug_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Category.objects.create(slug='mains', title='More mains')
+
+
+class SalesReportTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.customer)
+
+    def checkout(self, quantities):
+        Cart.objects.bulk_create(
+            Cart(user=self.customer, menu_item=self.menu_items[index], quantity=quantity,
+                 unit_price=self.menu_items[index].price, price=self.menu_items[index].price * quantity)
+            for index, quantity in quantities.items()
+        )
+        self.client.force_authenticate(self.customer)
+        return self.client.post('/api/orders').data['id']
+
+    def report(self, **params):
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/reports/sales', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_rollups_follow_checkout_and_deletion(self):
+        first = self.checkout({0: 2, 1: 1})  # 11.00 + 6.50, desserts and mains
+        self.checkout({1: 3})  # 19.50, mains
+        today = Order.objects.get(pk=first).date.isoformat()
+
+        with CaptureQueriesContext(connection) as queries:
+            report = self.report(date_from=today, date_to=today)
+        self.assertFalse([query for query in queries if 'LittleLemonAPI_order' in query['sql']])
+        self.assertEqual(report['totals'], {'orders': 2, 'items': 6, 'revenue': '37.00'})
+        self.assertEqual(report['results'], [{'date': today, 'orders': 2, 'items': 6, 'revenue': '37.00'}])
+        self.assertEqual(self.report(group='menu-item')['results'], [
+            {'menu_item': self.menu_items[1].pk, 'title': 'Dish 1', 'quantity': 4, 'revenue': '26.00'},
+            {'menu_item': self.menu_items[0].pk, 'title': 'Dish 0', 'quantity': 2, 'revenue': '11.00'},
+        ])
+        self.assertEqual([(row['slug'], row['revenue']) for row in self.report(group='category')['results']],
+                         [('mains', '26.00'), ('desserts', '11.00')])
+
+        self.client.delete(f'/api/orders/{first}')
+        self.assertEqual(self.report()['totals'], {'orders': 1, 'items': 3, 'revenue': '19.50'})
+        self.assertEqual([row['quantity'] for row in self.report(group='menu-item')['results']], [3, 0])
+
+    def test_backfill_matches_incremental_rollups(self):
+        self.checkout({0: 2, 1: 1})
+        self.checkout({2: 1, 3: 4})
+        incremental = [self.report(group=group) for group in ('day', 'menu-item', 'category')]
+        self.create_orders(2, lines=2)
+        Order.objects.filter(pk__in=Order.objects.order_by('id').values('pk')[:1]).update(
+            date=datetime.date(2024, 12, 31))
+        out = io.StringIO()
+        call_command('backfill_sales_rollups', '--chunk-days', '1', stdout=out)
+        self.assertIn('Backfilled 4 orders', out.getvalue())
+
+        report = self.report(date_from='2025-01-01')
+        self.assertEqual(report['totals']['orders'], 3)
+        self.assertEqual(self.report(date_to='2024-12-31')['totals']['revenue'], '17.50')
+        DailySales.objects.all().delete()
+        call_command('backfill_sales_rollups', stdout=io.StringIO())
+        self.assertEqual(self.report()['totals']['orders'], 4)
+        self.assertNotEqual(incremental[0]['totals'], self.report()['totals'])
+
+    def test_orders_created_outside_checkout_are_counted(self):
+        order = Order.objects.create(user=self.customer)
+        OrderItem(order=order, menu_item=self.menu_items[0], quantity=2).save()
+        self.assertEqual(self.report()['totals'], {'orders': 1, 'items': 2, 'revenue': '11.00'})
+        order.delete()
+        self.assertEqual(list(DailySales.objects.values_list('orders', 'items', 'revenue')),
+                         [(0, 0, Decimal('0.00'))])
+
+    def test_rollups_follow_item_edits_and_menu_item_deletes(self):
+        first = self.checkout({0: 2, 1: 1})  # 11.00 + 6.50
+        second = self.checkout({1: 3, 2: 1})  # 19.50 + 7.50
+        item = OrderItem.objects.get(order=first, menu_item=self.menu_items[0])
+        item.quantity, item.price = 3, Decimal('16.50')
+        item.save()
+        OrderItem.objects.get(order=first, menu_item=self.menu_items[1]).delete()
+        self.assertEqual(self.report()['totals'], {'orders': 2, 'items': 7, 'revenue': '43.50'})
+        self.assertEqual([(row['title'], row['quantity']) for row in self.report(group='menu-item')['results']],
+                         [('Dish 1', 3), ('Dish 0', 3), ('Dish 2', 1)])
+
+        self.menu_items[1].delete()
+        self.assertEqual(self.report()['totals'], {'orders': 2, 'items': 4, 'revenue': '24.00'})
+        self.assertEqual([(row['slug'], row['revenue']) for row in self.report(group='category')['results']],
+                         [('desserts', '24.00'), ('mains', '0.00')])
+        self.assertEqual(Order.objects.get(pk=second).total, Decimal('7.50'))
+
+        incremental = [self.report(group=group)['results'] for group in ('day', 'menu-item')]
+        DailySales.objects.all().delete()
+        DailyMenuItemSales.objects.all().delete()
+        call_command('backfill_sales_rollups', stdout=io.StringIO())
+        self.assertEqual([self.report(group=group)['results'] for group in ('day', 'menu-item')], incremental)
+
+        Order.objects.filter(pk__in=[first, second]).delete()
+        self.assertEqual(self.report()['totals'], {'orders': 0, 'items': 0, 'revenue': '0.00'})
+
+    def test_validation_and_permissions(self):
+        self.client.force_authenticate(self.manager)
+        self.assertEqual(self.client.get('/api/reports/sales', {'group': 'week'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/sales', {'date_from': 'today'}).status_code, 400)
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/reports/sales').status_code, 403)
+
+
+class MetricsTests(LittleLemonTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.force_authenticate(self.customer)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/menu-items')
+        query_count = len(queries)
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timing), {'app', 'db', 'serializer'})
+        self.assertIn(f'desc="{query_count} queries"', timing['db'])
+        self.client.get('/api/menu-items/0')
+        self.client.get('/drf/categories')
+
+        metrics = self.metrics()
+        self.assertIn('littlelemon_requests_total{route="menu-items",method="GET",status="200"} 1', metrics)
+        self.assertIn('littlelemon_requests_total{route="menu-item-detail",method="GET",status="404"} 1',
+                      metrics)
+        self.assertIn('littlelemon_request_duration_seconds_count{route="menu-items"} 1', metrics)
+        self.assertIn('littlelemon_request_duration_seconds_bucket{route="menu-items",le="+Inf"} 1', metrics)
+        self.assertIn(f'littlelemon_db_queries_total{{route="menu-items"}} {query_count}', metrics)
+        self.assertIn('littlelemon_requests_total{route="drf-categories"', metrics)
+        serializer_seconds = [line for line in metrics.splitlines()
+                              if line.startswith('littlelemon_serializer_seconds_total{route="menu-items"}')]
+        self.assertGreater(float(serializer_seconds[0].split()[-1]), 0)
+
+    def test_async_views_and_restaurant_pages_are_recorded(self):
+        token, _ = Token.objects.get_or_create(user=self.customer)
+        self.client.get('/api/async/menu-items', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get('/menu/')
+        self.client.get('/no-such-page')
+        metrics = self.metrics()
+        self.assertIn('littlelemon_requests_total{route="async-menu-items",method="GET",status="200"} 1', metrics)
+        self.assertIn('littlelemon_requests_total{route="menu",method="GET",status="200"} 1', metrics)
+        self.assertIn('littlelemon_requests_total{route="<unmatched>",method="GET",status="404"} 1', metrics)
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+        with override_settings(LITTLELEMON_METRICS_ALLOWED_IPS=['203.0.113.9']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 200)
+
+
+def throttle_rates(**rates):
+    """Settings with ``rates`` replacing the configured throttle rates."""
+    rates = {scope.replace('_', '-'): rate for scope, rate in rates.items()}
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class ThrottlingTests(LittleLemonTestCase):
+    def test_bucket_refills_at_its_rate(self):
+        arrival = None
+        for now in (0, 0):
+            allowed, arrival, _ = consume(arrival, now, capacity=2, period=60)
+            self.assertTrue(allowed)
+        self.assertEqual(consume(arrival, 10, 2, 60), (False, None, 20))
+        self.assertTrue(consume(arrival, 30, 2, 60)[0])
+        # Idle time refills the bucket, but never beyond its capacity.
+        self.assertEqual(consume(arrival, 600, 2, 60), (True, 630, 0))
+        # An empty bucket admits a request whatever the clock reads.
+        for now in (0.1, 12345.678, 1e9 + 0.3):
+            self.assertTrue(consume(None, now, 1, 60)[0])
+            self.assertTrue(consume(now - 1, now, 3, 7)[0])
+
+    def test_local_store_forgets_the_oldest_buckets(self):
+        store = LocalBucketStore(max_size=2)
+        for key in ('a', 'b', 'c'):
+            self.assertEqual(store.consume(key, 1, 60), (True, 0))
+        self.assertTrue(store.consume('a', 1, 60)[0])
+        self.assertFalse(store.consume('c', 1, 60)[0])
+
+    @throttle_rates(customer='2/min', manager='3/min')
+    def test_each_role_has_its_own_budget(self):
+        self.client.force_authenticate(self.customer)
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+        response = self.client.get('/api/menu-items')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertIn('30 seconds', response.data['detail'])
+
+        self.client.force_authenticate(self.manager)
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 429)
+        # Roles without a rate are not throttled.
+        self.client.force_authenticate(self.crew)
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+
+    @throttle_rates(anon='100/min', signup='2/hour')
+    def test_signups_are_limited_per_address(self):
+        def signup(number, address='203.0.113.9'):
+            return self.client.post('/api/users', {'username': f'new{number}', 'email': 'new@example.com',
+                                                    'password': 'Lemon-2025!'},
+                                    REMOTE_ADDR=address).status_code
+
+        self.assertEqual([signup(number) for number in range(3)], [201, 201, 429])
+        self.assertEqual(signup(3, address='203.0.113.10'), 201)
+
+    @throttle_rates(customer='100/min', checkout='1/min')
+    def test_checkout_is_limited_but_reads_are_not(self):
+        self.client.force_authenticate(self.customer)
+        Cart.objects.create(user=self.customer, menu_item=self.menu_items[0], quantity=1,
+                            unit_price=self.menu_items[0].price, price=self.menu_items[0].price)
+        self.assertEqual(self.client.post('/api/orders').status_code, 201)
+        Cart.objects.create(user=self.customer, menu_item=self.menu_items[1], quantity=1,
+                            unit_price=self.menu_items[1].price, price=self.menu_items[1].price)
+        response = self.client.post('/api/orders')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), 1)
+        self.assertEqual(self.client.get('/api/orders').status_code, 200)
+
+    @throttle_rates(customer='1/min')
+    def test_cache_store_is_shared(self):
+        with override_settings(LITTLELEMON_THROTTLE_STORE='LittleLemonAPI.throttling.CacheBucketStore',
+                               LITTLELEMON_THROTTLE_STORE_OPTIONS={'key_prefix': 'test:throttle:'}):
+            self.assertIsInstance(get_store(), CacheBucketStore)
+            self.client.force_authenticate(self.customer)
+            self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
+            self.assertIsNotNone(cache.get(f'test:throttle:customer:user:{self.customer.pk}'))
+            self.assertEqual(self.client.get('/api/menu-items').status_code, 429)
+        self.assertIsInstance(get_store(), LocalBucketStore)
+
+    @throttle_rates(customer='1/min')
+    def test_async_views_share_the_role_budget(self):
+        token, _ = Token.objects.get_or_create(user=self.customer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get('/api/async/menu-items').status_code, 200)
+        response = self.client.get('/api/async/menu-items')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(self.client.get('/api/menu-items').status_code, 429)
+
+    @throttle_rates(customer='1/min')
+    def test_throttling_can_be_turned_off(self):
+        self.client.force_authenticate(self.customer)
+        with override_settings(LITTLELEMON_THROTTLING=False):
+            for _ in range(3):
+                self.assertEqual(self.client.get('/api/menu-items').status_code, 200)
@@ -0,0 +1,221 @@
+"""Token-bucket request throttling for the Little Lemon API.
+
+Every client gets a bucket per scope that holds up to ``n`` requests and
+refills at ``n`` per period, with rates taken from DRF's
+``DEFAULT_THROTTLE_RATES`` (e.g. ``'300/min'``). A bucket is stored as a
+single number, its theoretical arrival time (the GCRA formulation of a
+token bucket), so checking it is one read and one write.
+
+``RoleRateThrottle`` budgets requests by role: ``anon``, ``customer``,
+``delivery-crew`` and ``manager``. ``ScopedWriteThrottle`` adds the
+stricter budget named by a view's ``throttle_scope`` to its writes.
+
+Buckets live in the store named by ``LITTLELEMON_THROTTLE_STORE``:
+
+* ``LocalBucketStore`` (the default) keeps them in process memory.
+* ``CacheBucketStore`` keeps them in a Django cache shared by all
+  processes. The read and the write are not atomic, so a burst of
+  concurrent requests from one client can get a few more through than its
+  budget.
+
+Set ``LITTLELEMON_THROTTLING = False`` to turn throttling off.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .utils import DELIVERY_CREW_GROUP, MANAGER_GROUP, aget_roles, get_roles
+
+
+DEFAULT_STORE = 'LittleLemonAPI.throttling.LocalBucketStore'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Turn ``'100/min'`` into ``(100, 60)``; ``None`` means unlimited.
+    """
+    if rate is None:
+        return None
+    number, period = rate.split('/')
+    return int(number), PERIODS[period[0]]
+
+
+def consume(arrival, now, capacity, period):
+    """Take one request from a bucket whose theoretical arrival time is ``arrival``.
+
+    Returns ``(allowed, arrival, wait)``: the new arrival time to store (if
+    allowed) and otherwise the seconds until a request would be.
+    """
+    interval = period / capacity
+    # Relative to now, so an empty bucket is exact however large the clock reading.
+    backlog = max(arrival - now, 0) if arrival is not None else 0
+    backlog += interval
+    if backlog > period + 1e-9:
+        return False, None, backlog - period
+    return True, now + backlog, 0
+
+
+class LocalBucketStore:
+    """Buckets in process memory, keeping the ``max_size`` most recent.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period):
+        with self._lock:
+            now = time.monotonic()
+            allowed, arrival, wait = consume(self._buckets.get(key), now, capacity, period)
+            if allowed:
+                self._buckets[key] = arrival
+                self._buckets.move_to_end(key)
+                while len(self._buckets) > self.max_size:
+                    self._buckets.popitem(last=False)
+        return allowed, wait
+
+    async def aconsume(self, key, capacity, period):
+        return self.consume(key, capacity, period)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Buckets in a Django cache, shared by every process that uses it.
+    """
+
+    def __init__(self, cache='default', key_prefix='littlelemon:throttle:'):
+        self.cache_alias = cache
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _consume(self, arrival, capacity, period):
+        now = time.time()
+        allowed, arrival, wait = consume(arrival, now, capacity, period)
+        # A bucket is full again, and can be forgotten, once its arrival time has passed.
+        timeout = math.ceil(arrival - now) + 1 if allowed else None
+        return allowed, arrival, wait, timeout
+
+    def consume(self, key, capacity, period):
+        key = self.key_prefix + key
+        allowed, arrival, wait, timeout = self._consume(self.cache.get(key), capacity, period)
+        if allowed:
+            self.cache.set(key, arrival, timeout)
+        return allowed, wait
+
+    async def aconsume(self, key, capacity, period):
+        key = self.key_prefix + key
+        allowed, arrival, wait, timeout = self._consume(await self.cache.aget(key), capacity, period)
+        if allowed:
+            await self.cache.aset(key, arrival, timeout)
+        return allowed, wait
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        store_class = import_string(getattr(settings, 'LITTLELEMON_THROTTLE_STORE', DEFAULT_STORE))
+        _store = store_class(**getattr(settings, 'LITTLELEMON_THROTTLE_STORE_OPTIONS', {}))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting in ('LITTLELEMON_THROTTLE_STORE', 'LITTLELEMON_THROTTLE_STORE_OPTIONS'):
+        _store = None
+
+
+def throttling_enabled():
+    return getattr(settings, 'LITTLELEMON_THROTTLING', True)
+
+
+def get_rate(scope):
+    return parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+
+
+def role_scope(user, roles):
+    if not user or not user.is_authenticated:
+        return 'anon'
+    if MANAGER_GROUP in roles:
+        return 'manager'
+    if DELIVERY_CREW_GROUP in roles:
+        return 'delivery-crew'
+    return 'customer'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle requests against a token bucket per scope and client.
+    """
+
+    def __init__(self):
+        self._wait = None
+
+    def get_ident_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def check(self, scope, ident):
+        rate = get_rate(scope)
+        if rate is None or not throttling_enabled():
+            return True
+        allowed, self._wait = get_store().consume(f'{scope}:{ident}', *rate)
+        return allowed
+
+    async def acheck(self, scope, ident):
+        rate = get_rate(scope)
+        if rate is None or not throttling_enabled():
+            return True
+        allowed, self._wait = await get_store().aconsume(f'{scope}:{ident}', *rate)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class RoleRateThrottle(TokenBucketThrottle):
+    """Budget every request by the client's role.
+    """
+
+    def allow_request(self, request, view):
+        user = getattr(request, 'user', None)
+        roles = get_roles(user) if user is not None and user.is_authenticated else frozenset()
+        return self.check(role_scope(user, roles), self.get_ident_key(request))
+
+    async def aallow_user(self, user):
+        """Async check for an authenticated ``user``, for the async views."""
+        return await self.acheck(role_scope(user, await aget_roles(user)), f'user:{user.pk}')
+
+
+class ScopedWriteThrottle(TokenBucketThrottle):
+    """Budget the writes of views that set ``throttle_scope``.
+    """
+
+    methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None or request.method not in self.methods:
+            return True
+        return self.check(scope, self.get_ident_key(request))
@@ -1,12 +1,13 @@
 from django.urls import path, include
 
-from . import views
+from . import async_views, views
 
 
 urlpatterns = [
     path('auth', include('rest_framework.urls')),
     path('users', views.CreateUserView.as_view(), name='create-user'),
     path('users/user/me/', views.CurrentUserView.as_view(), name='current-user'),
+    path('stats/auth-cache', views.AuthCacheStatsView.as_view(), name='auth-cache-stats'),
 
     #  Menu-items endpoints
     path('menu-items', views.MenuItemListCreateView.as_view(), name='menu-items'),
@@ -24,6 +25,19 @@ urlpatterns = [
 
     # Order management endpoints
     path('orders', views.OrderListCreateView.as_view(), name='orders'),
-    path('orders/<int:pk>', views.OrderDetailView.as_view(), name='order-detail')
+    path('orders/export', views.OrderExportView.as_view(), name='order-export'),
+    path('orders/dispatch', views.OrderDispatchView.as_view(), name='order-dispatch'),
+    path('orders/events', async_views.order_events, name='order-events'),
+    path('orders/<int:pk>', views.OrderDetailView.as_view(), name='order-detail'),
+
+    # Reporting endpoints
+    path('reports/sales', views.SalesReportView.as_view(), name='sales-report'),
+
+    # Async read endpoints
+    path('async/menu-items', async_views.menu_item_list, name='async-menu-items'),
+    path('async/menu-items/<int:pk>', async_views.menu_item_detail, name='async-menu-item-detail'),
+    path('async/cart/menu-items', async_views.cart_list, name='async-cart-menu-items'),
+    path('async/orders', async_views.order_list, name='async-orders'),
+    path('async/orders/<int:pk>', async_views.order_detail, name='async-order-detail'),
 
 ]
\ No newline at end of file
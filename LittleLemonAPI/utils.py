@@ -1,10 +1,127 @@
 """Utility functions for the Little Lemon API."""
 
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+
+MANAGER_GROUP = 'Manager'
+DELIVERY_CREW_GROUP = 'Delivery Crew'
+
+
+class BoundedTTLCache:
+    """A small thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+role_cache = BoundedTTLCache(
+    max_size=getattr(settings, 'LITTLELEMON_ROLE_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'LITTLELEMON_ROLE_CACHE_TTL', 300),
+)
+
 
 def update_order_total(order):
-    total = sum(item.price for item in order.items.all())
-    order.total = total
-    order.save(update_fields=['total'])
+    """Recompute the order total in the database and refresh it on ``order``.
+    """
+    type(order).objects.filter(pk=order.pk).recompute_totals()
+    order.refresh_from_db(fields=['total'])
+
+
+def get_roles(user):
+    """Return the set of group names the user belongs to.
+
+    The groups are loaded at most once per request (they are memoized on the
+    user instance) and are shared across requests through ``role_cache``.
+    """
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = role_cache.get(user.pk)
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            role_cache.set(user.pk, roles)
+        user._roles = roles
+    return roles
+
+
+def forget_roles(user_ids):
+    """Drop users from ``role_cache``, now and again when the current
+    transaction commits, so a concurrent request cannot cache the groups
+    from before the change.
+
+    Other processes keep their entries until ``LITTLELEMON_ROLE_CACHE_TTL``.
+    """
+    user_ids = list(user_ids)
+
+    def forget():
+        for user_id in user_ids:
+            role_cache.delete(user_id)
+
+    forget()
+    transaction.on_commit(forget)
+
+
+def invalidate_roles(user):
+    """Forget the cached groups of a user whose membership has changed.
+
+    Called by the signal receivers for every change to group membership.
+    """
+    forget_roles([user.pk])
+    user.__dict__.pop('_roles', None)
 
 
 def is_authenticated(user):
@@ -18,7 +135,7 @@ def is_manager(user):
     """
     if not is_authenticated(user):
         return False
-    return user.groups.filter(name='Manager').exists()
+    return MANAGER_GROUP in get_roles(user)
 
 
 def is_delivery_crew(user):
@@ -26,16 +143,44 @@ def is_delivery_crew(user):
     """
     if not is_authenticated(user):
         return False
-    return user.groups.filter(name='Delivery Crew').exists()
+    return DELIVERY_CREW_GROUP in get_roles(user)
 
 
 def is_customer(user):
     """Check if the user is a customer.
     """
     if not is_authenticated(user):
-        return False    
+        return False
     # A customer is not in the 'Manager' or 'Delivery Crew' groups
-    if user.groups.filter(name__in=['Manager', 'Delivery Crew']).exists():
+    return not get_roles(user) & {MANAGER_GROUP, DELIVERY_CREW_GROUP}
+
+
+async def aget_roles(user):
+    """Async version of ``get_roles``.
+    """
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = role_cache.get(user.pk)
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            role_cache.set(user.pk, roles)
+        user._roles = roles
+    return roles
+
+
+async def ais_manager(user):
+    if not is_authenticated(user):
         return False
-    return True
+    return MANAGER_GROUP in await aget_roles(user)
+
 
+async def ais_delivery_crew(user):
+    if not is_authenticated(user):
+        return False
+    return DELIVERY_CREW_GROUP in await aget_roles(user)
+
+
+async def ais_customer(user):
+    if not is_authenticated(user):
+        return False
+    return not await aget_roles(user) & {MANAGER_GROUP, DELIVERY_CREW_GROUP}
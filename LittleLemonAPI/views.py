@@ -1,22 +1,43 @@
-from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 from django.contrib.auth.models import User, Group
 
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.exceptions import ParseError
 from rest_framework.filters import OrderingFilter
 
-from .models import MenuItem, Cart, Order, OrderItem, Category
+from LittleLemon.db_router import ReplicaReadMixin
+from LittleLemon.search import FullTextSearchFilter
+
+from .models import MenuItem, Cart, Order
 from .serializers import UserSerializer, CurrentUserSerializer, MenuItemSerializer,\
-    CartSerializer, OrderSerializer
+    CartSerializer, CartEntrySerializer, CartRemoveSerializer, DispatchSerializer, OrderSerializer
+from .authentication import token_cache
+from .cache import CatalogCacheMixin
+from .cart import remove_from_cart, update_cart
+from .checkout import checkout, EmptyCartError, IDEMPOTENCY_KEY_MAX_LENGTH
+from .dispatch import dispatch, DispatchError
+from .events import order_event, order_events, publish_on_commit
+from .export import filter_orders, iter_orders, stream_csv, stream_ndjson
+from .facets import facet_counts, filter_menu_items, requested_facets
+from .fastpath import (
+    FastReadRendererMixin, fast_reads_enabled, menu_item_rows, menu_item_values, order_rows, order_values,
+)
+from .pagination import MenuItemPagination, OrderPagination
 from .permissions import IsManager, IsCustomer
-from .utils import is_customer, is_manager, is_delivery_crew, update_order_total
+from .renderers import CSVRenderer, NDJSONRenderer
+from .reports import parse_date_range, sales_report
+from .search import menu_item_index
+from .utils import is_customer, is_manager, is_delivery_crew, role_cache
 
 # Create your views here.
 class CreateUserView(generics.CreateAPIView):
     model = User
     serializer_class = UserSerializer
     permission_classes = []
+    throttle_scope = 'signup'
 
 
 class CurrentUserView(generics.RetrieveAPIView):
@@ -27,12 +48,21 @@ class CurrentUserView(generics.RetrieveAPIView):
         return self.request.user
 
 
-class MenuItemListCreateView(generics.ListCreateAPIView):
-    queryset = MenuItem.objects.all()
+class AuthCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsManager]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"token_cache": token_cache.stats(), "role_cache": role_cache.stats()})
+
+
+class MenuItemListCreateView(FastReadRendererMixin, ReplicaReadMixin, CatalogCacheMixin, generics.ListCreateAPIView):
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
-    filter_backends = [OrderingFilter]
+    pagination_class = MenuItemPagination
+    filter_backends = [FullTextSearchFilter, OrderingFilter]
     ordering_fields = ['price']  # allow ordering by price
     ordering = ['id']  # default ordering
+    search_index = menu_item_index
 
     def get_permissions(self):
         permissions = [IsAuthenticated()]
@@ -42,19 +72,33 @@ class MenuItemListCreateView(generics.ListCreateAPIView):
 
         return permissions
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        category_slug = self.request.query_params.get('category')
+    def list(self, request, *args, **kwargs):
+        if fast_reads_enabled():
+            queryset = menu_item_values(self.filter_queryset(self.get_queryset()))
+            page = self.paginate_queryset(queryset)
+            response = self.get_paginated_response(menu_item_rows(page))
+        else:
+            response = super().list(request, *args, **kwargs)
 
-        if category_slug:
-            category = get_object_or_404(Category, slug=category_slug)
-            queryset = queryset.filter(category=category)
+        facets = requested_facets(request.query_params)
+        if facets:
+            response.data['facets'] = facet_counts(self.get_facet_queryset(), request.query_params, facets)
+        return response
 
-        return queryset
+    def get_queryset(self):
+        try:
+            return filter_menu_items(super().get_queryset(), self.request.query_params)
+        except ValueError as exc:
+            raise ParseError(str(exc))
+
+    def get_facet_queryset(self):
+        """The searched menu items, before any facet filter is applied."""
+        search = FullTextSearchFilter().get_search_text(self.request)
+        return self.search_index.filter(MenuItem.objects.all(), search)
     
 
-class MenuItemDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = MenuItem.objects.all()
+class MenuItemDetailView(CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = MenuItem.objects.select_related('category')
     serializer_class = MenuItemSerializer
 
     def get_permissions(self):
@@ -159,91 +203,151 @@ class CartListCreateRemoveView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsCustomer]
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).select_related('menu_item').order_by('id')
 
     def create(self, request, *args, **kwargs):
-        menu_item_id = request.data.get('menu_item_id')
-        quantity = request.data.get('quantity')
+        many = isinstance(request.data, list)
+        entries = CartEntrySerializer(data=request.data, many=many)
+        entries.is_valid(raise_exception=True)
 
         try:
-            menu_item = MenuItem.objects.get(id=menu_item_id)
+            cart_items = update_cart(request.user, entries.validated_data if many else [entries.validated_data])
         except MenuItem.DoesNotExist:
             return Response({'error': 'MenuItem ID not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        unit_price = menu_item.price
-        price = unit_price * int(quantity)
-
-        cart_item, _ = Cart.objects.update_or_create(
-            user=request.user,
-            menu_item=menu_item,
-            defaults={'quantity': quantity, 'unit_price': unit_price, 'price': price}
-        )
-
-        serializer = self.get_serializer(cart_item)
+        if many:
+            serializer = self.get_serializer(cart_items, many=True)
+        elif cart_items:
+            serializer = self.get_serializer(cart_items[0])
+        else:
+            return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request):
-        Cart.objects.filter(user=request.user).delete()
+        if request.data:
+            data = request.data
+            if isinstance(data, list):
+                data = {'menu_item_ids': data}
+            serializer = CartRemoveSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            remove_from_cart(request.user, serializer.validated_data['menu_item_ids'])
+        else:
+            remove_from_cart(request.user)
         return Response(status=status.HTTP_200_OK)
     
 
-class OrderListCreateView(generics.ListCreateAPIView):
+class OrderListCreateView(FastReadRendererMixin, ReplicaReadMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['date']
+    # POST is checkout.
+    throttle_scope = 'checkout'
 
     def get_queryset(self):
         user = self.request.user
+        try:
+            orders = filter_orders(Order.objects.with_details(), self.request.query_params)
+        except ValueError as exc:
+            raise ParseError(str(exc))
         if is_manager(user):
-            return Order.objects.all()
+            return orders
         if is_delivery_crew(user):
-            return Order.objects.filter(delivery_crew=user)
-        return Order.objects.filter(user=user)
+            return orders.filter(delivery_crew=user)
+        return orders.filter(user=user)
+
+    def list(self, request, *args, **kwargs):
+        if not fast_reads_enabled():
+            return super().list(request, *args, **kwargs)
+        queryset = order_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(order_rows(page))
 
     def create(self, request, *args, **kwargs):
         user = request.user
         if not is_customer(user):
             return Response({"detail": "You do not have permission to create an order."}, status=status.HTTP_403_FORBIDDEN)
 
-        cart_items = Cart.objects.filter(user=user)
-        if not cart_items.exists():
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key and len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response({"detail": f"Idempotency-Key must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            order, created = checkout(user, idempotency_key)
+        except EmptyCartError:
             return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
 
-        order = Order.objects.create(user=user)
+        serializer = self.get_serializer(order)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+    
+
+class OrderExportView(APIView):
+    permission_classes = [IsAuthenticated, IsManager]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            orders = filter_orders(Order.objects.all(), request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        renderer = request.accepted_renderer
+        stream = stream_csv if renderer.format == 'csv' else stream_ndjson
+        response = StreamingHttpResponse(
+            stream(iter_orders(orders)), content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="orders.{renderer.format}"'
+        return response
 
-        order_items = []
-        for item in cart_items:
-            order_item = OrderItem(
-                order=order,
-                menu_item=item.menu_item,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                price=item.price
-            )
-            order_items.append(order_item)
 
-        OrderItem.objects.bulk_create(order_items)
-        update_order_total(order)
+class OrderDispatchView(APIView):
+    permission_classes = [IsAuthenticated, IsManager]
 
-        cart_items.delete()     # clear the cart after order creation
+    def post(self, request, *args, **kwargs):
+        serializer = DispatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        assignments = {entry['order']: entry['delivery_crew'] for entry in data.get('assignments', [])}
+        try:
+            assigned, loads = dispatch(assignments, auto=data['auto'], limit=data.get('limit'))
+        except DispatchError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "assigned": [{"order": order_id, "delivery_crew": crew_id} for order_id, crew_id in assigned.items()],
+            "loads": loads,
+        }, status=status.HTTP_200_OK)
+
+
+class SalesReportView(APIView):
+    permission_classes = [IsAuthenticated, IsManager]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            date_from, date_to = parse_date_range(request.query_params)
+            report = sales_report(request.query_params.get('group', 'day'), date_from, date_to)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
 
-        serializer = self.get_serializer(order)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    
 
 class OrderDetailView(generics.RetrieveUpdateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Order.objects.all()
+    queryset = Order.objects.with_details()
 
     def get(self, request, *args, **kwargs):
         order = self.get_object()
         user = request.user
         
         # Customers can only see their own orders
-        if is_customer(user) and order.user != user:
+        if is_customer(user) and order.user_id != user.pk:
             return Response({"detail": "You do not have permission to see this order."}, status=status.HTTP_403_FORBIDDEN)
         # Managers and others can see all orders (adjust as needed)
-        return super().get(request, *args, **kwargs)
+        serializer = self.get_serializer(order)
+        return Response(serializer.data)
 
     def update(self, request, *args, **kwargs):
         order = self.get_object()
@@ -263,11 +367,12 @@ class OrderDetailView(generics.RetrieveUpdateAPIView):
             # Validate delivery_crew user if provided
             delivery_crew_id = data.get('delivery_crew')
             status_val = data.get('status')
+            previous_crew_id = order.delivery_crew_id
 
             if delivery_crew_id is not None:
                 try:
                     delivery_crew_user = User.objects.get(id=delivery_crew_id)
-                    if not delivery_crew_user.groups.filter(name='Delivery Crew').exists():
+                    if not is_delivery_crew(delivery_crew_user):
                         return Response({"detail": "Assigned user is not a delivery crew."}, status=status.HTTP_400_BAD_REQUEST)
                 except User.DoesNotExist:
                     return Response({"detail": "Delivery crew user not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -280,6 +385,8 @@ class OrderDetailView(generics.RetrieveUpdateAPIView):
                 order.status = int(status_val)
 
             order.save()
+            publish_on_commit(order_events(order.pk, order.user_id, order.delivery_crew_id, order.status,
+                                           previous_crew_id=previous_crew_id))
 
             # After manager update, refresh data for serializer
             serializer = self.get_serializer(order)
@@ -295,6 +402,7 @@ class OrderDetailView(generics.RetrieveUpdateAPIView):
                     return Response({"detail": "Status must be 0 or 1."}, status=status.HTTP_400_BAD_REQUEST)
                 order.status = status_val
                 order.save()
+                publish_on_commit([order_event(order.pk, order.user_id, order.delivery_crew_id, order.status)])
                 serializer = self.get_serializer(order)
                 return Response(serializer.data)
             else:
@@ -0,0 +1,123 @@
+"""Stock keeping for LittleLemonDRF menu items.
+
+Stock only ever changes through single UPDATE statements that compute the
+new value in the database, so concurrent writers cannot lose each other's
+changes. Taking stock is conditional on enough being left, which makes
+overselling impossible without locking the row.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from .models import InventoryReservation, MenuItem
+
+
+class InsufficientStock(Exception):
+    """Raised when a menu item does not have the stock asked for."""
+
+
+def take(menuitem_id, quantity):
+    """Take ``quantity`` off a menu item's inventory, or raise ``InsufficientStock``.
+    """
+    taken = MenuItem.objects.filter(pk=menuitem_id, inventory__gte=quantity).update(
+        inventory=F('inventory') - quantity,
+    )
+    if not taken:
+        raise InsufficientStock(f'Not enough stock of menu item {menuitem_id}.')
+
+
+def give_back(quantities):
+    """Add ``{menuitem_id: quantity}`` back to the inventories in one UPDATE."""
+    if not quantities:
+        return 0
+    return MenuItem.objects.filter(pk__in=list(quantities)).update(inventory=Case(
+        *[When(pk=pk, then=F('inventory') + quantity) for pk, quantity in quantities.items()],
+    ))
+
+
+def reserve(menuitem_id, user, quantity, ttl=None):
+    """Hold ``quantity`` of a menu item for ``user`` for ``ttl`` seconds.
+
+    If the item looks sold out, its expired reservations are released and
+    the stock is tried once more. The release commits on its own, so it
+    stands even when the second try fails too.
+    """
+    ttl = ttl if ttl is not None else getattr(settings, 'LITTLELEMON_RESERVATION_TTL', 900)
+    try:
+        return _reserve(menuitem_id, user, quantity, ttl)
+    except InsufficientStock:
+        if not release_expired(menuitem_ids=[menuitem_id]):
+            raise
+    return _reserve(menuitem_id, user, quantity, ttl)
+
+
+def _reserve(menuitem_id, user, quantity, ttl):
+    with transaction.atomic():
+        take(menuitem_id, quantity)
+        return InventoryReservation.objects.create(
+            menuitem_id=menuitem_id, user=user, quantity=quantity,
+            expires_at=timezone.now() + datetime.timedelta(seconds=ttl),
+        )
+
+
+def confirm(reservation):
+    """Keep the reserved stock for good; returns False if the reservation is gone."""
+    return InventoryReservation.objects.filter(pk=reservation.pk).delete()[0] > 0
+
+
+def release(reservation):
+    """Put the reserved stock back; returns False if the reservation is gone."""
+    with transaction.atomic():
+        # Only whoever deletes the reservation gives its stock back.
+        if not InventoryReservation.objects.filter(pk=reservation.pk).delete()[0]:
+            return False
+        give_back({reservation.menuitem_id: reservation.quantity})
+    return True
+
+
+def release_expired(now=None, menuitem_ids=None):
+    """Release every reservation that expired by ``now``, optionally only for
+    some menu items; returns how many were released.
+    """
+    expired = InventoryReservation.objects.filter(expires_at__lte=now or timezone.now())
+    if menuitem_ids is not None:
+        expired = expired.filter(menuitem_id__in=menuitem_ids)
+    with transaction.atomic():
+        rows = list(expired.select_for_update().values_list('pk', 'menuitem_id', 'quantity'))
+        if not rows:
+            return 0
+        InventoryReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        quantities = {}
+        for _, menuitem_id, quantity in rows:
+            quantities[menuitem_id] = quantities.get(menuitem_id, 0) + quantity
+        give_back(quantities)
+    return len(rows)
+
+
+def adjust(adjustments):
+    """Apply many stock changes in one UPDATE statement, all or nothing.
+
+    ``adjustments`` maps menu item ids to ``('delta', n)`` or ``('set', n)``.
+    Raises ``MenuItem.DoesNotExist`` for unknown ids and ``InsufficientStock``
+    if a delta would leave an inventory negative. Returns the new
+    inventories.
+    """
+    ids = list(adjustments)
+    whens = [
+        When(pk=pk, then=F('inventory') + value if kind == 'delta' else value)
+        for pk, (kind, value) in adjustments.items()
+    ]
+    with transaction.atomic():
+        updated = MenuItem.objects.filter(pk__in=ids).update(inventory=Case(*whens))
+        if updated != len(ids):
+            missing = sorted(set(ids) - set(MenuItem.objects.filter(pk__in=ids).values_list('pk', flat=True)))
+            raise MenuItem.DoesNotExist(f'Menu items not found: {", ".join(map(str, missing))}.')
+        inventories = dict(MenuItem.objects.filter(pk__in=ids).values_list('pk', 'inventory'))
+        negative = sorted(pk for pk, inventory in inventories.items() if inventory < 0)
+        if negative:
+            raise InsufficientStock(f'Not enough stock of menu items {", ".join(map(str, negative))}.')
+    return inventories
@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+
+from LittleLemonAPI.benchmark import temporary_database
+from LittleLemonDRF import inventory
+from LittleLemonDRF.models import Category, InventoryReservation, MenuItem
+
+
+def read_modify_write(menuitem_id, user):
+    """What a whole-object PUT of the inventory amounts to."""
+    item = MenuItem.objects.get(pk=menuitem_id)
+    if item.inventory < 1:
+        raise inventory.InsufficientStock()
+    item.inventory -= 1
+    item.save(update_fields=['inventory'])
+
+
+def conditional_update(menuitem_id, user):
+    inventory.take(menuitem_id, 1)
+
+
+def reserve_and_confirm(menuitem_id, user):
+    inventory.confirm(inventory.reserve(menuitem_id, user, 1))
+
+
+STRATEGIES = {
+    'read-modify-write': read_modify_write,
+    'conditional-update': conditional_update,
+    'reservation': reserve_and_confirm,
+}
+
+
+class Command(BaseCommand):
+    help = ('Sell one menu item from many threads at once and report, per strategy, how much was sold '
+            'against the stock and the throughput. Runs in a temporary file database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=500, help='Units in stock at the start (default: 500).')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32],
+                            help='Numbers of parallel decrementers (default: 1 8 32).')
+        parser.add_argument('--only', nargs='*', default=[], help='Only run strategies whose name starts with these.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        strategies = {name: sell for name, sell in STRATEGIES.items()
+                      if not options['only'] or name.startswith(tuple(options['only']))}
+        if not strategies:
+            raise CommandError('No strategy matches --only.')
+        if connection.vendor != 'sqlite':
+            raise CommandError('The benchmark runs on SQLite only.')
+
+        # Threads need their own connections to one database, which an
+        # in-memory test database cannot give them.
+        test_settings = connections['default'].settings_dict['TEST']
+        old_name = test_settings.get('NAME')
+        with tempfile.TemporaryDirectory() as directory:
+            test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+            try:
+                with temporary_database():
+                    results = self.run(strategies, options)
+            finally:
+                test_settings['NAME'] = old_name
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+    def run(self, strategies, options):
+        category = Category.objects.create(slug='benchmark', title='Benchmark')
+        item = MenuItem.objects.create(title='Lemon tart', price=5, inventory=0, category=category)
+        user = User.objects.create_user('benchmark')
+        stock = options['stock']
+
+        results = {}
+        self.stdout.write(f'{"strategy":<20}{"workers":>8}{"sold":>7}{"stock":>7}{"oversold":>9}'
+                          f'{"left":>6}{"errors":>8}{"sales/s":>10}')
+        for name, sell in strategies.items():
+            for workers in options['workers']:
+                MenuItem.objects.filter(pk=item.pk).update(inventory=stock)
+                InventoryReservation.objects.all().delete()
+                sold, errors, wall = self.contend(sell, item.pk, user, workers)
+                left = MenuItem.objects.get(pk=item.pk).inventory
+                result = {
+                    'sold': sold, 'stock': stock, 'oversold': max(sold - stock, 0), 'left': left,
+                    'errors': errors, 'sales_per_second': round(sold / wall, 1),
+                }
+                results.setdefault(name, {})[workers] = result
+                self.stdout.write(f'{name:<20}{workers:>8}{sold:>7}{stock:>7}{result["oversold"]:>9}'
+                                  f'{left:>6}{errors:>8}{result["sales_per_second"]:>10}')
+        return results
+
+    def contend(self, sell, menuitem_id, user, workers):
+        """Let ``workers`` threads sell until the item is sold out.
+
+        Returns the units sold, the database errors and the wall time.
+        """
+        sold, errors = [0] * workers, [0] * workers
+        start_line = threading.Barrier(workers)
+
+        def work(number):
+            try:
+                start_line.wait()
+                while True:
+                    try:
+                        sell(menuitem_id, user)
+                    except inventory.InsufficientStock:
+                        return
+                    except DatabaseError:
+                        errors[number] += 1
+                        if errors[number] > 100:
+                            return
+                    else:
+                        sold[number] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(number,)) for number in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(sold), sum(errors), time.perf_counter() - start
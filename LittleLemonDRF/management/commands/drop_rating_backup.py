@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+# Created by migration 0005_rating_aggregates.
+BACKUP_TABLE = 'LittleLemonDRF_rating_0005_backup'
+
+
+class Command(BaseCommand):
+    help = (f'Show the ratings migration 0005 clamped or deleted, kept in {BACKUP_TABLE}, '
+            'and drop that table with --drop once they have been checked.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop', action='store_true', help='Drop the backup table.')
+
+    def handle(self, *args, **options):
+        if BACKUP_TABLE not in connection.introspection.table_names():
+            self.stdout.write('No rating backup table.')
+            return
+        table = connection.ops.quote_name(BACKUP_TABLE)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id, menuitem_id, rating, user_id, reason FROM {table} ORDER BY reason, id')
+            rows = cursor.fetchall()
+        counts = {}
+        for pk, menuitem_id, rating, user_id, reason in rows:
+            counts[reason] = counts.get(reason, 0) + 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{reason}: rating {pk} of menu item {menuitem_id} by user {user_id} was {rating}')
+        for reason, count in counts.items():
+            self.stdout.write(f'{count} {reason} ratings')
+        if not rows:
+            self.stdout.write('The rating backup table is empty.')
+
+        if options['drop']:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE {table}')
+            self.stdout.write(self.style.SUCCESS(f'Dropped {BACKUP_TABLE}.'))
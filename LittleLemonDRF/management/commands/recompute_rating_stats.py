@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonDRF.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = 'Recompute the rating aggregates of menu items from their ratings in a single UPDATE statement.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('menuitem_ids', nargs='*', type=int,
+                            help='Only recompute these menu items (default: all menu items).')
+
+    def handle(self, *args, **options):
+        menu_items = MenuItem.objects.all()
+        if options['menuitem_ids']:
+            menu_items = menu_items.filter(pk__in=options['menuitem_ids'])
+        updated = menu_items.recompute_rating_stats()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed rating aggregates of {updated} menu items.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonDRF.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Put the stock of expired inventory reservations back. Meant to run periodically.'
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations.'))
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from LittleLemon.search import create_index_tables, drop_index_tables
+
+
+def create_search_index(apps, schema_editor):
+    create_index_tables(schema_editor, 'LittleLemonDRF_menuitem_fts', 'LittleLemonDRF_menuitem', ['title'])
+
+
+def drop_search_index(apps, schema_editor):
+    drop_index_tables(schema_editor, 'LittleLemonDRF_menuitem_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonDRF', '0003_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
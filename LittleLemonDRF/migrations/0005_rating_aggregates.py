@@ -0,0 +1,144 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+BACKUP_TABLE = 'LittleLemonDRF_rating_0005_backup'
+
+
+def _backup(schema_editor, ratings, reason):
+    rows = [(*row, reason) for row in ratings.values_list('id', 'menuitem_id', 'rating', 'user_id')]
+    table = schema_editor.quote_name(BACKUP_TABLE)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (id, menuitem_id, rating, user_id, reason) VALUES (%s, %s, %s, %s, %s)', rows)
+
+
+def repair_invalid_ratings(apps, schema_editor):
+    """Make existing ratings pass the new constraints.
+
+    Out of range ratings are clamped to 0..5. Ratings of missing menu items
+    and all but the latest rating of a user per item cannot be kept, so they
+    are deleted. Every changed or deleted row is first copied, as it was, to
+    ``LittleLemonDRF_rating_0005_backup``; reversing the migration puts them
+    back. Once they have been checked, ``manage.py drop_rating_backup --drop``
+    drops the table.
+    """
+    MenuItem = apps.get_model('LittleLemonDRF', 'MenuItem')
+    Rating = apps.get_model('LittleLemonDRF', 'Rating')
+    ratings = Rating.objects.using(schema_editor.connection.alias)
+    schema_editor.execute(
+        f'CREATE TABLE {schema_editor.quote_name(BACKUP_TABLE)} '
+        '(id bigint PRIMARY KEY, menuitem_id smallint NOT NULL, rating smallint NOT NULL, '
+        'user_id integer NOT NULL, reason varchar(16) NOT NULL)')
+
+    orphaned = ratings.exclude(menuitem_id__in=MenuItem.objects.using(schema_editor.connection.alias).values('pk'))
+    _backup(schema_editor, orphaned, 'orphaned')
+    orphaned.delete()
+
+    latest = ratings.values('user', 'menuitem_id').annotate(latest=Max('id')).values('latest')
+    superseded = ratings.exclude(pk__in=latest)
+    _backup(schema_editor, superseded, 'superseded')
+    superseded.delete()
+
+    for out_of_range, clamped in ((Q(rating__lt=0), 0), (Q(rating__gt=5), 5)):
+        _backup(schema_editor, ratings.filter(out_of_range), 'out_of_range')
+        ratings.filter(out_of_range).update(rating=clamped)
+
+
+def restore_invalid_ratings(apps, schema_editor):
+    if BACKUP_TABLE not in schema_editor.connection.introspection.table_names():
+        return  # Already dropped by drop_rating_backup.
+    Rating = apps.get_model('LittleLemonDRF', 'Rating')
+    table = schema_editor.quote_name(BACKUP_TABLE)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT id, menuitem_id, rating, user_id, reason FROM {table}')
+        rows = cursor.fetchall()
+    ratings = Rating.objects.using(schema_editor.connection.alias)
+    for pk, menuitem_id, rating, user_id, reason in rows:
+        if reason == 'out_of_range':
+            ratings.filter(pk=pk).update(rating=rating)
+    ratings.bulk_create([
+        Rating(id=pk, menuitem_id=menuitem_id, rating=rating, user_id=user_id)
+        for pk, menuitem_id, rating, user_id, reason in rows if reason != 'out_of_range'
+    ])
+    schema_editor.execute(f'DROP TABLE {table}')
+
+
+def compute_rating_aggregates(apps, schema_editor):
+    MenuItem = apps.get_model('LittleLemonDRF', 'MenuItem')
+    Rating = apps.get_model('LittleLemonDRF', 'Rating')
+
+    def aggregate(expression):
+        rows = Rating.objects.filter(menuitem=OuterRef('pk')).values('menuitem').annotate(value=expression)
+        return Subquery(rows.values('value'))
+
+    MenuItem.objects.update(
+        rating_count=Coalesce(aggregate(Count('id')), Value(0)),
+        rating_sum=Coalesce(aggregate(Sum('rating')), Value(0)),
+        rating_average=aggregate(Cast(Sum('rating'), FloatField()) / Count('id')),
+        **{f'ratings_{value}': Coalesce(aggregate(Count('id', filter=Q(rating=value))), Value(0))
+           for value in range(6)},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonDRF', '0004_menuitem_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_invalid_ratings, restore_invalid_ratings),
+        migrations.RenameField(
+            model_name='rating',
+            old_name='menuitem_id',
+            new_name='menuitem',
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='menuitem',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings',
+                                    to='LittleLemonDRF.menuitem'),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('user', 'menuitem'), name='unique_rating_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.CheckConstraint(condition=models.Q(('rating__gte', 0), ('rating__lte', 5)),
+                                              name='rating_in_range'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='rating_average',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        *[
+            migrations.AddField(
+                model_name='menuitem',
+                name=f'ratings_{value}',
+                field=models.PositiveIntegerField(default=0, editable=False),
+            )
+            for value in range(6)
+        ],
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['-rating_average', 'id'], name='drf_menuitem_top_rated_idx'),
+        ),
+        migrations.RunPython(compute_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,112 @@
 from django.db import models
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.contrib.auth.models import User
 
+MIN_RATING = 0
+MAX_RATING = 5
+RATING_VALUES = range(MIN_RATING, MAX_RATING + 1)
+
+
+def histogram_field(value):
+    return f'ratings_{value}'
+
+
 # Create your models here.
 class Category(models.Model):
     slug = models.SlugField()
     title = models.CharField(max_length=255)
 
 
+class MenuItemQuerySet(models.QuerySet):
+    def apply_rating(self, value, count=1):
+        """Add ``count`` ratings of ``value`` (or remove them, if negative) to
+        the rating aggregates of the menu items in one UPDATE.
+        """
+        rating_count = F('rating_count') + count
+        rating_sum = F('rating_sum') + value * count
+        return self.update(
+            rating_count=rating_count,
+            rating_sum=rating_sum,
+            # The right-hand sides all see the row before the update.
+            rating_average=Cast(rating_sum, FloatField()) / NullIf(rating_count, Value(0)),
+            **{histogram_field(value): F(histogram_field(value)) + count},
+        )
+
+    def recompute_rating_stats(self):
+        """Recompute every rating aggregate from the ratings with one UPDATE."""
+        def aggregate(expression):
+            rows = Rating.objects.filter(menuitem=OuterRef('pk')).values('menuitem').annotate(value=expression)
+            return Coalesce(Subquery(rows.values('value')), Value(0))
+
+        return self.update(
+            rating_count=aggregate(Count('id')),
+            rating_sum=aggregate(Sum('rating')),
+            rating_average=Subquery(
+                Rating.objects.filter(menuitem=OuterRef('pk')).values('menuitem')
+                .annotate(value=Cast(Sum('rating'), FloatField()) / Count('id')).values('value')
+            ),
+            **{histogram_field(value): aggregate(Count('id', filter=Q(rating=value))) for value in RATING_VALUES},
+        )
+
+
 class MenuItem(models.Model):
     title = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=6, decimal_places=2)
     inventory = models.SmallIntegerField()
     category = models.ForeignKey(Category, on_delete=models.PROTECT, default=1)
+    # Rating aggregates, kept up to date by the Rating signal receivers.
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(null=True, editable=False)
+    ratings_0 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_1 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_2 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_3 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_4 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = MenuItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the top-rated listing without sorting.
+            models.Index(fields=['-rating_average', 'id'], name='drf_menuitem_top_rated_idx'),
+        ]
+
+    @property
+    def rating_histogram(self):
+        return {value: getattr(self, histogram_field(value)) for value in RATING_VALUES}
+
+
+class InventoryReservation(models.Model):
+    """Stock held for a user until ``expires_at``.
+
+    The quantity is already taken off ``MenuItem.inventory``; confirming the
+    reservation keeps it off, releasing or letting it expire puts it back.
+    """
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quantity = models.PositiveSmallIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
 
 
 class Rating(models.Model):
-    menuitem_id = models.SmallIntegerField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='ratings')
     rating = models.SmallIntegerField()
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
\ No newline at end of file
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'menuitem'], name='unique_rating_per_user'),
+            models.CheckConstraint(condition=Q(rating__gte=MIN_RATING, rating__lte=MAX_RATING),
+                                   name='rating_in_range'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'menuitem_id' in instance.__dict__ and 'rating' in instance.__dict__:
+            # What the aggregates currently count for this rating.
+            instance._counted = (instance.menuitem_id, instance.rating)
+        return instance
@@ -0,0 +1,8 @@
+"""Full-text search indexes of LittleLemonDRF."""
+
+from LittleLemon.search import SearchIndex
+
+from .models import MenuItem
+
+
+menu_item_index = SearchIndex(MenuItem, ['title'])
@@ -1,22 +1,24 @@
-from .models import MenuItem, Category, Rating
+from .models import MAX_RATING, MIN_RATING, InventoryReservation, MenuItem, Category, Rating
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from LittleLemon.metrics import TimedSerializerMixin
 
-class CategorySerializer(serializers.ModelSerializer):
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'title']
 
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category_id = serializers.IntegerField(write_only=True)
     category = CategorySerializer(read_only=True)
 
     class Meta:
         model = MenuItem
-        fields = ['id', 'title', 'price', 'inventory', 'category', 'category_id']
+        fields = ['id', 'title', 'price', 'inventory', 'category', 'category_id', 'rating_average', 'rating_count']
         extra_kwargs = {
             'price': {
                 'min_value': 2
@@ -26,23 +28,84 @@ class MenuItemSerializer(serializers.ModelSerializer):
             }
         }
 
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Only write what the client sent, so an update never overwrites
+        # stock that changed in the meantime.
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class StockAdjustmentSerializer(TimedSerializerMixin, serializers.Serializer):
+    menuitem_id = serializers.IntegerField()
+    delta = serializers.IntegerField(required=False, min_value=-32768, max_value=32767)
+    inventory = serializers.IntegerField(required=False, min_value=0, max_value=32767)
+
+    def validate(self, attrs):
+        if ('delta' in attrs) == ('inventory' in attrs):
+            raise serializers.ValidationError('Give either delta or inventory.')
+        return attrs
+
+
+class InventoryAdjustSerializer(TimedSerializerMixin, serializers.Serializer):
+    adjustments = StockAdjustmentSerializer(many=True, allow_empty=False)
 
-class RatingSerializer(serializers.ModelSerializer):
+    def validate_adjustments(self, adjustments):
+        ids = [adjustment['menuitem_id'] for adjustment in adjustments]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError('Each menu item may only be adjusted once.')
+        return adjustments
+
+
+class InventoryReservationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    menuitem_id = serializers.PrimaryKeyRelatedField(
+        source = 'menuitem',
+        queryset = MenuItem.objects.all()
+    )
+
+    class Meta:
+        model = InventoryReservation
+        fields = ['id', 'menuitem_id', 'quantity', 'expires_at']
+        read_only_fields = ['expires_at']
+        extra_kwargs = {
+            'quantity': {
+                'min_value': 1
+            }
+        }
+
+
+class RatingStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    histogram = serializers.DictField(source='rating_histogram', child=serializers.IntegerField())
+
+    class Meta:
+        model = MenuItem
+        fields = ['id', 'title', 'rating_count', 'rating_average', 'histogram']
+
+
+class RatingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(
         queryset = User.objects.all(),
         default = serializers.CurrentUserDefault()
     )
+    menuitem_id = serializers.PrimaryKeyRelatedField(
+        source = 'menuitem',
+        queryset = MenuItem.objects.all()
+    )
     
     class Meta:
         model = Rating
-        fields = ['user', 'menuitem_id', 'rating']
-        validators = UniqueTogetherValidator(
-            queryset = Rating.objects.all(),
-            fields = ['user', 'menuitem_id', 'rating']
-        )
+        fields = ['id', 'user', 'menuitem_id', 'rating']
+        # One lookup on the (user, menuitem) unique index.
+        validators = [
+            UniqueTogetherValidator(
+                queryset = Rating.objects.all(),
+                fields = ['user', 'menuitem_id']
+            )
+        ]
         extra_kwargs = {
             'rating': {
-                'max_value': 5,
-                'min_value': 0
+                'max_value': MAX_RATING,
+                'min_value': MIN_RATING
             }
         }
\ No newline at end of file
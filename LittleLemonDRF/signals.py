@@ -0,0 +1,42 @@
+"""Signal receivers for LittleLemonDRF."""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import MenuItem, Rating
+from .search import menu_item_index
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, **kwargs):
+    menu_item_index.update(instance)
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, **kwargs):
+    menu_item_index.remove(instance.pk)
+
+
+@receiver(pre_save, sender=Rating)
+def load_counted_rating(sender, instance, **kwargs):
+    # Ratings loaded from the database remember what was counted in from_db.
+    if not hasattr(instance, '_counted') and instance.pk is not None:
+        instance._counted = Rating.objects.filter(pk=instance.pk).values_list('menuitem_id', 'rating').first()
+
+
+@receiver(post_save, sender=Rating)
+def count_rating(sender, instance, created, **kwargs):
+    counted = None if created else getattr(instance, '_counted', None)
+    current = (instance.menuitem_id, instance.rating)
+    if counted == current:
+        return
+    if counted is not None:
+        MenuItem.objects.filter(pk=counted[0]).apply_rating(counted[1], -1)
+    MenuItem.objects.filter(pk=current[0]).apply_rating(current[1])
+    instance._counted = current
+
+
+@receiver(post_delete, sender=Rating)
+def uncount_rating(sender, instance, **kwargs):
+    menuitem_id, rating = getattr(instance, '_counted', None) or (instance.menuitem_id, instance.rating)
+    MenuItem.objects.filter(pk=menuitem_id).apply_rating(rating, -1)
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import inventory
+from .models import Category, InventoryReservation, MenuItem, Rating
 
 # Create your tests here.
+class RatingAggregateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(slug='mains', title='Mains')
+        cls.items = [
+            MenuItem.objects.create(title=f'Dish {number}', price=Decimal('9.00'), inventory=5, category=category)
+            for number in range(3)
+        ]
+        cls.users = [User.objects.create_user(f'diner{number}', password='pass') for number in range(3)]
+
+    def rate(self, user, item, rating):
+        self.client.force_authenticate(user)
+        return self.client.post('/drf/ratings', {'menuitem_id': item.pk, 'rating': rating})
+
+    def stats(self, item):
+        return self.client.get(f'/drf/menu-items/{item.pk}/ratings').data
+
+    def test_aggregates_follow_create_update_and_delete(self):
+        self.rate(self.users[0], self.items[0], 5)
+        self.rate(self.users[1], self.items[0], 2)
+        stats = self.stats(self.items[0])
+        self.assertEqual((stats['rating_count'], stats['rating_average']), (2, 3.5))
+        self.assertEqual(stats['histogram'], {'0': 0, '1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+
+        rating = Rating.objects.get(user=self.users[1])
+        self.client.force_authenticate(self.users[1])
+        self.client.patch(f'/drf/ratings/{rating.pk}', {'rating': 4})
+        self.assertEqual(self.stats(self.items[0])['rating_average'], 4.5)
+        self.client.patch(f'/drf/ratings/{rating.pk}', {'menuitem_id': self.items[1].pk})
+        self.assertEqual(self.stats(self.items[0])['rating_count'], 1)
+        self.assertEqual(self.stats(self.items[1])['histogram']['4'], 1)
+
+        self.client.delete(f'/drf/ratings/{rating.pk}')
+        self.assertEqual(self.stats(self.items[1])['rating_count'], 0)
+        self.assertIsNone(self.stats(self.items[1])['rating_average'])
+
+        self.users[0].delete()
+        self.assertEqual(self.stats(self.items[0])['rating_count'], 0)
+
+    def test_menu_items_list_the_average_without_a_join(self):
+        self.rate(self.users[0], self.items[2], 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/drf/menu-items', {'ordering': '-rating_average'})
+        self.assertEqual(response.data['results'][0]['rating_average'], 3.0)
+        self.assertFalse([query for query in queries if 'LittleLemonDRF_rating' in query['sql']])
+
+    def test_top_rated(self):
+        self.rate(self.users[0], self.items[0], 3)
+        self.rate(self.users[0], self.items[1], 5)
+        self.rate(self.users[1], self.items[1], 4)
+        self.rate(self.users[1], self.items[2], 5)
+        response = self.client.get('/drf/menu-items/top-rated')
+        self.assertEqual([item['id'] for item in response.data],
+                         [self.items[2].pk, self.items[1].pk, self.items[0].pk])
+        response = self.client.get('/drf/menu-items/top-rated', {'min_ratings': 2, 'limit': 1})
+        self.assertEqual([item['id'] for item in response.data], [self.items[1].pk])
+        self.assertEqual(self.client.get('/drf/menu-items/top-rated', {'limit': 'all'}).status_code, 400)
+
+        with connection.cursor() as cursor:
+            sql, params = MenuItem.objects.filter(rating_average__isnull=False).order_by(
+                '-rating_average', 'id')[:10].query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('drf_menuitem_top_rated_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_one_rating_per_user_and_item(self):
+        self.assertEqual(self.rate(self.users[0], self.items[0], 5).status_code, 201)
+        self.assertEqual(self.rate(self.users[0], self.items[0], 1).status_code, 400)
+        self.assertEqual(self.rate(self.users[0], self.items[0], 6).status_code, 400)
+        self.assertEqual(self.rate(self.users[0], MenuItem(pk=999), 3).status_code, 400)
+        self.assertEqual(MenuItem.objects.get(pk=self.items[0].pk).rating_count, 1)
+
+    def test_recompute_rating_stats(self):
+        self.rate(self.users[0], self.items[0], 5)
+        self.rate(self.users[1], self.items[0], 1)
+        MenuItem.objects.update(rating_count=0, rating_sum=0, rating_average=None, ratings_5=0)
+        call_command('recompute_rating_stats', stdout=io.StringIO())
+        item = MenuItem.objects.get(pk=self.items[0].pk)
+        self.assertEqual((item.rating_count, item.rating_sum, item.rating_average), (2, 6, 3.0))
+        self.assertEqual(item.rating_histogram, {0: 0, 1: 1, 2: 0, 3: 0, 4: 0, 5: 1})
+        self.assertEqual(MenuItem.objects.get(pk=self.items[1].pk).rating_count, 0)
+
+
+    def test_drop_rating_backup(self):
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO "LittleLemonDRF_rating_0005_backup" (id, menuitem_id, rating, user_id, reason) '
+                           'VALUES (%s, %s, %s, %s, %s)', [7, self.items[0].pk, 9, self.users[0].pk, 'out_of_range'])
+        out = io.StringIO()
+        call_command('drop_rating_backup', verbosity=2, stdout=out)
+        self.assertIn('out_of_range: rating 7 of menu item', out.getvalue())
+        self.assertIn('1 out_of_range ratings', out.getvalue())
+        self.assertIn('LittleLemonDRF_rating_0005_backup', connection.introspection.table_names())
+
+        call_command('drop_rating_backup', '--drop', stdout=io.StringIO())
+        self.assertNotIn('LittleLemonDRF_rating_0005_backup', connection.introspection.table_names())
+        out = io.StringIO()
+        call_command('drop_rating_backup', stdout=out)
+        self.assertIn('No rating backup table.', out.getvalue())
+
+class InventoryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(slug='mains', title='Mains')
+        cls.items = [
+            MenuItem.objects.create(title=f'Dish {number}', price=Decimal('9.00'), inventory=5, category=category)
+            for number in range(3)
+        ]
+        cls.user = User.objects.create_user('diner', password='pass')
+        cls.admin = User.objects.create_user('admin', password='pass', is_staff=True)
+
+    def stock(self, item):
+        return MenuItem.objects.get(pk=item.pk).inventory
+
+    def test_take_never_oversells(self):
+        inventory.take(self.items[0].pk, 4)
+        with self.assertRaises(inventory.InsufficientStock):
+            inventory.take(self.items[0].pk, 2)
+        self.assertEqual(self.stock(self.items[0]), 1)
+
+    def test_reservations_hold_and_release_stock(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/drf/inventory/reservations', {'menuitem_id': self.items[0].pk, 'quantity': 3})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(self.items[0]), 2)
+        response = self.client.post('/drf/inventory/reservations', {'menuitem_id': self.items[0].pk, 'quantity': 3})
+        self.assertEqual(response.status_code, 409)
+
+        reservation = self.client.post('/drf/inventory/reservations',
+                                       {'menuitem_id': self.items[0].pk, 'quantity': 2}).data['id']
+        self.assertEqual(self.client.delete(f'/drf/inventory/reservations/{reservation}').status_code, 204)
+        self.assertEqual(self.stock(self.items[0]), 2)
+
+        first = InventoryReservation.objects.get(quantity=3)
+        self.assertEqual(self.client.post(f'/drf/inventory/reservations/{first.pk}/confirm').status_code, 200)
+        self.assertFalse(InventoryReservation.objects.exists())
+        self.assertEqual(self.stock(self.items[0]), 2)
+
+    def test_expired_reservations_give_stock_back(self):
+        reservation = inventory.reserve(self.items[1].pk, self.user, 5)
+        self.assertEqual(self.stock(self.items[1]), 0)
+        InventoryReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(f'/drf/inventory/reservations/{reservation.pk}/confirm')
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.stock(self.items[1]), 5)
+
+        inventory.reserve(self.items[1].pk, self.user, 4, ttl=-1)
+        # Reserving a sold-out item first releases its expired reservations.
+        inventory.reserve(self.items[1].pk, self.user, 5)
+        self.assertEqual(InventoryReservation.objects.count(), 1)
+        self.assertEqual(self.stock(self.items[1]), 0)
+
+        inventory.reserve(self.items[2].pk, self.user, 2, ttl=-1)
+        call_command('release_expired_reservations', stdout=io.StringIO())
+        self.assertEqual(self.stock(self.items[2]), 5)
+
+    def test_released_stock_stays_released_when_still_short(self):
+        inventory.reserve(self.items[1].pk, self.user, 4, ttl=-1)
+        with self.assertRaises(inventory.InsufficientStock):
+            inventory.reserve(self.items[1].pk, self.user, 6)
+        self.assertFalse(InventoryReservation.objects.exists())
+        self.assertEqual(self.stock(self.items[1]), 5)
+
+    def test_bulk_adjustment_is_one_update(self):
+        self.client.force_authenticate(self.admin)
+        adjustments = [
+            {'menuitem_id': self.items[0].pk, 'delta': -2},
+            {'menuitem_id': self.items[1].pk, 'delta': 10},
+            {'menuitem_id': self.items[2].pk, 'inventory': 0},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/drf/inventory/adjust', {'adjustments': adjustments}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['inventory'] for row in response.data['inventory']], [3, 15, 0])
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+
+        adjustments[0]['delta'] = -4
+        response = self.client.post('/drf/inventory/adjust', {'adjustments': adjustments}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([self.stock(item) for item in self.items], [3, 15, 0])
+        response = self.client.post('/drf/inventory/adjust',
+                                    {'adjustments': [{'menuitem_id': 999, 'delta': 1}]}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/drf/inventory/adjust',
+                                    {'adjustments': [{'menuitem_id': 1, 'delta': 1, 'inventory': 2}]},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post('/drf/inventory/adjust', {'adjustments': adjustments},
+                                          format='json').status_code, 403)
+
+    def test_menu_item_patch_leaves_inventory_alone(self):
+        self.client.force_authenticate(self.user)
+        item = self.items[0]
+        inventory.take(item.pk, 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(f'/drf/menu-items/{item.pk}', {'title': 'Lemon soup'})
+        update = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertNotIn('inventory', update[0])
+        self.assertEqual(self.stock(item), 2)
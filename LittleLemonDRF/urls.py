@@ -3,8 +3,17 @@ from . import views
 
 
 urlpatterns = [
-    path('menu-items', views.MenuItemsView.as_view()),
-    path('menu-items/<int:pk>', views.SingleMenuItemView.as_view()),
-    path('categories', views.CategoriesView.as_view()),
-    path('ratings', views.RatingsView.as_view())
+    path('menu-items', views.MenuItemsView.as_view(), name='drf-menu-items'),
+    path('menu-items/top-rated', views.TopRatedMenuItemsView.as_view(), name='drf-top-rated'),
+    path('menu-items/<int:pk>', views.SingleMenuItemView.as_view(), name='drf-menu-item-detail'),
+    path('menu-items/<int:pk>/ratings', views.MenuItemRatingStatsView.as_view(), name='drf-menu-item-ratings'),
+    path('categories', views.CategoriesView.as_view(), name='drf-categories'),
+    path('ratings', views.RatingsView.as_view(), name='drf-ratings'),
+    path('ratings/<int:pk>', views.SingleRatingView.as_view(), name='drf-rating-detail'),
+    path('inventory/adjust', views.InventoryAdjustView.as_view(), name='drf-inventory-adjust'),
+    path('inventory/reservations', views.InventoryReservationsView.as_view(), name='drf-reservations'),
+    path('inventory/reservations/<int:pk>', views.SingleInventoryReservationView.as_view(),
+         name='drf-reservation-detail'),
+    path('inventory/reservations/<int:pk>/confirm', views.ConfirmInventoryReservationView.as_view(),
+         name='drf-reservation-confirm'),
 ]
\ No newline at end of file
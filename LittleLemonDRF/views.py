@@ -1,8 +1,17 @@
+from django.db import transaction
 from django.shortcuts import render
-from .models import MenuItem, Category, Rating
-from .serializers import MenuItemSerializer, CategorySerializer, RatingSerializer
-from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
+from django.utils import timezone
+from . import inventory
+from .models import InventoryReservation, MenuItem, Category, Rating
+from .serializers import (
+    MenuItemSerializer, CategorySerializer, RatingSerializer, RatingStatsSerializer,
+    InventoryAdjustSerializer, InventoryReservationSerializer,
+)
+from .search import menu_item_index
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 
 
 # Create your views here.
@@ -14,9 +23,9 @@ class CategoriesView(generics.ListCreateAPIView):
 class MenuItemsView(generics.ListCreateAPIView):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
-    ordering_fields = ['price', 'inventory']
+    ordering_fields = ['price', 'inventory', 'rating_average']
     filterset_fields = ['price', 'inventory']
-    search_fields = ['title']
+    search_index = menu_item_index
 
 
 class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
@@ -24,6 +33,42 @@ class SingleMenuItemView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MenuItemSerializer
 
 
+class TopRatedMenuItemsView(generics.ListAPIView):
+    """The best-rated menu items, read in order from the top-rated index.
+
+    ``?limit=`` (at most 50) sets how many; ``?min_ratings=`` skips items
+    with fewer ratings.
+    """
+    serializer_class = MenuItemSerializer
+    filter_backends = []
+    pagination_class = None
+    max_limit = 50
+
+    def get_int_param(self, name, default):
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: 'A whole number is required.'})
+        if value < 0:
+            raise ValidationError({name: 'Must not be negative.'})
+        return value
+
+    def get_queryset(self):
+        limit = min(self.get_int_param('limit', 10), self.max_limit)
+        min_ratings = self.get_int_param('min_ratings', 1)
+        return (
+            MenuItem.objects.select_related('category')
+            .filter(rating_average__isnull=False, rating_count__gte=min_ratings)
+            .order_by('-rating_average', 'id')[:limit]
+        )
+
+
+class MenuItemRatingStatsView(generics.RetrieveAPIView):
+    queryset = MenuItem.objects.all()
+    serializer_class = RatingStatsSerializer
+
+
 class RatingsView(generics.ListCreateAPIView):
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
@@ -31,4 +76,88 @@ class RatingsView(generics.ListCreateAPIView):
     def get_permissions(self):
         if(self.request.method=='GET'):
             return []
-        return [IsAuthenticated()]
\ No newline at end of file
+        return [IsAuthenticated()]
+
+    def perform_create(self, serializer):
+        # The rating and its menu item's aggregates change together.
+        with transaction.atomic():
+            serializer.save()
+
+
+class SingleRatingView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = RatingSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Rating.objects.filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+
+class InventoryAdjustView(generics.GenericAPIView):
+    serializer_class = InventoryAdjustSerializer
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        adjustments = {
+            adjustment['menuitem_id']: ('delta', adjustment['delta']) if 'delta' in adjustment
+            else ('set', adjustment['inventory'])
+            for adjustment in serializer.validated_data['adjustments']
+        }
+        try:
+            inventories = inventory.adjust(adjustments)
+        except MenuItem.DoesNotExist as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        except inventory.InsufficientStock as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response({"inventory": [{"id": pk, "inventory": value} for pk, value in sorted(inventories.items())]})
+
+
+class InventoryReservationsView(generics.ListCreateAPIView):
+    serializer_class = InventoryReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return InventoryReservation.objects.filter(user=self.request.user, expires_at__gt=timezone.now())
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation = inventory.reserve(serializer.validated_data['menuitem'].pk, request.user,
+                                            serializer.validated_data['quantity'])
+        except inventory.InsufficientStock as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
+
+
+class SingleInventoryReservationView(generics.RetrieveDestroyAPIView):
+    serializer_class = InventoryReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return InventoryReservation.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        inventory.release(instance)
+
+
+class ConfirmInventoryReservationView(SingleInventoryReservationView):
+    http_method_names = ['post', 'options']
+
+    def post(self, request, *args, **kwargs):
+        reservation = self.get_object()
+        expired = reservation.expires_at <= timezone.now()
+        if expired:
+            inventory.release(reservation)
+        if expired or not inventory.confirm(reservation):
+            return Response({"detail": "The reservation has expired."}, status=status.HTTP_410_GONE)
+        return Response({"detail": "Reservation confirmed."})
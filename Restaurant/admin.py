@@ -1,7 +1,41 @@
+from django import forms
 from django.contrib import admin
 
-from .models import Booking, Menu
+from .models import Booking, BookingSlot, Menu
+from .reservations import reserve
 
 # Register your models here.
 admin.site.register(Menu)
-admin.site.register(Booking)
\ No newline at end of file
+
+
+class BookingAdminForm(forms.ModelForm):
+    def clean(self):
+        cleaned_data = super().clean()
+        slot, guests = cleaned_data.get('slot'), cleaned_data.get('guest_number')
+        if self.instance.pk is None and slot and guests and slot.available < guests:
+            self.add_error('slot', f'Only {slot.available} seats left at this time.')
+        return cleaned_data
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
+    list_display = ['__str__', 'slot', 'guest_number']
+    list_select_related = ['slot']
+
+    def get_readonly_fields(self, request, obj=None):
+        # Seats are only taken when a booking is created.
+        return ['slot', 'guest_number'] if obj else []
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.save()
+        else:
+            reserve(obj)
+
+
+@admin.register(BookingSlot)
+class BookingSlotAdmin(admin.ModelAdmin):
+    list_display = ['date', 'time', 'capacity', 'booked']
+    list_filter = ['date']
+    readonly_fields = ['booked']
@@ -0,0 +1,94 @@
+"""Versioned page cache for the public Restaurant pages.
+
+Pages are cached whole, per path and query string, under a version that
+every write to ``Menu`` bumps; the menu templates also cache their menu
+fragments under the same version, so a page cached for a new query string
+still skips the menu query.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+PAGES_VERSION_KEY = 'littlelemon:pages:version'
+
+
+def get_page_cache():
+    return caches[getattr(settings, 'LITTLELEMON_PAGE_CACHE', 'default')]
+
+
+def get_page_timeout():
+    return getattr(settings, 'LITTLELEMON_PAGE_CACHE_TIMEOUT', 3600)
+
+
+def get_pages_version():
+    """Return the current pages version, starting a new one if it was evicted.
+    """
+    cache = get_page_cache()
+    version = cache.get(PAGES_VERSION_KEY)
+    if version is None:
+        cache.add(PAGES_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(PAGES_VERSION_KEY)
+    return version
+
+
+def bump_pages_version():
+    """Invalidate every cached page and menu fragment at once.
+    """
+    cache = get_page_cache()
+    try:
+        return cache.incr(PAGES_VERSION_KEY)
+    except ValueError:
+        return get_pages_version()
+
+
+def fragment_context():
+    """Template context for ``{% cache %}`` fragments tied to the pages version."""
+    return {
+        'pages_version': get_pages_version(),
+        'page_cache': getattr(settings, 'LITTLELEMON_PAGE_CACHE', 'default'),
+        'page_cache_timeout': get_page_timeout(),
+    }
+
+
+def cached_page(view):
+    """Serve GET and HEAD responses of ``view`` from the page cache.
+
+    Only for pages that look the same to every visitor. Responses carry an
+    ETag so browsers can revalidate with If-None-Match; a hit renders no
+    template and runs no SQL.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        version = get_pages_version()
+        digest = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+        etag = f'"{version}-{digest}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        cache = get_page_cache()
+        key = f'littlelemon:pages:{version}:{digest}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cache.set(key, (response.content, response['Content-Type']), get_page_timeout())
+        response['ETag'] = etag
+        return response
+
+    return wrapper
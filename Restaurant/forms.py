@@ -1,8 +1,33 @@
+from django import forms
 from django.forms import ModelForm
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-from .models import Booking
+from .models import Booking, BookingSlot
 
 class BookingForm(ModelForm):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+
     class Meta:
         model = Booking
-        fields = '__all__'
\ No newline at end of file
+        fields = ['first_name', 'last_name', 'date', 'slot', 'guest_number', 'comment']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        today = timezone.localdate()
+        try:
+            date = parse_date(self.data.get('date') or '') or today
+        except ValueError:
+            date = today
+        # Only offer the times of the chosen day, not every slot there is.
+        self.fields['date'].initial = date
+        self.fields['slot'].required = True
+        self.fields['slot'].queryset = BookingSlot.objects.filter(date=date, date__gte=today)
+        self.fields['slot'].label_from_instance = lambda slot: f'{slot.time:%H:%M}'
+        self.fields['guest_number'].widget.attrs['min'] = 1
+
+    def clean_guest_number(self):
+        guests = self.cleaned_data['guest_number']
+        if guests < 1:
+            raise forms.ValidationError('Book for at least one guest.')
+        return guests
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from Restaurant.models import Menu
+
+
+class Command(BaseCommand):
+    help = ('Render the public Restaurant pages to static HTML files for the front proxy to serve. '
+            'Run again after changing the menu.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=getattr(settings, 'LITTLELEMON_STATIC_PAGES_ROOT', 'static_pages'),
+                            help='Directory to write the pages to (default: LITTLELEMON_STATIC_PAGES_ROOT).')
+
+    def get_paths(self):
+        paths = [reverse('home'), reverse('about'), reverse('menu')]
+        paths += [reverse('menu_item', kwargs={'pk': pk}) for pk in Menu.objects.values_list('pk', flat=True)]
+        return paths
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        factory = RequestFactory()
+        for path in self.get_paths():
+            match = resolve(path)
+            response = match.func(factory.get(path), *match.args, **match.kwargs)
+            if response.status_code != 200:
+                self.stderr.write(f'{path}: HTTP {response.status_code}, skipped')
+                continue
+            target = output / path.lstrip('/') / 'index.html'
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so the proxy never serves a half-written page.
+            partial = target.with_suffix('.html.tmp')
+            partial.write_bytes(response.content)
+            partial.replace(target)
+            self.stdout.write(f'{path} -> {target}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote the pages to {output}.'))
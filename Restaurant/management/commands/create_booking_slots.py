@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from Restaurant.reservations import create_slots
+
+
+class Command(BaseCommand):
+    help = 'Create the bookable time slots for a range of days; existing slots are kept.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day (YYYY-MM-DD, default: today).')
+        parser.add_argument('--days', type=int, default=14, help='Number of days (default: 14).')
+        parser.add_argument('--opening', default='12:00', help='Time of the first slot (default: 12:00).')
+        parser.add_argument('--closing', default='22:00', help='No slot starts at or after this (default: 22:00).')
+        parser.add_argument('--interval', type=int, default=30, help='Minutes between slots (default: 30).')
+        parser.add_argument('--capacity', type=int, default=40, help='Guests per slot (default: 40).')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = parse_date(options['since']) if options['since'] else timezone.localdate()
+            opening, closing = parse_time(options['opening']), parse_time(options['closing'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if date_from is None or opening is None or closing is None:
+            raise CommandError('Dates must be YYYY-MM-DD and times HH:MM.')
+        for name in ('days', 'interval', 'capacity'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1.')
+
+        date_to = date_from + datetime.timedelta(days=options['days'] - 1)
+        created = create_slots(date_from, date_to, opening, closing, options['interval'], options['capacity'])
+        self.stdout.write(self.style.SUCCESS(f'Created {created} slots from {date_from} to {date_to}.'))
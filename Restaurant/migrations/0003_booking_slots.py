@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Restaurant', '0002_menu_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date', 'time'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'time'), name='unique_booking_slot'), models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='booking_slot_not_overbooked')],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='Restaurant.bookingslot'),
+        ),
+    ]
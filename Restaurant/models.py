@@ -1,11 +1,38 @@
 from django.db import models
 
 # Create your models here.
+class BookingSlot(models.Model):
+    """A reservable time with room for ``capacity`` guests.
+
+    ``booked`` counts the guests already booked into the slot, so its
+    availability is read from the row itself instead of summing bookings.
+    """
+    date = models.DateField()
+    time = models.TimeField()
+    capacity = models.PositiveIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date', 'time']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'time'], name='unique_booking_slot'),
+            models.CheckConstraint(condition=models.Q(booked__lte=models.F('capacity')), name='booking_slot_not_overbooked'),
+        ]
+
+    @property
+    def available(self):
+        return self.capacity - self.booked
+
+    def __str__(self):
+        return f'{self.date} {self.time:%H:%M}'
+
+
 class Booking(models.Model):
    first_name = models.CharField(max_length=200)    
    last_name = models.CharField(max_length=200)
    guest_number = models.IntegerField()
    comment = models.CharField(max_length=1000)
+   slot = models.ForeignKey(BookingSlot, on_delete=models.PROTECT, null=True, blank=True, related_name='bookings')
 
    def __str__(self):
       return self.first_name + ' ' + self.last_name
@@ -17,4 +44,4 @@ class Menu(models.Model):
     description = models.TextField(max_length=1000, default='')
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
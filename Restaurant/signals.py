@@ -0,0 +1,20 @@
+"""Signal receivers for Restaurant."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_pages_version
+from .models import Booking, Menu
+from .reservations import release
+
+
+@receiver([post_save, post_delete], sender=Menu)
+def invalidate_pages(sender, **kwargs):
+    # After commit, or a concurrent read could cache the old menu under the new version.
+    transaction.on_commit(bump_pages_version)
+
+
+@receiver(post_delete, sender=Booking)
+def release_booking_seats(sender, instance, **kwargs):
+    release(instance)
@@ -1,3 +1,135 @@
+import datetime
+import io
+import tempfile
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Booking, BookingSlot, Menu
+from .reservations import SlotUnavailable, reserve
 
 # Create your tests here.
+class ReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + datetime.timedelta(days=1)
+        cls.slot = BookingSlot.objects.create(date=cls.day, time=datetime.time(19), capacity=6)
+        cls.early_slot = BookingSlot.objects.create(date=cls.day, time=datetime.time(18), capacity=4)
+
+    def booking(self, guests, slot=None):
+        return Booking(first_name='Ada', last_name='Lovelace', guest_number=guests,
+                       comment='', slot=slot or self.slot)
+
+    def test_reserve_takes_seats_with_one_conditional_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            reserve(self.booking(4))
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 4)
+
+    def test_full_slot_is_not_oversold(self):
+        reserve(self.booking(4))
+        with self.assertRaises(SlotUnavailable):
+            reserve(self.booking(3))
+        reserve(self.booking(2))
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 6)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_deleting_a_booking_releases_its_seats(self):
+        booking = reserve(self.booking(5))
+        booking.delete()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 0)
+
+    def test_availability_lists_the_day_in_one_query(self):
+        reserve(self.booking(2))
+        url = reverse('book-availability')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'date': self.day.isoformat()})
+        self.assertEqual(response.json(), {'date': self.day.isoformat(), 'slots': [
+            {'id': self.early_slot.pk, 'time': '18:00', 'capacity': 4, 'available': 4},
+            {'id': self.slot.pk, 'time': '19:00', 'capacity': 6, 'available': 4},
+        ]})
+        self.assertEqual(self.client.get(url, {'date': 'soon'}).status_code, 400)
+
+    def test_book_page_reserves_the_chosen_slot(self):
+        data = {'first_name': 'Ada', 'last_name': 'Lovelace', 'date': self.day.isoformat(),
+                'slot': self.slot.pk, 'guest_number': 7, 'comment': 'Window seat'}
+        response = self.client.post(reverse('book'), data)
+        self.assertIn('slot', response.context['form'].errors)
+
+        data['guest_number'] = 6
+        response = self.client.post(reverse('book'), data)
+        self.assertEqual(response.context['booking'].slot, self.slot)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.available, 0)
+
+    def test_create_booking_slots_is_idempotent(self):
+        since = self.day.isoformat()
+        options = {'since': since, 'days': 2, 'opening': '18:00', 'closing': '20:00', 'stdout': io.StringIO()}
+        call_command('create_booking_slots', **options)
+        call_command('create_booking_slots', **options)
+        self.assertEqual(BookingSlot.objects.count(), 8)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.capacity, 6)
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dish = Menu.objects.create(name='Greek Salad', price=12, description='Crisp.')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_menu_page_is_served_from_the_cache(self):
+        url = reverse('menu')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Greek Salad')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_menu_fragment_is_shared_across_query_strings(self):
+        self.client.get(reverse('menu'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu'), {'utm_source': 'flyer'})
+        self.assertContains(response, 'Greek Salad')
+
+    def test_menu_writes_invalidate_pages(self):
+        menu_url, item_url = reverse('menu'), reverse('menu_item', kwargs={'pk': self.dish.pk})
+        etag = self.client.get(menu_url)['ETag']
+        self.client.get(item_url)
+        self.dish.name = 'Lemon Salad'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dish.save()
+            # The version only moves on commit.
+            self.assertEqual(self.client.get(menu_url)['ETag'], etag)
+        response = self.client.get(menu_url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Lemon Salad')
+        self.assertContains(self.client.get(item_url), 'Lemon Salad')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dish.delete()
+        self.assertNotContains(self.client.get(menu_url), 'Lemon Salad')
+        self.assertEqual(self.client.get(item_url).status_code, 404)
+
+    def test_build_static_pages(self):
+        with tempfile.TemporaryDirectory() as output:
+            call_command('build_static_pages', output=output, stdout=io.StringIO())
+            root = Path(output)
+            self.assertTrue((root / 'index.html').exists())
+            self.assertTrue((root / 'about' / 'index.html').exists())
+            self.assertIn('Greek Salad', (root / 'menu' / 'index.html').read_text())
+            item = root / 'menu_item' / str(self.dish.pk) / 'index.html'
+            self.assertIn('Crisp.', item.read_text())
@@ -5,6 +5,7 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
     path('book/', views.book, name='book'),
+    path('book/availability/', views.book_availability, name='book-availability'),
     path('menu/', views.menu, name='menu'),
     path('menu_item/<int:pk>/', views.display_menu_items, name="menu_item"),
 ]
\ No newline at end of file
@@ -1,37 +1,67 @@
-from django.shortcuts import render, HttpResponse
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render, HttpResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_safe
 
+from LittleLemon.db_router import replica_reads
+
+from .cache import cached_page, fragment_context
 from .forms import BookingForm
 from .models import Menu
+from .reservations import SlotUnavailable, availability, reserve
 
 # Create your views here.
+@cached_page
 def home(request):
     return render(request, 'index.html')
 
 
+@cached_page
 def about(request):
     return render(request, 'about.html')
 
 
 def book(request):
     form = BookingForm()
+    booking = None
     if request.method == 'POST':
         form = BookingForm(request.POST)
         if form.is_valid():
-            form.save()
-    context = {'form': form}
+            try:
+                booking = reserve(form.save(commit=False))
+                form = BookingForm()
+            except SlotUnavailable as exc:
+                form.add_error('slot', str(exc))
+    context = {'form': form, 'booking': booking}
     return render(request, 'book.html', context)
 
 
+@require_safe
+def book_availability(request):
+    try:
+        date = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        date = None
+    if date is None:
+        return JsonResponse({'detail': "'date' must be a date (YYYY-MM-DD)."}, status=400)
+    return JsonResponse({'date': date.isoformat(), 'slots': availability(date)})
+
+
+@cached_page
+@replica_reads()
 def menu(request):
+    # Lazy: the query only runs when the menu fragment is not cached.
     menu_items = Menu.objects.all().order_by('name')
-    main_data = {'menu': menu_items}
+    main_data = {'menu': menu_items, **fragment_context()}
     return render(request, 'menu.html', main_data)
 
 
+@cached_page
+@replica_reads()
 def display_menu_items(request, pk=None):
     if pk:
-        menu_item = Menu.objects.get(id=pk)
+        menu_item = get_object_or_404(Menu, id=pk)
     else:
         menu_item = ''
     
-    return render(request, 'menu_item.html', {"menu_item": menu_item})
\ No newline at end of file
+    return render(request, 'menu_item.html', {"menu_item": menu_item})